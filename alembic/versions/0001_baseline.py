@@ -0,0 +1,69 @@
+"""baseline: question и answers
+
+Схема, которую раньше создавали через create_all. На базе, где таблицы
+уже есть, миграция ничего не делает - достаточно `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    existing: set[str] = set()
+    if not op.get_context().as_sql:
+        existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "question" not in existing:
+        op.create_table(
+            "question",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("text", sa.Text(), nullable=False),
+            sa.Column(
+                "created_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.func.now(),
+                nullable=False,
+            ),
+        )
+
+    if "answers" not in existing:
+        op.create_table(
+            "answers",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column(
+                "question_id",
+                sa.Integer(),
+                sa.ForeignKey("question.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column("user_id", sa.String(length=36), nullable=True),
+            sa.Column("text", sa.Text(), nullable=False),
+            sa.Column(
+                "created_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.func.now(),
+                nullable=False,
+            ),
+        )
+        op.create_index("ix_answers_question_id", "answers", ["question_id"])
+        op.create_index("ix_answers_user_id", "answers", ["user_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("answers")
+    op.drop_table("question")
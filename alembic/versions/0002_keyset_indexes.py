@@ -0,0 +1,72 @@
+"""составные индексы под keyset-пагинацию
+
+- question(created_at, id) - sort_by=created_at с добивкой ничьих по id;
+- answers(question_id, id) - список ответов вопроса, заменяет индекс по
+  одному question_id (он становится его префиксом).
+
+Индексы строятся CONCURRENTLY, чтобы не блокировать запись в проде.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:05:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_question_created_at_id",
+            "question",
+            ["created_at", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_answers_question_id_id",
+            "answers",
+            ["question_id", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            "ix_answers_question_id",
+            table_name="answers",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_answers_question_id",
+            "answers",
+            ["question_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            "ix_answers_question_id_id",
+            table_name="answers",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_question_created_at_id",
+            table_name="question",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,36 @@
+"""row_counter: счётчики строк для X-Total-Count
+
+Счётчик ведут пути создания/удаления приложения в той же транзакции,
+здесь только создаём таблицу и заводим стартовое значение для question.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "row_counter",
+        sa.Column("name", sa.String(length=64), primary_key=True),
+        sa.Column("value", sa.BigInteger(), nullable=False),
+    )
+    op.execute("INSERT INTO row_counter (name, value) SELECT 'question', COUNT(*) FROM question")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("row_counter")
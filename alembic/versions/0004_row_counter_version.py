@@ -0,0 +1,38 @@
+"""row_counter.version: версия коллекции для ETag
+
+Версию поднимают те же пути создания/удаления, что ведут счётчик.
+Заводим и счётчик ответов - по нему строятся ETag списка ответов.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "row_counter",
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+    op.execute(
+        "INSERT INTO row_counter (name, value, version) SELECT 'answers', COUNT(*), 1 FROM answers"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM row_counter WHERE name = 'answers'")
+    op.drop_column("row_counter", "version")
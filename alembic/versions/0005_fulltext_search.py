@@ -0,0 +1,54 @@
+"""полнотекстовый поиск: tsvector-колонки и GIN-индексы
+
+search_vector - генерируемая (STORED) колонка to_tsvector('russian', text),
+её ведёт сам Postgres, приложению ничего делать не нужно. ADD COLUMN
+с генерируемым значением переписывает таблицу под блокировкой - на больших
+таблицах запускать в окно обслуживания. Индексы строятся CONCURRENTLY.
+
+На SQLite (тесты) аналог - FTS5-таблицы, их создаёт create_all.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("question", "answers")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_context().dialect.name != "postgresql":
+        return
+    for table in TABLES:
+        op.execute(
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('russian', text)) STORED"
+        )
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_search_vector "
+                f"ON {table} USING gin (search_vector)"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_context().dialect.name != "postgresql":
+        return
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS ix_{table}_search_vector")
+    for table in TABLES:
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,66 @@
+"""answers.user_id: varchar(36) -> uuid, индекс (user_id, id)
+
+- колонка переводится в нативный uuid (16 байт вместо 37) через
+  USING user_id::uuid; ALTER TYPE переписывает таблицу под блокировкой -
+  запускать в окно обслуживания;
+- индекс по одному user_id заменяется составным (user_id, id) под
+  GET /users/{user_id}/answers с keyset по id; строится CONCURRENTLY.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 13:30:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # старый индекс всё равно перестраивался бы при смене типа - убираем до ALTER
+    op.drop_index("ix_answers_user_id", table_name="answers", if_exists=True)
+    op.alter_column(
+        "answers",
+        "user_id",
+        existing_type=sa.String(length=36),
+        type_=sa.Uuid(),
+        existing_nullable=True,
+        postgresql_using="user_id::uuid",
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_answers_user_id_id",
+            "answers",
+            ["user_id", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_answers_user_id_id",
+            table_name="answers",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.alter_column(
+        "answers",
+        "user_id",
+        existing_type=sa.Uuid(),
+        type_=sa.String(length=36),
+        existing_nullable=True,
+        postgresql_using="user_id::text",
+    )
+    op.create_index("ix_answers_user_id", "answers", ["user_id"], if_not_exists=True)
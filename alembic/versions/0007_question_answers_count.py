@@ -0,0 +1,59 @@
+"""question.answers_count: денормализованное число ответов + индекс для сортировки
+
+- ADD COLUMN ... NOT NULL DEFAULT 0 в Postgres 11+ не переписывает таблицу;
+- начальное заполнение - один UPDATE по группировке answers; на очень
+  больших таблицах его можно пропустить (ANSWERS_COUNT_BACKFILL=0) и
+  прогнать пачками `python -m app.jobs.answers_count`;
+- индекс (answers_count, id) под sort_by=answers_count строится CONCURRENTLY.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+
+import os
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, Sequence[str], None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "question",
+        sa.Column("answers_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    if os.environ.get("ANSWERS_COUNT_BACKFILL", "1") != "0":
+        op.execute(
+            "UPDATE question SET answers_count = c.n "
+            "FROM (SELECT question_id, count(*) AS n FROM answers GROUP BY question_id) AS c "
+            "WHERE question.id = c.question_id"
+        )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_question_answers_count_id",
+            "question",
+            ["answers_count", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_question_answers_count_id",
+            table_name="question",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column("question", "answers_count")
@@ -0,0 +1,150 @@
+"""answers: секционирование по created_at (помесячно)
+
+Только Postgres; на SQLite (тесты) answers остаётся обычной таблицей.
+
+Существующая таблица не копируется, а становится секцией answers_legacy
+с диапазоном (MINVALUE, начало следующего месяца):
+
+- заранее и без долгих блокировок: уникальный индекс (id, created_at)
+  CONCURRENTLY и CHECK (created_at < граница) NOT VALID + VALIDATE -
+  тогда ATTACH PARTITION не сканирует таблицу;
+- короткая транзакция: PK переводится на (id, created_at) (ключ
+  секционирования обязан входить в PK), таблица и её индексы
+  переименовываются, создаётся секционированная answers с теми же
+  колонками, индексами и последовательностью id, legacy присоединяется;
+- создаются секции на MONTHS_AHEAD месяцев вперёд и answers_default - чтобы
+  вставка не падала, если задача app.jobs.partitions не успела.
+
+Миграция должна закончиться до конца текущего месяца (граница считается при
+запуске). PK теперь (id, created_at): уникальность id обеспечивает
+последовательность, поиск по одному id проверяет индекс каждой секции.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+
+from datetime import UTC, date, datetime
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, Sequence[str], None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+# индексы answers: (имя, определение после ON <таблица>)
+INDEXES = (
+    ("ix_answers_question_id_id", "(question_id, id)"),
+    ("ix_answers_user_id_id", "(user_id, id)"),
+    ("ix_answers_search_vector", "USING gin (search_vector)"),
+)
+
+COLUMNS = """
+    id integer NOT NULL DEFAULT nextval('answers_id_seq'::regclass),
+    question_id integer NOT NULL
+        CONSTRAINT answers_question_id_fkey REFERENCES question (id) ON DELETE CASCADE,
+    user_id uuid,
+    text text NOT NULL,
+    created_at timestamp with time zone NOT NULL DEFAULT now(),
+    search_vector tsvector GENERATED ALWAYS AS (to_tsvector('russian', text)) STORED
+"""
+
+
+def _month(start: date, shift: int) -> date:
+    index = start.year * 12 + start.month - 1 + shift
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _ts(day: date) -> str:
+    """Полночь UTC - границы не зависят от TimeZone сессии."""
+    return f"'{day} 00:00:00+00'"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_context().dialect.name != "postgresql":
+        return
+    today = datetime.now(UTC).date().replace(day=1)
+    boundary = _month(today, 1)
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS answers_id_created_at_key "
+            "ON answers (id, created_at)"
+        )
+        op.execute(
+            "ALTER TABLE answers ADD CONSTRAINT answers_legacy_range "
+            f"CHECK (created_at < {_ts(boundary)}) NOT VALID"
+        )
+        # VALIDATE держит SHARE UPDATE EXCLUSIVE - запись не блокируется
+        op.execute("ALTER TABLE answers VALIDATE CONSTRAINT answers_legacy_range")
+
+    op.execute(
+        "ALTER TABLE answers DROP CONSTRAINT answers_pkey, "
+        "ADD CONSTRAINT answers_legacy_pkey PRIMARY KEY USING INDEX answers_id_created_at_key"
+    )
+    op.execute("ALTER TABLE answers RENAME TO answers_legacy")
+    # имена ограничений уникальны в схеме: освобождаем их для новой answers
+    op.execute(
+        "ALTER TABLE answers_legacy "
+        "RENAME CONSTRAINT answers_question_id_fkey TO answers_legacy_question_id_fkey"
+    )
+    for name, _ in INDEXES:
+        legacy = name.replace("answers", "answers_legacy")
+        op.execute(f"ALTER INDEX IF EXISTS {name} RENAME TO {legacy}")
+
+    op.execute(
+        f"CREATE TABLE answers ({COLUMNS}, PRIMARY KEY (id, created_at)) "
+        "PARTITION BY RANGE (created_at)"
+    )
+    op.execute("ALTER SEQUENCE answers_id_seq OWNED BY answers.id")
+    # на пустой секционированной таблице - мгновенно; при ATTACH подходящие
+    # индексы legacy становятся секциями этих
+    for name, definition in INDEXES:
+        op.execute(f"CREATE INDEX {name} ON answers {definition}")
+    op.execute(
+        "ALTER TABLE answers ATTACH PARTITION answers_legacy "
+        f"FOR VALUES FROM (MINVALUE) TO ({_ts(boundary)})"
+    )
+    op.execute("ALTER TABLE answers_legacy DROP CONSTRAINT answers_legacy_range")
+
+    for shift in range(MONTHS_AHEAD):
+        start, end = _month(boundary, shift), _month(boundary, shift + 1)
+        op.execute(
+            f"CREATE TABLE answers_p{start:%Y%m} PARTITION OF answers "
+            f"FOR VALUES FROM ({_ts(start)}) TO ({_ts(end)})"
+        )
+    op.execute("CREATE TABLE answers_default PARTITION OF answers DEFAULT")
+
+
+def downgrade() -> None:
+    """Downgrade schema.
+
+    Данные всех присоединённых секций копируются в обычную таблицу;
+    отсоединённые (архивные) секции не возвращаются.
+    """
+    if op.get_context().dialect.name != "postgresql":
+        return
+    op.execute("ALTER TABLE answers RENAME TO answers_partitioned")
+    for constraint in ("pkey", "question_id_fkey"):
+        op.execute(
+            "ALTER TABLE answers_partitioned "
+            f"RENAME CONSTRAINT answers_{constraint} TO answers_partitioned_{constraint}"
+        )
+    for name, _ in INDEXES:
+        op.execute(f"ALTER INDEX IF EXISTS {name} RENAME TO {name}_partitioned")
+    op.execute(f"CREATE TABLE answers ({COLUMNS}, PRIMARY KEY (id))")
+    op.execute(
+        "INSERT INTO answers (id, question_id, user_id, text, created_at) "
+        "SELECT id, question_id, user_id, text, created_at FROM answers_partitioned"
+    )
+    op.execute("ALTER SEQUENCE answers_id_seq OWNED BY answers.id")
+    op.execute("DROP TABLE answers_partitioned")
+    for name, definition in INDEXES:
+        op.execute(f"CREATE INDEX {name} ON answers {definition}")
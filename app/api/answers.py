@@ -3,14 +3,23 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
-from sqlalchemy import asc, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import Select, asc, delete, insert, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app import schemas
-from app.db import get_session
+from app import bulk, counting, schemas, search, write_behind
+from app.core.cache import answer_key, cache, question_key
+from app.core.etag import cached_page, store_page, versions_etag
+from app.core.pagination import InvalidCursor, after_cursor, decode_cursor, encode_cursor
+from app.core.settings import settings
+from app.db import get_read_session, get_session, is_foreign_key_violation
 from app.models import Answer, Question
+from app.responses import ANSWER_COLUMNS, json_response, row_dict
 
 logger = logging.getLogger(__name__)
 
@@ -20,69 +29,246 @@ logger = logging.getLogger(__name__)
 router = APIRouter(tags=["Ответы"])
 
 
+def page_statement(
+    limit: int,
+    offset: int = 0,
+    after_id: int | None = None,
+    *,
+    question_id: int | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> Select[Any]:
+    """SELECT страницы списка ответов (на строку больше limit); его же прогревает lifecycle."""
+    stmt = select(*ANSWER_COLUMNS)
+    if question_id is not None:
+        stmt = stmt.where(Answer.question_id == question_id)
+    if since is not None:
+        stmt = stmt.where(Answer.created_at >= since)
+    if until is not None:
+        stmt = stmt.where(Answer.created_at < until)
+    stmt = stmt.order_by(asc(Answer.id))
+    if after_id is not None:
+        stmt = stmt.where(after_cursor(Answer.id, Answer.id, "asc", after_id, after_id))
+    else:
+        stmt = stmt.offset(offset)
+    return stmt.limit(limit + 1)
+
+
 @router.get("/answers/", response_model=list[schemas.AnswerRead])
 async def list_answers(
+    request: Request,
+    response: Response,
     question_id: int | None = None,
-    limit: int = 20,
-    offset: int = 0,
-    session: AsyncSession = Depends(get_session),
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int = Query(20, ge=0),
+    offset: int = Query(0, ge=0),
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_read_session),
 ):
-    """Список ответов (можно отфильтровать по question_id)."""
-    stmt = select(Answer)
-    if question_id is not None:
-        stmt = stmt.where(Answer.question_id == question_id)
-    stmt = stmt.order_by(asc(Answer.id)).limit(limit).offset(offset)
+    """Список ответов (можно отфильтровать по question_id).
+
+    since/until - по времени создания ответа (since включительно, until
+    исключительно); в Postgres answers секционирована по created_at, и
+    запрос читает только секции этого интервала.
+
+    Поддерживает keyset-пагинацию по id через cursor/X-Next-Cursor,
+    offset оставлен для старых клиентов. ETag/If-None-Match - по версии
+    коллекции ответов.
+    """
+    counters = await counting.counter_rows(session, Answer)
+    etag = versions_etag(counters, [Answer.__tablename__])
+    if (cached := await cached_page(request, etag)) is not None:
+        return cached
+    if etag is not None:
+        response.headers["ETag"] = etag
+
+    after_id = None
+    if cursor is not None:
+        try:
+            _, after_id = decode_cursor(cursor, "id", "asc")
+        except InvalidCursor as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    res = await session.execute(
+        page_statement(limit, offset, after_id, question_id=question_id, since=since, until=until)
+    )
+    items = res.all()
+    # limit=0 - пустая страница без курсора, как раньше
+    if len(items) > limit:
+        items = items[:limit]
+        if items:
+            last_id = items[-1].id
+            response.headers["X-Next-Cursor"] = encode_cursor("id", "asc", last_id, last_id)
+    return await store_page(request, etag, json_response([row_dict(i) for i in items], response))
+
+
+@router.get("/answers/search", response_model=list[schemas.AnswerRead])
+async def search_answers(
+    response: Response,
+    q: str = Query(min_length=1, max_length=200),
+    question_id: int | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Полнотекстовый поиск по тексту ответов (можно сузить до question_id).
+
+    Следующая страница - cursor из заголовка X-Next-Cursor.
+    """
+    where = Answer.question_id == question_id if question_id is not None else None
+    return await search.run(session, response, Answer, ANSWER_COLUMNS, q, limit, cursor, where)
+
 
-    res = await session.execute(stmt)
-    items = res.scalars().all()
-    return [schemas.AnswerRead.model_validate(i.__dict__) for i in items]
+@router.get(
+    "/answers/tickets/{ticket}",
+    response_model=schemas.AnswerTicket,
+    responses={404: {"description": "Тикет не найден или истёк"}},
+)
+async def get_answer_ticket(ticket: str):
+    """Статус ответа, принятого в очередь (режим answers_write_behind)."""
+    result = await write_behind.get_ticket(ticket)
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Тикет не найден")
+    return result
 
 
 @router.get("/answers/{answer_id}", response_model=schemas.AnswerRead)
-async def get_answer(answer_id: int, session: AsyncSession = Depends(get_session)):
-    """Получить ответ по id."""
-    res = await session.execute(select(Answer).where(Answer.id == answer_id))
-    obj = res.scalar_one_or_none()
-    if not obj:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ответ не найден")
-    return schemas.AnswerRead.model_validate(obj.__dict__)
+async def get_answer(answer_id: int, session: AsyncSession = Depends(get_read_session)):
+    """Получить ответ по id (через кэш по id)."""
+    key = answer_key(answer_id)
+    data = await cache.get(key)
+    if data is None:
+        res = await session.execute(select(*ANSWER_COLUMNS).where(Answer.id == answer_id))
+        row = res.one_or_none()
+        if row is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ответ не найден")
+        data = row_dict(row)
+        await cache.set(key, data)
+    return json_response(data)
 
 
 @router.post(
     "/questions/{question_id}/answers/",
     response_model=schemas.AnswerRead,
     status_code=status.HTTP_201_CREATED,
+    responses={
+        202: {"model": schemas.AnswerTicket, "description": "Принят в очередь"},
+        429: {"description": "Очередь записи заполнена"},
+    },
 )
 async def create_answer_for_question(
     question_id: int,
     payload: schemas.AnswerCreate,
     session: AsyncSession = Depends(get_session),
 ):
-    """Создать ответ к конкретному вопросу."""
+    """Создать ответ к конкретному вопросу.
+
+    Один INSERT ... RETURNING: несуществующий вопрос ловим по нарушению FK,
+    без предварительного SELECT. Дальше - answers_count вопроса и
+    счётчик/версия ответов.
+
+    При answers_write_behind ответ только ставится в очередь: 202 с тикетом,
+    статус - GET /answers/tickets/{ticket}.
+    """
+    if settings.answers_write_behind:
+        return await _enqueue_answer(question_id, payload)
+
+    stmt = (
+        insert(Answer)
+        .values(question_id=question_id, user_id=payload.user_id, text=payload.text)
+        .returning(Answer.id, Answer.question_id, Answer.user_id, Answer.text, Answer.created_at)
+    )
+    try:
+        row = (await session.execute(stmt)).one()
+        await counting.adjust_answers_count(session, question_id, +1)
+        await counting.adjust(session, Answer, +1)
+        await counting.commit(session)
+    except IntegrityError as exc:
+        await session.rollback()
+        if is_foreign_key_violation(exc):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Вопрос не найден")
+        raise
+    # в кэше по id лежит вопрос со старым answers_count
+    await cache.delete_many([question_key(question_id)])
+
+    logger.info("Создан ответ id=%s для question_id=%s", row.id, question_id)
+    return schemas.AnswerRead.model_validate(row._mapping)
+
+
+async def _enqueue_answer(question_id: int, payload: schemas.AnswerCreate) -> Response:
+    try:
+        ticket = await write_behind.answers.submit(question_id, payload)
+    except write_behind.QueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Очередь записи заполнена, повторите позже",
+            headers={"Retry-After": "1"},
+        )
+    response = json_response(ticket.model_dump(), status_code=status.HTTP_202_ACCEPTED)
+    response.headers["Location"] = f"/answers/tickets/{ticket.ticket}"
+    return response
+
+
+@router.post(
+    "/questions/{question_id}/answers/bulk",
+    response_model=schemas.BulkResult,
+    openapi_extra=bulk.OPENAPI_BODY,
+)
+async def create_answers_bulk(
+    question_id: int,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+):
+    """Создать много ответов к вопросу за раз.
+
+    Тело - JSON-массив AnswerCreate или NDJSON-поток (application/x-ndjson).
+    Невалидные элементы возвращаются в errors, остальные создаются.
+    """
     q = (
-        await session.execute(select(Question).where(Question.id == question_id))
+        await session.execute(select(Question.id).where(Question.id == question_id))
     ).scalar_one_or_none()
     if not q:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Вопрос не найден")
-
-    ans = Answer(question_id=question_id, user_id=str(payload.user_id), text=payload.text)
-    session.add(ans)
-    await session.flush()
-    await session.refresh(ans)
+    # не держим транзакцию (и соединение) открытой, пока читаем тело
     await session.commit()
 
-    logger.info("Создан ответ id=%s для question_id=%s", ans.id, question_id)
-    return schemas.AnswerRead.model_validate(ans.__dict__)
+    async def insert_batch(
+        session: AsyncSession, items: Sequence[schemas.AnswerCreate]
+    ) -> Sequence[int]:
+        res = await session.execute(
+            insert(Answer).returning(Answer.id, sort_by_parameter_order=True),
+            [{"question_id": question_id, "user_id": i.user_id, "text": i.text} for i in items],
+        )
+        ids = res.scalars().all()
+        await counting.adjust_answers_count(session, question_id, len(ids))
+        await counting.adjust(session, Answer, len(ids))
+        return ids
+
+    result = await bulk.ingest(
+        session, bulk.iter_items(request), schemas.AnswerCreate, insert_batch
+    )
+    await cache.delete_many([question_key(question_id)])
+    logger.info(
+        "Bulk: создано ответов=%s для question_id=%s, ошибок=%s",
+        result.created,
+        question_id,
+        len(result.errors),
+    )
+    return result
 
 
 @router.delete("/answers/{answer_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_answer(answer_id: int, session: AsyncSession = Depends(get_session)):
-    """Удалить ответ по id."""
-    res = await session.execute(select(Answer).where(Answer.id == answer_id))
-    obj = res.scalar_one_or_none()
-    if not obj:
+    """Удалить ответ по id: DELETE ... RETURNING, answers_count вопроса, счётчик/версия."""
+    res = await session.execute(
+        delete(Answer).where(Answer.id == answer_id).returning(Answer.question_id)
+    )
+    question_id = res.scalar_one_or_none()
+    if question_id is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ответ не найден")
-    await session.delete(obj)
-    await session.commit()
+    await counting.adjust_answers_count(session, question_id, -1)
+    await counting.adjust(session, Answer, -1)
+    await counting.commit(session)
+    await cache.delete_many([answer_key(answer_id), question_key(question_id)])
     logger.info("Удалён ответ id=%s", answer_id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
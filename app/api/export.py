@@ -0,0 +1,229 @@
+"""Экспорт вопросов вместе с ответами потоком: NDJSON или CSV."""
+
+from __future__ import annotations
+
+import csv
+import io
+import logging
+from collections import deque
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import Any, Literal
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import schemas
+from app.core.pagination import after_cursor
+from app.core.settings import settings
+from app.db import get_read_sessionmaker
+from app.models import Answer, Question, utcnow
+from app.responses import ANSWER_COLUMNS, QUESTION_COLUMNS, row_dict
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/export", tags=["Экспорт"])
+
+CSV_HEADER = [
+    "question_id",
+    "question_text",
+    "question_created_at",
+    "answer_id",
+    "answer_user_id",
+    "answer_text",
+    "answer_created_at",
+]
+
+
+class _Ndjson:
+    """Строка QuestionWithAnswers пишется по частям: ответы - по мере чтения пачек.
+
+    Байты те же, что у model_dump_json: answers - последнее поле схемы.
+    """
+
+    media_type = "application/x-ndjson"
+    header = b""
+
+    def start(self, q: schemas.QuestionRead) -> bytes:
+        return q.model_dump_json().encode()[:-1] + b',"answers":['
+
+    def answer(self, q: schemas.QuestionRead, a: schemas.AnswerRead, n: int) -> bytes:
+        return (b"," if n else b"") + a.model_dump_json().encode()
+
+    def end(self, q: schemas.QuestionRead, n: int) -> bytes:
+        return b"]}\n"
+
+
+class _Csv:
+    """Одна строка на ответ; вопрос без ответов - одна строка с пустыми полями ответа."""
+
+    media_type = "text/csv; charset=utf-8"
+
+    def __init__(self) -> None:
+        self._buf = io.StringIO()
+        self._writer = csv.writer(self._buf)
+        self.header = self._row(CSV_HEADER)
+
+    def _row(self, values: list[Any]) -> bytes:
+        self._buf.seek(0)
+        self._buf.truncate()
+        self._writer.writerow(values)
+        return self._buf.getvalue().encode()
+
+    def start(self, q: schemas.QuestionRead) -> bytes:
+        return b""
+
+    def answer(self, q: schemas.QuestionRead, a: schemas.AnswerRead, n: int) -> bytes:
+        return self._row(
+            [
+                q.id,
+                q.text,
+                q.created_at.isoformat(),
+                a.id,
+                a.user_id,
+                a.text,
+                a.created_at.isoformat(),
+            ]
+        )
+
+    def end(self, q: schemas.QuestionRead, n: int) -> bytes:
+        if n:
+            return b""
+        return self._row([q.id, q.text, q.created_at.isoformat(), "", "", "", ""])
+
+
+async def _questions(
+    maker: async_sessionmaker[AsyncSession],
+    since: datetime | None,
+    until: datetime,
+    after: tuple[datetime, int] | None,
+) -> list[schemas.QuestionRead]:
+    """Следующая пачка вопросов keyset'ом по (created_at, id) - индекс ix_question_created_at_id."""
+    stmt = (
+        select(*QUESTION_COLUMNS)
+        .where(Question.created_at < until)
+        .order_by(Question.created_at, Question.id)
+        .limit(settings.export_chunk_size)
+        .execution_options(yield_per=settings.export_yield_per)
+    )
+    if since is not None:
+        stmt = stmt.where(Question.created_at >= since)
+    if after is not None:
+        stmt = stmt.where(after_cursor(Question.created_at, Question.id, "asc", *after))
+    async with maker() as session:
+        result = await session.stream(stmt)
+        return [schemas.QuestionRead.model_validate(row_dict(r)) async for r in result]
+
+
+async def _answers(
+    maker: async_sessionmaker[AsyncSession], question_ids: list[int], after: tuple[int, int]
+) -> list[schemas.AnswerRead]:
+    """До export_answers_batch ответов вопросов пачки после (question_id, id)."""
+    stmt = (
+        select(*ANSWER_COLUMNS)
+        .where(
+            Answer.question_id.in_(question_ids),
+            tuple_(Answer.question_id, Answer.id) > tuple_(*after),
+        )
+        .order_by(Answer.question_id, Answer.id)
+        .limit(settings.export_answers_batch)
+    )
+    async with maker() as session:
+        rows = (await session.execute(stmt)).all()
+    return [schemas.AnswerRead.model_validate(row_dict(r)) for r in rows]
+
+
+async def _chunk_bytes(
+    maker: async_sessionmaker[AsyncSession],
+    chunk: list[schemas.QuestionRead],
+    encoder: _Ndjson | _Csv,
+) -> AsyncIterator[bytes]:
+    """Пачка вопросов с ответами; один кусок байт на пачку ответов.
+
+    Внутри пачки вопросы идут по id: так ответы читаются по индексу
+    (question_id, id) без сортировки.
+    """
+    pending = deque(sorted(chunk, key=lambda q: q.id))
+    ids = [q.id for q in pending]
+    out: list[bytes] = []
+    current: schemas.QuestionRead | None = None
+    n = 0
+
+    def close() -> None:
+        nonlocal current
+        if current is not None:
+            out.append(encoder.end(current, n))
+            current = None
+
+    def open_next() -> None:
+        nonlocal current, n
+        close()
+        current, n = pending.popleft(), 0
+        out.append(encoder.start(current))
+
+    after = (0, 0)
+    while True:
+        answers = await _answers(maker, ids, after)
+        for a in answers:
+            while current is None or current.id != a.question_id:
+                open_next()
+            out.append(encoder.answer(current, a, n))
+            n += 1
+        if len(answers) < settings.export_answers_batch:
+            break
+        after = (answers[-1].question_id, answers[-1].id)
+        yield b"".join(out)
+        out.clear()
+    while pending:
+        open_next()
+    close()
+    yield b"".join(out)
+
+
+async def _export(
+    maker: async_sessionmaker[AsyncSession],
+    since: datetime | None,
+    until: datetime,
+    encoder: _Ndjson | _Csv,
+) -> AsyncIterator[bytes]:
+    """Вопросы пачками по export_chunk_size, их ответы - пачками по export_answers_batch.
+
+    Каждое чтение - своя короткая сессия, закрытая ДО отдачи байт клиенту:
+    медленный клиент не держит ни открытой транзакции, ни больше одной
+    пачки ответов в памяти - даже у вопроса с миллионом ответов.
+    """
+    after: tuple[datetime, int] | None = None
+    total = 0
+    while chunk := await _questions(maker, since, until, after):
+        async for data in _chunk_bytes(maker, chunk, encoder):
+            yield data
+        total += len(chunk)
+        after = (chunk[-1].created_at, chunk[-1].id)
+    logger.info("Экспорт %s: выгружено вопросов=%s", encoder.media_type, total)
+
+
+@router.get("/questions")
+async def export_questions(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    since: datetime | None = None,
+    until: datetime | None = None,
+    maker: async_sessionmaker[AsyncSession] = Depends(get_read_sessionmaker),
+):
+    """Выгрузить вопросы с ответами (QuestionWithAnswers) потоком.
+
+    since/until фильтруют по времени создания вопроса: since включительно,
+    until исключительно (по умолчанию - момент запроса, чтобы выгрузка не
+    «догоняла» новые строки). Для инкрементальной выгрузки передавайте
+    until прошлого запуска как since следующего.
+    """
+    until = until or utcnow()
+    encoder = _Ndjson() if format == "ndjson" else _Csv()
+
+    async def body() -> AsyncIterator[bytes]:
+        if encoder.header:
+            yield encoder.header
+        async for data in _export(maker, since, until, encoder):
+            yield data
+
+    return StreamingResponse(body(), media_type=encoder.media_type)
@@ -0,0 +1,46 @@
+"""Эндпоинты фоновой очистки: завести задание и следить за прогрессом."""
+
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import purge, schemas
+from app.db import get_session
+from app.models import PurgeJob
+
+router = APIRouter(prefix="/purge", tags=["Очистка"])
+
+
+@router.post("/answers", response_model=schemas.PurgeJobRead, status_code=status.HTTP_202_ACCEPTED)
+async def purge_answers(
+    payload: schemas.PurgeAnswersCreate, session: AsyncSession = Depends(get_session)
+):
+    """Удалить ответы по user_id и/или времени создания - в фоне, пачками.
+
+    Прогресс - GET /purge/{job_id}.
+    """
+    job = await purge.create_job(session, "answers", **payload.model_dump())
+    purge.worker.wake()
+    return job
+
+
+@router.post(
+    "/questions", response_model=schemas.PurgeJobRead, status_code=status.HTTP_202_ACCEPTED
+)
+async def purge_questions(
+    payload: schemas.PurgeQuestionsCreate, session: AsyncSession = Depends(get_session)
+):
+    """Удалить вопросы, созданные в [since, until), вместе с ответами - в фоне, пачками."""
+    job = await purge.create_job(session, "questions", **payload.model_dump())
+    purge.worker.wake()
+    return job
+
+
+@router.get("/{job_id}", response_model=schemas.PurgeJobRead)
+async def get_purge_job(job_id: int, session: AsyncSession = Depends(get_session)):
+    """Статус задания: сколько удалено, докуда дошли (last_id из max_id)."""
+    job = await session.get(PurgeJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Задание не найдено")
+    return job
@@ -3,76 +3,293 @@
 from __future__ import annotations
 
 import logging
-from typing import Literal
+from collections.abc import Sequence
+from typing import Any, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
-from sqlalchemy import asc, desc, func, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import Select, asc, delete, desc, func, insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app import schemas
-from app.db import get_session
-from app.models import Question
+from app import bulk, counting, schemas, search
+from app.core.cache import answer_key, cache, question_key
+from app.core.etag import cached_page, store_page, versions_etag
+from app.core.pagination import InvalidCursor, after_cursor, decode_cursor, encode_cursor
+from app.core.settings import settings
+from app.db import get_read_session, get_session
+from app.models import Answer, Question
+from app.responses import QUESTION_COLUMNS, json_response, question_dict, row_dict
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/questions", tags=["Вопросы"])
 
+Include = Literal["answers"]
+# сколько ответов вкладываем в каждый вопрос при include=answers
+AnswersLimit = Query(20, ge=1, le=100)
+
+
+async def _load_answers(
+    session: AsyncSession,
+    questions: Sequence[Question],
+    limit: int,
+    after_id: int | None = None,
+) -> None:
+    """Кладёт в question.answers не больше limit первых ответов каждого вопроса.
+
+    Один дополнительный запрос на всю страницу (как selectinload): ответы
+    вопросов страницы нумеруются row_number() OVER (PARTITION BY question_id
+    ORDER BY id) по индексу answers(question_id, id) и отсекаются по номеру.
+    Каждый ответ читается один раз - без коррелированного подзапроса на строку.
+    """
+    if not questions:
+        return
+    ranked = select(
+        Answer,
+        func.row_number().over(partition_by=Answer.question_id, order_by=Answer.id).label("rn"),
+    ).where(Answer.question_id.in_([q.id for q in questions]))
+    if after_id is not None:
+        ranked = ranked.where(Answer.id > after_id)
+    sub = ranked.subquery()
+    answer = aliased(Answer, sub)
+    res = await session.execute(select(answer).where(sub.c.rn <= limit))
+    per_question: dict[int, list[Answer]] = {q.id: [] for q in questions}
+    for a in res.scalars():
+        per_question[a.question_id].append(a)
+    # порядок - здесь: строк не больше limit на вопрос, сортировка в БД не нужна
+    for q in questions:
+        set_committed_value(q, "answers", sorted(per_question[q.id], key=lambda a: a.id))
+
 
 @router.post("/", response_model=schemas.QuestionRead, status_code=status.HTTP_201_CREATED)
 async def create_question(
     payload: schemas.QuestionCreate, session: AsyncSession = Depends(get_session)
 ):
-    """Создать новый вопрос."""
-    q = Question(text=payload.text)
-    session.add(q)
-    await session.flush()
-    await session.commit()
-    await session.refresh(q)
-    logger.info("Создан вопрос id=%s", q.id)
-    return schemas.QuestionRead.model_validate(q.__dict__)
+    """Создать новый вопрос: INSERT ... RETURNING, сдвиг счётчика - после коммита."""
+    res = await session.execute(
+        insert(Question)
+        .values(text=payload.text)
+        .returning(Question.id, Question.text, Question.created_at, Question.answers_count)
+    )
+    row = res.one()
+    await counting.adjust(session, Question, +1)
+    await counting.commit(session)
+    logger.info("Создан вопрос id=%s", row.id)
+    return schemas.QuestionRead.model_validate(row._mapping)
 
 
-@router.get("/", response_model=list[schemas.QuestionRead])
+async def _insert_questions(
+    session: AsyncSession, items: Sequence[schemas.QuestionCreate]
+) -> Sequence[int]:
+    """Одна пачка bulk-загрузки: многострочный INSERT ... RETURNING id."""
+    res = await session.execute(
+        insert(Question).returning(Question.id, sort_by_parameter_order=True),
+        [{"text": i.text} for i in items],
+    )
+    ids = res.scalars().all()
+    await counting.adjust(session, Question, len(ids))
+    return ids
+
+
+@router.post("/bulk", response_model=schemas.BulkResult, openapi_extra=bulk.OPENAPI_BODY)
+async def create_questions_bulk(request: Request, session: AsyncSession = Depends(get_session)):
+    """Создать много вопросов за раз.
+
+    Тело - JSON-массив QuestionCreate или NDJSON-поток (application/x-ndjson).
+    Невалидные элементы возвращаются в errors, остальные создаются.
+    """
+    result = await bulk.ingest(
+        session, bulk.iter_items(request), schemas.QuestionCreate, _insert_questions
+    )
+    logger.info("Bulk: создано вопросов=%s, ошибок=%s", result.created, len(result.errors))
+    return result
+
+
+def page_statement(
+    sort_by: str,
+    order: str,
+    limit: int,
+    offset: int = 0,
+    after: tuple[Any, int] | None = None,
+    with_answers: bool = False,
+) -> Select[Any]:
+    """SELECT страницы списка вопросов - на строку больше limit, чтобы знать о следующей.
+
+    after - (значение sort_by, id) из курсора, иначе offset. Этим же выражением
+    lifecycle прогревает кэш подготовленных выражений.
+    """
+    order_by_col = getattr(Question, sort_by)
+    order_fn = asc if order == "asc" else desc
+    # без вложенных ответов ORM-объекты не нужны - берём только колонки
+    stmt = select(Question) if with_answers else select(*QUESTION_COLUMNS)
+    stmt = stmt.order_by(order_fn(order_by_col), order_fn(Question.id))
+    if after is not None:
+        stmt = stmt.where(after_cursor(order_by_col, Question.id, order, *after))
+    else:
+        stmt = stmt.offset(offset)
+    return stmt.limit(limit + 1)
+
+
+@router.get("/", response_model=list[schemas.QuestionRead | schemas.QuestionWithAnswers])
 async def list_questions(
+    request: Request,
     response: Response,
-    limit: int = 20,
-    offset: int = 0,
-    sort_by: Literal["id", "created_at"] = "id",
+    limit: int = Query(20, ge=0),
+    offset: int = Query(0, ge=0),
+    cursor: str | None = None,
+    sort_by: Literal["id", "created_at", "answers_count"] = "id",
     order: Literal["asc", "desc"] = "asc",
-    session: AsyncSession = Depends(get_session),
+    with_total: bool = True,
+    include: Include | None = None,
+    answers_limit: int = AnswersLimit,
+    session: AsyncSession = Depends(get_read_session),
 ):
     """Список вопросов с пагинацией и сортировкой.
 
+    Два режима пагинации:
+    - limit/offset - как раньше, для старых клиентов;
+    - cursor - keyset по (sort_by, id): значение берётся из заголовка
+      X-Next-Cursor предыдущей страницы, offset при этом не используется.
+
+    sort_by=answers_count сортирует по числу ответов (индекс (answers_count, id)).
+
     В заголовок ответа кладём общее количество (ASCII-безопасное имя).
+    Как считать - решает settings.questions_count_mode; with_total=false
+    убирает заголовок и его стоимость совсем.
+
+    include=answers вкладывает в каждый вопрос до answers_limit первых
+    ответов (одним дополнительным запросом на всю страницу).
+
+    Слабый ETag строится по версиям коллекций: на совпавший If-None-Match
+    отвечаем 304, не выполняя ни выборку, ни подсчёт. Версия ответов входит
+    в ETag всегда - от ответов зависит answers_count в каждой строке.
     """
-    total = (await session.execute(select(func.count(Question.id)))).scalar_one()
-    response.headers["X-Total-Count"] = str(total)
+    models = (Question, Answer)
+    counters = await counting.counter_rows(session, *models)
+    etag = versions_etag(counters, [m.__tablename__ for m in models])
+    if (cached := await cached_page(request, etag)) is not None:
+        return cached
+
+    if with_total:
+        if settings.questions_count_mode == "counter" and Question.__tablename__ in counters:
+            total = counters[Question.__tablename__].value
+        else:
+            total = await counting.total_count(session, Question, settings.questions_count_mode)
+        response.headers["X-Total-Count"] = str(total)
+    if etag is not None:
+        response.headers["ETag"] = etag
+
+    after = None
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor, sort_by, order)
+        except InvalidCursor as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    stmt = page_statement(sort_by, order, limit, offset, after, include == "answers")
+    res = await session.execute(stmt)
+    items = res.scalars().all() if include == "answers" else res.all()
+    # limit=0 - пустая страница без курсора, как раньше
+    if len(items) > limit:
+        items = items[:limit]
+        if items:
+            last = items[-1]
+            response.headers["X-Next-Cursor"] = encode_cursor(
+                sort_by, order, getattr(last, sort_by), last.id
+            )
+    if include == "answers":
+        await _load_answers(session, items, answers_limit)
+        content = [question_dict(i, with_answers=True) for i in items]
+    else:
+        content = [row_dict(i) for i in items]
+    return await store_page(request, etag, json_response(content, response))
+
 
-    order_by_col = Question.id if sort_by == "id" else Question.created_at
-    order_expr = asc(order_by_col) if order == "asc" else desc(order_by_col)
+@router.get("/search", response_model=list[schemas.QuestionRead])
+async def search_questions(
+    response: Response,
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Полнотекстовый поиск по тексту вопросов, от самых релевантных.
 
-    res = await session.execute(select(Question).order_by(order_expr).limit(limit).offset(offset))
-    items = res.scalars().all()
-    return [schemas.QuestionRead.model_validate(i.__dict__) for i in items]
+    Следующая страница - cursor из заголовка X-Next-Cursor.
+    """
+    return await search.run(session, response, Question, QUESTION_COLUMNS, q, limit, cursor)
 
 
-@router.get("/{question_id}", response_model=schemas.QuestionRead)
-async def get_question(question_id: int, session: AsyncSession = Depends(get_session)):
-    """Получить вопрос по id."""
+@router.get("/{question_id}", response_model=schemas.QuestionRead | schemas.QuestionWithAnswers)
+async def get_question(
+    question_id: int,
+    response: Response,
+    include: Include | None = None,
+    answers_limit: int = AnswersLimit,
+    answers_cursor: str | None = None,
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Получить вопрос по id (без include - через кэш по id).
+
+    include=answers вкладывает ответы: до answers_limit штук, дальше -
+    answers_cursor из заголовка X-Next-Answers-Cursor предыдущего ответа.
+    """
+    if include != "answers":
+        key = question_key(question_id)
+        data = await cache.get(key)
+        if data is None:
+            res = await session.execute(select(*QUESTION_COLUMNS).where(Question.id == question_id))
+            row = res.one_or_none()
+            if row is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND, detail="Вопрос не найден"
+                )
+            data = row_dict(row)
+            await cache.set(key, data)
+        return json_response(data)
+
+    after_id = None
+    if answers_cursor is not None:
+        try:
+            _, after_id = decode_cursor(answers_cursor, "id", "asc")
+        except InvalidCursor as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
     res = await session.execute(select(Question).where(Question.id == question_id))
     obj = res.scalar_one_or_none()
     if not obj:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Вопрос не найден")
-    return schemas.QuestionRead.model_validate(obj.__dict__)
+    await _load_answers(session, [obj], answers_limit + 1, after_id)
+
+    item = question_dict(obj, with_answers=True)
+    if len(item["answers"]) > answers_limit:
+        item["answers"] = item["answers"][:answers_limit]
+        last_id = item["answers"][-1]["id"]
+        response.headers["X-Next-Answers-Cursor"] = encode_cursor("id", "asc", last_id, last_id)
+    return json_response(item, response)
 
 
 @router.delete("/{question_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_question(question_id: int, session: AsyncSession = Depends(get_session)):
-    """Удалить вопрос (ответы удаляются каскадом)."""
-    res = await session.execute(select(Question).where(Question.id == question_id))
-    obj = res.scalar_one_or_none()
-    if not obj:
+    """Удалить вопрос вместе с ответами.
+
+    Ответы удаляем явно (DELETE ... RETURNING id), а не только каскадом FK,
+    чтобы знать их id и вычистить из кэша. Вопрос сперва блокируется FOR UPDATE:
+    ответ, вставленный между двумя DELETE, иначе ушёл бы каскадом мимо счётчика.
+    """
+    locked = await session.execute(
+        select(Question.id).where(Question.id == question_id).with_for_update()
+    )
+    if locked.scalar_one_or_none() is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Вопрос не найден")
-    await session.delete(obj)
-    await session.commit()
+    answers = await session.execute(
+        delete(Answer).where(Answer.question_id == question_id).returning(Answer.id)
+    )
+    answer_ids = answers.scalars().all()
+    await session.execute(delete(Question).where(Question.id == question_id))
+    await counting.adjust(session, Question, -1)
+    if answer_ids:
+        await counting.adjust(session, Answer, -len(answer_ids))
+    await counting.commit(session)
+    # после коммита: иначе параллельное чтение могло бы вернуть строку в кэш
+    await cache.delete_many([question_key(question_id), *map(answer_key, answer_ids)])
     logger.info("Удалён вопрос id=%s", question_id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,54 @@
+"""Эндпоинты по пользователю: его ответы."""
+
+from __future__ import annotations
+
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import asc, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import counting, schemas
+from app.core.etag import cached_page, store_page, versions_etag
+from app.core.pagination import InvalidCursor, after_cursor, decode_cursor, encode_cursor
+from app.db import get_read_session
+from app.models import Answer
+from app.responses import ANSWER_COLUMNS, json_response, row_dict
+
+router = APIRouter(prefix="/users", tags=["Пользователи"])
+
+
+@router.get("/{user_id}/answers", response_model=list[schemas.AnswerRead])
+async def list_user_answers(
+    user_id: UUID,
+    request: Request,
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Ответы пользователя по возрастанию id.
+
+    Индекс (user_id, id): keyset через cursor/X-Next-Cursor без сканирования
+    таблицы. ETag/If-None-Match - по версии коллекции ответов.
+    """
+    counters = await counting.counter_rows(session, Answer)
+    etag = versions_etag(counters, [Answer.__tablename__])
+    if (cached := await cached_page(request, etag)) is not None:
+        return cached
+    if etag is not None:
+        response.headers["ETag"] = etag
+
+    stmt = select(*ANSWER_COLUMNS).where(Answer.user_id == user_id).order_by(asc(Answer.id))
+    if cursor is not None:
+        try:
+            _, last_id = decode_cursor(cursor, "id", "asc")
+        except InvalidCursor as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+        stmt = stmt.where(after_cursor(Answer.id, Answer.id, "asc", last_id, last_id))
+
+    items = (await session.execute(stmt.limit(limit + 1))).all()
+    if len(items) > limit:
+        items = items[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor("id", "asc", items[-1].id, items[-1].id)
+    return await store_page(request, etag, json_response([row_dict(i) for i in items], response))
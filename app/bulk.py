@@ -0,0 +1,117 @@
+"""
+Bulk-загрузка: разбор тела (JSON-массив или NDJSON-поток) и вставка пачками.
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from typing import Any, TypeVar
+
+from fastapi import HTTPException, Request, status
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import counting, schemas
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+NDJSON_CONTENT_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+
+# Описание тела для OpenAPI: сам роут читает Request напрямую.
+OPENAPI_BODY: dict[str, Any] = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": {"type": "array", "items": {}}},
+            "application/x-ndjson": {"schema": {"type": "string"}},
+        },
+    }
+}
+
+T = TypeVar("T", bound=BaseModel)
+
+
+async def iter_items(request: Request) -> AsyncIterator[tuple[int, Any]]:
+    """Отдаёт (позиция, сырой элемент) из тела запроса.
+
+    NDJSON читается потоком построчно (элемент - bytes строки), JSON-массив
+    разбирается целиком (элемент - уже распарсенный объект).
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_CONTENT_TYPES:
+        index, tail = 0, b""
+        async for chunk in request.stream():
+            *lines, tail = (tail + chunk).split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield index, line
+                    index += 1
+        if tail.strip():
+            yield index, tail
+        return
+
+    try:
+        data = await request.json()
+    except ValueError:  # JSONDecodeError и UnicodeDecodeError (тело не UTF-8)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Некорректный JSON")
+    if not isinstance(data, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Ожидается JSON-массив")
+    for index, item in enumerate(data):
+        yield index, item
+
+
+def _errors(exc: ValidationError) -> list[dict[str, Any]]:
+    return [{"loc": e["loc"], "msg": e["msg"], "type": e["type"]} for e in exc.errors()]
+
+
+async def ingest(
+    session: AsyncSession,
+    items: AsyncIterator[tuple[int, Any]],
+    schema: type[T],
+    insert_batch: Callable[[AsyncSession, Sequence[T]], Awaitable[Sequence[int]]],
+) -> schemas.BulkResult:
+    """Валидирует элементы схемой и вставляет их пачками по bulk_batch_size.
+
+    Каждая пачка - своя короткая транзакция: ошибка БД откатывает только её,
+    невалидные элементы просто попадают в errors и не мешают остальным.
+    """
+    result = schemas.BulkResult(created=0)
+    batch: list[tuple[int, T]] = []
+
+    async def flush() -> None:
+        try:
+            ids = await insert_batch(session, [obj for _, obj in batch])
+            await counting.commit(session)
+        except SQLAlchemyError as exc:
+            await session.rollback()
+            logger.warning("Bulk-пачка из %s строк не записана: %s", len(batch), exc)
+            for index, _ in batch:
+                result.errors.append(
+                    schemas.BulkItemError(
+                        index=index, errors=[{"msg": "Ошибка записи в БД", "type": "db_error"}]
+                    )
+                )
+        else:
+            result.ids.extend(ids)
+            result.created += len(ids)
+        batch.clear()
+
+    async for index, raw in items:
+        try:
+            if isinstance(raw, bytes):
+                obj = schema.model_validate_json(raw)
+            else:
+                obj = schema.model_validate(raw)
+        except ValidationError as exc:
+            result.errors.append(schemas.BulkItemError(index=index, errors=_errors(exc)))
+            continue
+        batch.append((index, obj))
+        if len(batch) >= settings.bulk_batch_size:
+            await flush()
+
+    if batch:
+        await flush()
+    return result
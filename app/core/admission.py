@@ -0,0 +1,156 @@
+"""
+Допуск запросов (admission control): ограничение конкурентности перед пулом БД.
+
+Запросы делятся на группы: export (потоковые выгрузки /export/), read
+(остальные GET/HEAD) и write (остальные методы). Выгрузка занимает место
+минутами, поэтому у неё своя маленькая группа и короткие чтения она не
+вытесняет. Лимиты read и write по умолчанию - размер пула движка
+(pool_size + max_overflow): больше запросов одновременно соединение всё
+равно не получат. В каждой группе одновременно работает не больше limit
+запросов; остальные
+ждут место в короткой очереди - не дольше admission_max_wait секунд и не
+больше admission_max_queue штук. Кто не дождался - сразу 503 с
+Retry-After: хвост задержек ограничен, вместо того чтобы все запросы
+медленно копились в ожидании соединения из пула.
+
+Вторая граница - sql_pool_timeout: запрос, не получивший соединение из
+пула за это время, тоже получает 503 (см. pool_timeout_handler).
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Collection
+
+from fastapi import Request
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core import metrics
+from app.core.settings import settings
+from app.responses import ORJSONResponse
+
+IN_FLIGHT = metrics.registry.register(
+    metrics.Gauge("admission_in_flight", "Запросы, допущенные к обработке", ("group",))
+)
+QUEUE_DEPTH = metrics.registry.register(
+    metrics.Gauge("admission_queue_depth", "Запросы, ждущие допуска", ("group",))
+)
+REJECTED = metrics.registry.register(
+    metrics.Counter(
+        "admission_rejected_total",
+        "Запросы, отклонённые с 503 (queue_full, timeout, pool_timeout)",
+        ("group", "reason"),
+    )
+)
+
+READ_METHODS = frozenset({"GET", "HEAD"})
+EXPORT_PREFIX = "/export/"
+
+
+class Overloaded(Exception):
+    """Места в группе не нашлось: очередь полна или ожидание дольше max_wait."""
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Limiter:
+    """Семафор группы со счётчиком ожидающих и ограниченным ожиданием."""
+
+    def __init__(self, group: str, limit: int, max_queue: int, max_wait: float) -> None:
+        self.group = group
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        self.waiting = 0
+        self._sem = asyncio.Semaphore(limit)
+        IN_FLIGHT.set_function(lambda: self.active, group)
+        QUEUE_DEPTH.set_function(lambda: self.waiting, group)
+
+    async def acquire(self) -> None:
+        if self._sem.locked():
+            if self.waiting >= self.max_queue:
+                raise Overloaded("queue_full")
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._sem.acquire(), self.max_wait)
+            except TimeoutError:
+                raise Overloaded("timeout") from None
+            finally:
+                self.waiting -= 1
+        else:
+            await self._sem.acquire()
+        self.active += 1
+
+    def release(self) -> None:
+        self.active -= 1
+        self._sem.release()
+
+
+def _limiter(group: str, limit: int | None) -> Limiter | None:
+    if limit is None:
+        limit = settings.sql_pool_size + settings.sql_max_overflow
+    if limit <= 0:
+        return None
+    return Limiter(group, limit, settings.admission_max_queue, settings.admission_max_wait)
+
+
+limiters: dict[str, Limiter | None] = {
+    "read": _limiter("read", settings.admission_read_limit),
+    "write": _limiter("write", settings.admission_write_limit),
+    "export": _limiter("export", settings.admission_export_limit),
+}
+
+
+def group_of(method: str, path: str) -> str:
+    if method not in READ_METHODS:
+        return "write"
+    return "export" if path.startswith(EXPORT_PREFIX) else "read"
+
+
+def overloaded_response(detail: str) -> ORJSONResponse:
+    return ORJSONResponse(
+        {"detail": detail},
+        status_code=503,
+        headers={"Retry-After": str(settings.admission_retry_after)},
+    )
+
+
+class AdmissionMiddleware:
+    """Чистый ASGI-middleware: допуск HTTP-запроса в группу read/write/export.
+
+    Пути из exempt (проверки живости, /metrics) и OPTIONS не ограничиваются.
+    Место в группе держится до конца отдачи ответа.
+    """
+
+    def __init__(self, app: ASGIApp, exempt: Collection[str] = ()) -> None:
+        self.app = app
+        self.exempt = frozenset(exempt)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or scope["path"] in self.exempt:
+            await self.app(scope, receive, send)
+            return
+        group = group_of(scope["method"], scope["path"])
+        limiter = limiters.get(group)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await limiter.acquire()
+        except Overloaded as exc:
+            REJECTED.inc(group, exc.reason)
+            await overloaded_response("Сервис перегружен, повторите позже")(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+
+async def pool_timeout_handler(request: Request, exc: Exception) -> ORJSONResponse:
+    """sqlalchemy.exc.TimeoutError (нет соединения в пуле за sql_pool_timeout) -> 503."""
+    REJECTED.inc(group_of(request.method, request.url.path), "pool_timeout")
+    return overloaded_response("Нет свободного соединения с БД, повторите позже")
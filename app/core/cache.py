@@ -0,0 +1,157 @@
+"""
+Кэш объектов по id: LRU + TTL в памяти процесса, с подменяемым бэкендом.
+
+Вопросы и ответы после создания не меняются (API их только создаёт и
+удаляет), поэтому кэш достаточно чистить при удалении.
+"""
+
+from __future__ import annotations
+
+import importlib
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from typing import Any, Protocol
+
+from app.core.settings import settings
+
+
+class CacheBackend(Protocol):
+    """Интерфейс бэкенда кэша.
+
+    Методы асинхронные, чтобы за ним мог стоять общий для нескольких
+    воркеров uvicorn сервис (Redis и т.п.), а не только память процесса.
+    """
+
+    async def get(self, key: str) -> Any | None: ...
+
+    async def set(self, key: str, value: Any, ttl: float | None = None) -> None: ...
+
+    async def delete_many(self, keys: Iterable[str]) -> None: ...
+
+    def clear(self) -> None: ...
+
+    def stats(self) -> dict[str, int]: ...
+
+
+class MemoryCache:
+    """LRU-кэш с TTL в памяти процесса.
+
+    С max_bytes и weigh (размер значения в байтах) вытесняет старые записи
+    и по суммарному размеру; значение больше max_bytes не кладётся вовсе.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: float,
+        max_bytes: int = 0,
+        weigh: Callable[[Any], int] | None = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes if weigh is not None else 0
+        self.weigh = weigh
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._sizes: dict[str, int] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop(self, key: str) -> None:
+        if self._data.pop(key, None) is not None:
+            self.bytes -= self._sizes.pop(key, 0)
+
+    async def get(self, key: str) -> Any | None:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._drop(key)
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        self._drop(key)
+        if self.max_bytes and self.weigh is not None:
+            size = self.weigh(value)
+            if size > self.max_bytes:
+                return
+            self._sizes[key] = size
+            self.bytes += size
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        while len(self._data) > self.max_entries or (
+            self.max_bytes and self.bytes > self.max_bytes
+        ):
+            self._drop(next(iter(self._data)))
+            self.evictions += 1
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self._drop(key)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._sizes.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._data),
+            "bytes": self.bytes,
+        }
+
+
+class NullCache:
+    """Кэш выключен: всегда промах."""
+
+    async def get(self, key: str) -> Any | None:
+        return None
+
+    async def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        return None
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        return None
+
+    def clear(self) -> None:
+        return None
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": 0, "misses": 0, "evictions": 0, "size": 0, "bytes": 0}
+
+
+def build_backend(spec: str, max_entries: int, ttl: float) -> CacheBackend:
+    """Бэкенд по строке: memory | none | "модуль:Класс" (получает max_entries и ttl)."""
+    if spec == "memory":
+        return MemoryCache(max_entries, ttl)
+    if spec == "none":
+        return NullCache()
+    module_name, _, class_name = spec.partition(":")
+    cls = getattr(importlib.import_module(module_name), class_name)
+    return cls(max_entries=max_entries, ttl=ttl)
+
+
+def build_cache() -> CacheBackend:
+    """Кэш объектов по settings.cache_backend: memory | none | "модуль:Класс"."""
+    return build_backend(settings.cache_backend, settings.cache_max_entries, settings.cache_ttl)
+
+
+def question_key(question_id: int) -> str:
+    return f"question:{question_id}"
+
+
+def answer_key(answer_id: int) -> str:
+    return f"answer:{answer_id}"
+
+
+cache: CacheBackend = build_cache()
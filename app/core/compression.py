@@ -0,0 +1,273 @@
+"""
+Сжатие ответов: gzip, а также br и zstd, если установлены brotli/zstandard
+(`poetry install --extras compression`).
+
+Кодировка выбирается по Accept-Encoding (q-значения, при равенстве -
+порядок COMPRESSION_ENCODINGS). Тела меньше compression_min_size байт не
+сжимаются: выигрыш меньше затрат. Сжимаются только текстовые типы
+(JSON, NDJSON, CSV, text/*); потоковые ответы (экспорт) - кусками, каждый
+кусок выталкивается сразу.
+
+Страницы из кэша страниц (app.core.etag) сжимаются один раз на кодировку:
+сжатые байты лежат в той же записи кэша рядом с исходными.
+"""
+
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import zlib
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from types import ModuleType
+
+from fastapi import Request, Response
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+from app.core.settings import settings
+
+RESPONSES = metrics.registry.register(
+    metrics.Counter(
+        "http_compression_responses_total",
+        "Сжатые ответы (source: compressed, stream, cache)",
+        ("encoding", "source"),
+    )
+)
+SKIPPED = metrics.registry.register(
+    metrics.Counter(
+        "http_compression_skipped_total",
+        "Ответы, отданные без сжатия (small, not_accepted)",
+        ("reason",),
+    )
+)
+ORIGINAL_BYTES = metrics.registry.register(
+    metrics.Counter(
+        "http_compression_original_bytes_total",
+        "Байты сжатых ответов до сжатия",
+        ("encoding",),
+    )
+)
+SENT_BYTES = metrics.registry.register(
+    metrics.Counter(
+        "http_compression_sent_bytes_total",
+        "Байты сжатых ответов после сжатия",
+        ("encoding",),
+    )
+)
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/problem+json",
+    "text/",
+)
+
+
+def _optional(name: str) -> ModuleType | None:
+    return importlib.import_module(name) if importlib.util.find_spec(name) else None
+
+
+brotli = _optional("brotli")
+zstandard = _optional("zstandard")
+
+
+class Stream:
+    """Потоковое сжатие: chunk() сжимает кусок и выталкивает его, finish() закрывает поток."""
+
+    def __init__(self, chunk: Callable[[bytes], bytes], finish: Callable[[], bytes]) -> None:
+        self.chunk = chunk
+        self.finish = finish
+
+
+@dataclass(frozen=True)
+class Codec:
+    name: str
+    compress: Callable[[bytes], bytes]
+    stream: Callable[[], Stream]
+
+
+def _gzip_stream() -> Stream:
+    c = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 31)
+    return Stream(lambda data: c.compress(data) + c.flush(zlib.Z_SYNC_FLUSH), c.flush)
+
+
+def _codecs() -> dict[str, Codec]:
+    codecs = {
+        "gzip": Codec(
+            "gzip",
+            lambda body: zlib.compress(body, settings.compression_gzip_level, wbits=31),
+            _gzip_stream,
+        )
+    }
+    if brotli is not None:
+
+        def br_stream() -> Stream:
+            c = brotli.Compressor(quality=settings.compression_brotli_quality)
+            return Stream(lambda data: c.process(data) + c.flush(), c.finish)
+
+        codecs["br"] = Codec(
+            "br",
+            lambda body: brotli.compress(body, quality=settings.compression_brotli_quality),
+            br_stream,
+        )
+    if zstandard is not None:
+
+        def zstd_stream() -> Stream:
+            c = zstandard.ZstdCompressor(level=settings.compression_zstd_level).compressobj()
+            return Stream(
+                lambda data: c.compress(data) + c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK),
+                c.flush,
+            )
+
+        codecs["zstd"] = Codec(
+            "zstd",
+            lambda body: zstandard.ZstdCompressor(level=settings.compression_zstd_level).compress(
+                body
+            ),
+            zstd_stream,
+        )
+    return codecs
+
+
+CODECS = _codecs()
+
+
+def available() -> list[str]:
+    """Кодировки в порядке предпочтения сервера: из настроек и только установленные."""
+    names = (n.strip().lower() for n in settings.compression_encodings.split(","))
+    return [n for n in names if n in CODECS]
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    """Лучшая доступная кодировка для Accept-Encoding; None - отдавать как есть."""
+    if not accept_encoding:
+        return None
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name := name.strip().lower():
+            weights[name] = q
+    best, best_q = None, 0.0
+    for name in available():
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def compressible(headers: Mapping[str, str], size: int | None) -> bool:
+    """Тип текстовый, тело ещё не сжато и (если размер известен) не меньше порога."""
+    if "content-encoding" in headers or "no-transform" in headers.get("cache-control", ""):
+        return False
+    if not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES):
+        return False
+    return size is None or size >= settings.compression_min_size
+
+
+def choose(request: Request, body: bytes, headers: Mapping[str, str]) -> str | None:
+    """Кодировка для готового тела роута (кэш страниц); None - сжимать не нужно."""
+    if not settings.compression or request.method == "HEAD":
+        return None
+    if not compressible(headers, len(body)):
+        return None
+    return negotiate(request.headers.get("accept-encoding"))
+
+
+def record(encoding: str, source: str, original: int, sent: int) -> None:
+    RESPONSES.inc(encoding, source)
+    ORIGINAL_BYTES.inc(encoding, amount=original)
+    SENT_BYTES.inc(encoding, amount=sent)
+
+
+def encoded_response(
+    body: bytes, headers: Mapping[str, str], encoding: str, data: bytes, source: str
+) -> Response:
+    """Ответ со сжатым телом data; body - исходное (для метрик)."""
+    record(encoding, source, len(body), len(data))
+    out = Response(
+        content=data, headers={k: v for k, v in headers.items() if k != "content-length"}
+    )
+    out.headers["Content-Encoding"] = encoding
+    out.headers.add_vary_header("Accept-Encoding")
+    return out
+
+
+class CompressionMiddleware:
+    """Чистый ASGI-middleware: сжимает ответы по Accept-Encoding.
+
+    Уже сжатые ответы (Content-Encoding - например, из кэша страниц)
+    пропускаются как есть. Vary: Accept-Encoding ставится на каждый ответ,
+    который мог быть сжат, - и когда клиент сжатие не принимает.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.compression or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept = next((v for k, v in scope["headers"] if k == b"accept-encoding"), b"")
+        encoding = negotiate(accept.decode("latin-1"))
+        start: Message | None = None
+        stream: Stream | None = None
+        original = sent = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, stream, original, sent
+            if message["type"] == "http.response.start":
+                # заголовки отправим вместе с первым куском тела: до него размер неизвестен
+                start = message
+                return
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if stream is not None and message["type"] == "http.response.body":
+                data = stream.chunk(body) + (b"" if more else stream.finish())
+                original, sent = original + len(body), sent + len(data)
+                if not more:
+                    record(encoding, "stream", original, sent)
+                await send({"type": "http.response.body", "body": data, "more_body": more})
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            head, start = start, None
+            headers = MutableHeaders(scope=head)
+            if not compressible(headers, None if more else len(body)):
+                if not more and compressible(headers, None):
+                    SKIPPED.inc("small")
+                await send(head)
+                await send(message)
+                return
+            headers.add_vary_header("Accept-Encoding")
+            if encoding is None:
+                SKIPPED.inc("not_accepted")
+                await send(head)
+                await send(message)
+                return
+            codec = CODECS[encoding]
+            headers["Content-Encoding"] = encoding
+            if more:
+                del headers["Content-Length"]
+                stream = codec.stream()
+                data = stream.chunk(body)
+                original, sent = len(body), len(data)
+            else:
+                data = codec.compress(body)
+                headers["Content-Length"] = str(len(data))
+                record(encoding, "compressed", len(body), len(data))
+            await send(head)
+            await send({"type": "http.response.body", "body": data, "more_body": more})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,107 @@
+"""
+Условные GET для списков: слабые ETag по версии коллекции и кэш страниц.
+
+Версия коллекции (row_counter.version) растёт при каждом create/delete,
+поэтому одинаковый URL при одинаковой версии отдаёт одинаковые байты.
+Сжатые варианты страницы (по одному на кодировку) хранятся в той же записи
+кэша: повторный запрос страницы её уже не сжимает.
+
+Страницы лежат в своём кэше pages, а не в кэше объектов: записи крупные,
+и в памяти он ограничен суммарным размером (page_cache_max_bytes), а не
+только числом записей.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence
+from typing import Any
+
+from fastapi import Request, Response, status
+
+from app.core import compression
+from app.core.cache import CacheBackend, MemoryCache, build_backend
+from app.core.settings import settings
+
+
+def _page_size(entry: tuple[bytes, Mapping[str, str], Mapping[str, bytes]]) -> int:
+    body, _, encoded = entry
+    return len(body) + sum(map(len, encoded.values()))
+
+
+def _page_store() -> CacheBackend:
+    if settings.cache_backend == "memory":
+        return MemoryCache(
+            settings.page_cache_max_entries,
+            settings.page_cache_ttl,
+            max_bytes=settings.page_cache_max_bytes,
+            weigh=_page_size,
+        )
+    return build_backend(
+        settings.cache_backend, settings.page_cache_max_entries, settings.page_cache_ttl
+    )
+
+
+pages: CacheBackend = _page_store()
+
+
+def versions_etag(rows: Mapping[str, Any], names: Sequence[str]) -> str | None:
+    """W/"question-12.answers-40" из строк row_counter; None, если версии нет."""
+    if any(name not in rows for name in names):
+        return None
+    return 'W/"' + ".".join(f"{name}-{rows[name].version}" for name in names) + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Слабое сравнение If-None-Match (RFC 9110): W/ не учитываем, «*» совпадает всегда."""
+    if not if_none_match:
+        return False
+    wanted = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == wanted:
+            return True
+    return False
+
+
+def _page_key(request: Request, etag: str) -> str:
+    return f"page:{request.url.path}?{request.url.query}:{etag}"
+
+
+async def cached_page(request: Request, etag: str | None) -> Response | None:
+    """304 на совпавший If-None-Match или готовая страница из кэша, иначе None."""
+    if etag is None:
+        return None
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    if not settings.page_cache:
+        return None
+    key = _page_key(request, etag)
+    hit = await pages.get(key)
+    if hit is None:
+        return None
+    body, headers, encoded = hit
+    if (encoding := compression.choose(request, body, headers)) is None:
+        return Response(content=body, headers=headers)
+    if encoding in encoded:
+        return compression.encoded_response(body, headers, encoding, encoded[encoding], "cache")
+    # этой кодировки в записи ещё нет: сжимаем один раз и дописываем
+    encoded = {**encoded, encoding: compression.CODECS[encoding].compress(body)}
+    await pages.set(key, (body, headers, encoded))
+    return compression.encoded_response(body, headers, encoding, encoded[encoding], "compressed")
+
+
+async def store_page(request: Request, etag: str | None, response: Response) -> Response:
+    """Кладёт отрендеренную страницу в кэш под текущей версией коллекции.
+
+    Если клиент принимает сжатие, страница сжимается здесь же, и сжатые
+    байты ложатся в кэш рядом с исходными.
+    """
+    if etag is None or not settings.page_cache:
+        return response
+    body, headers = bytes(response.body), dict(response.headers)
+    encoding = compression.choose(request, body, headers)
+    encoded = {encoding: compression.CODECS[encoding].compress(body)} if encoding else {}
+    await pages.set(_page_key(request, etag), (body, headers, encoded))
+    if encoding is None:
+        return response
+    return compression.encoded_response(body, headers, encoding, encoded[encoding], "compressed")
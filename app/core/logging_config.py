@@ -1,13 +1,180 @@
-"""Минимальная конфигурация логирования."""
+"""Конфигурация логирования: текст для разработки, JSON через очередь для прода.
+
+В режиме json обработчики в event loop только кладут запись в ограниченную
+очередь (QueueHandler); форматирование и запись в stderr делает фоновый
+поток QueueListener. Если sink не успевает и очередь полна, запись
+отбрасывается и учитывается в счётчике - цикл событий не ждёт.
+"""
 
 from __future__ import annotations
 
+import atexit
+import copy
 import logging
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from logging.handlers import QueueHandler, QueueListener
+
+import orjson
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+from app.core.settings import settings
+
+request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+trace_id: ContextVar[str | None] = ContextVar("trace_id", default=None)
+
+LOGS_DROPPED = metrics.registry.register(
+    metrics.Counter("log_records_dropped_total", "Записи лога, отброшенные при полной очереди")
+)
+
+_listener: QueueListener | None = None
+
+
+class ContextFilter(logging.Filter):
+    """Добавляет к записи request_id/trace_id текущего запроса.
+
+    Выполняется в потоке, который пишет в лог, - только там видны contextvars.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        record.trace_id = trace_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает долю rate записей уровня INFO и ниже; WARNING и выше - всегда."""
+
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.INFO or random.random() < self.rate
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler, который не блокируется на полной очереди, а считает потери."""
+
+    def __init__(self, q: queue.Queue) -> None:
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # только подставляем аргументы; JSON собирает фоновый поток
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOGS_DROPPED.inc()
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна строка JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, UTC).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "trace_id": getattr(record, "trace_id", None),
+        }
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        elif record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return orjson.dumps(data).decode()
+
+
+def shutdown_logging() -> None:
+    """Дописывает очередь и останавливает фоновый поток (при остановке приложения)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
 
 
 def configure_logging() -> None:
-    """Включает структурированное логирование."""
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
-    )
+    """Текстовый лог в stderr (LOG_FORMAT=text) или JSON-строки через очередь (json)."""
+    if settings.log_format != "json":
+        logging.basicConfig(
+            level=settings.log_level,
+            format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+        )
+        return
+
+    shutdown_logging()
+    global _listener
+    q: queue.Queue[logging.LogRecord] = queue.Queue(maxsize=settings.log_queue_size)
+    sink = logging.StreamHandler(sys.stderr)
+    sink.setFormatter(JsonFormatter())
+    _listener = QueueListener(q, sink, respect_handler_level=True)
+    _listener.start()
+
+    handler = DroppingQueueHandler(q)
+    handler.addFilter(SamplingFilter(settings.log_info_sample_rate))
+    handler.addFilter(ContextFilter())
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(settings.log_level)
+    atexit.register(shutdown_logging)
+
+
+def _header(scope: Scope, name: bytes) -> str | None:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class RequestIdMiddleware:
+    """Чистый ASGI-middleware: request_id и trace_id для всех записей лога запроса.
+
+    request_id берётся из X-Request-ID (или генерируется) и возвращается в
+    ответе; trace_id - из W3C traceparent, если его прислал прокси/клиент.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # чужой заголовок в лог и в ответ - только ограниченной длины
+        rid = (_header(scope, b"x-request-id") or "")[:64] or uuid.uuid4().hex
+        traceparent = _header(scope, b"traceparent")
+        parts = traceparent.split("-") if traceparent else []
+        rid_token = request_id.set(rid)
+        trace_token = trace_id.set(parts[1] if len(parts) == 4 else None)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = [*message.get("headers", []), (b"x-request-id", rid.encode("latin-1"))]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id.reset(rid_token)
+            trace_id.reset(trace_token)
@@ -0,0 +1,297 @@
+"""
+Метрики в текстовом формате Prometheus (exposition format 0.0.4).
+
+Свой маленький реестр вместо prometheus_client: запись метрики на пути
+запроса - это поиск в dict и bisect по границам бакетов, всё остальное
+(кумулятивные суммы, форматирование, опрос пула) делается только при
+чтении /metrics. Метрики живут в памяти процесса: при нескольких
+воркерах uvicorn каждый отдаёт свои.
+"""
+
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import request_stats
+
+LabelValues = tuple[str, ...]
+
+# границы бакетов (секунды): запросы - от 1 мс до 10 с, SQL - от 0.1 мс
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = labels
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        """Обнулить значения (для тестов)."""
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help, labels)
+        self.values: dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_labels(self.label_names, k)} {_number(v)}"
+            for k, v in sorted(self.values.items())
+        ]
+
+    def reset(self) -> None:
+        self.values.clear()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = ()
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets) or REQUEST_BUCKETS
+        # на метку: [счётчики по бакетам (последний - +Inf), сумма]
+        self.values: dict[LabelValues, list[Any]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, (counts, total) in sorted(self.values.items()):
+            running = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                running += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {running}")
+        return lines
+
+    def reset(self) -> None:
+        self.values.clear()
+
+
+class Gauge(Metric):
+    """Значение считается при чтении /metrics функцией-источником.
+
+    kind="counter" - для монотонных счётчиков, которые ведёт кто-то другой.
+    """
+
+    def __init__(
+        self, name: str, help: str, labels: tuple[str, ...] = (), kind: str = "gauge"
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.kind = kind
+        self.sources: dict[LabelValues, Callable[[], float | None]] = {}
+
+    def set_function(self, source: Callable[[], float | None], *labels: str) -> None:
+        self.sources[labels] = source
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, source in sorted(self.sources.items()):
+            value = source()
+            if value is not None:
+                lines.append(f"{self.name}{_labels(self.label_names, key)} {_number(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Any:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self.metrics:
+            samples = metric.samples()
+            if samples:
+                lines += metric.header() + samples
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        for metric in self.metrics:
+            metric.reset()
+
+
+registry = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REQUESTS = registry.register(
+    Counter("http_requests_total", "HTTP-запросы", ("method", "route", "status"))
+)
+REQUEST_SECONDS = registry.register(
+    Histogram("http_request_duration_seconds", "Время обработки запроса", ("method", "route"))
+)
+SQL_SECONDS = registry.register(
+    Histogram(
+        "db_statement_duration_seconds",
+        "Время SQL-выражения в драйвере",
+        ("engine", "operation"),
+        buckets=SQL_BUCKETS,
+    )
+)
+SQL_ERRORS = registry.register(
+    Counter("db_statement_errors_total", "SQL-выражения, завершившиеся ошибкой", ("engine",))
+)
+POOL_WAIT_SECONDS = registry.register(
+    Histogram(
+        "db_pool_wait_seconds",
+        "Ожидание свободного соединения в пуле",
+        ("engine",),
+        buckets=SQL_BUCKETS,
+    )
+)
+POOL_CHECKED_OUT = registry.register(
+    Gauge("db_pool_checked_out", "Соединения, выданные из пула", ("engine",))
+)
+POOL_OVERFLOW = registry.register(
+    Gauge(
+        "db_pool_overflow",
+        "Соединения сверх pool_size (отрицательное - ещё не открыты)",
+        ("engine",),
+    )
+)
+POOL_SIZE = registry.register(Gauge("db_pool_size", "Размер пула (pool_size)", ("engine",)))
+CACHE_EVENTS = registry.register(
+    Gauge("cache_events_total", "Попадания/промахи/вытеснения кэша по id", ("event",), "counter")
+)
+CACHE_SIZE = registry.register(Gauge("cache_entries", "Записей в кэше по id"))
+PAGE_CACHE_BYTES = registry.register(
+    Gauge("page_cache_bytes", "Байт в кэше страниц (тела и их сжатые варианты)")
+)
+
+
+class MetricsMiddleware:
+    """Чистый ASGI-middleware: счётчик и гистограмма по шаблону маршрута.
+
+    Шаблон (/questions/{question_id}) берётся из scope["route"], который
+    FastAPI кладёт при маршрутизации, - у сырых путей была бы
+    неограниченная кардинальность меток.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = request_stats.route_template(scope)
+            method = scope["method"]
+            REQUEST_SECONDS.observe(time.perf_counter() - started, method, route)
+            REQUESTS.inc(method, route, str(status))
+
+
+def _operation(statement: str) -> str:
+    head = statement.lstrip()[:16].split(None, 1)
+    return head[0].upper() if head else ""
+
+
+def instrument_engine(engine: AsyncEngine, name: str) -> None:
+    """Время каждого SQL-выражения, ошибки и состояние пула движка.
+
+    Каждое выражение также попадает в статистику текущего HTTP-запроса.
+
+    Время ожидания соединения пишет сам пул (app.db.TimedQueuePool).
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+        SQL_SECONDS.observe(elapsed, name, _operation(statement))
+        stats = request_stats.current.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        SQL_ERRORS.inc(name)
+        stack = context.connection.info.get("metrics_started") if context.connection else None
+        if not stack:
+            return
+        # упавшее выражение (например, нарушение FK) - тоже раундтрип запроса
+        elapsed = time.perf_counter() - stack.pop()
+        stats = request_stats.current.get()
+        if stats is not None and context.statement is not None:
+            stats.record(context.statement, elapsed)
+
+    def pool_stat(method: str) -> Callable[[], float | None]:
+        def read() -> float | None:
+            # пул пересоздаётся при dispose() - берём текущий
+            fn = getattr(sync_engine.pool, method, None)
+            return fn() if fn is not None else None
+
+        return read
+
+    POOL_CHECKED_OUT.set_function(pool_stat("checkedout"), name)
+    POOL_OVERFLOW.set_function(pool_stat("overflow"), name)
+    POOL_SIZE.set_function(pool_stat("size"), name)
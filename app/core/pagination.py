@@ -0,0 +1,85 @@
+"""Keyset-пагинация: непрозрачный курсор и условие «после курсора»."""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+import math
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import ColumnElement, tuple_
+
+
+class InvalidCursor(ValueError):
+    """Курсор не удалось разобрать или он от другой сортировки."""
+
+
+def _dump_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+# id и answers_count - Integer (int4 в Postgres): большее значение asyncpg не передаст
+INT_MIN, INT_MAX = -(2**31), 2**31 - 1
+
+
+def _integer(value: Any) -> int:
+    if isinstance(value, bool) or not isinstance(value, int) or not INT_MIN <= value <= INT_MAX:
+        raise InvalidCursor("Некорректный курсор")
+    return value
+
+
+def _number(value: Any) -> float:
+    if isinstance(value, bool) or not isinstance(value, int | float) or not math.isfinite(value):
+        raise InvalidCursor("Некорректный курсор")
+    return value
+
+
+def encode_cursor(sort_by: str, order: str, value: Any, last_id: int) -> str:
+    """Упаковывает позицию последней строки страницы в base64url-строку."""
+    payload = {"s": sort_by, "o": order, "v": _dump_value(value), "id": last_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, sort_by: str, order: str) -> tuple[Any, int]:
+    """Возвращает (значение сортировки, id) из курсора.
+
+    Курсор годится только для той же пары sort_by/order, с которой он выдан.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if payload["s"] != sort_by or payload["o"] != order:
+            raise InvalidCursor("Курсор выдан для другой сортировки")
+        last_id = _integer(payload["id"])
+        value = payload["v"]
+        # значение уходит в запрос параметром: тип проверяем здесь, а не ошибкой БД
+        if sort_by == "created_at":
+            value = datetime.fromisoformat(value)
+        elif sort_by == "score":
+            value = _number(value)
+        else:
+            value = _integer(value)
+    except InvalidCursor:
+        raise
+    except (binascii.Error, ValueError, KeyError, TypeError) as exc:
+        raise InvalidCursor("Некорректный курсор") from exc
+    return value, last_id
+
+
+def after_cursor(
+    sort_col: Any, id_col: Any, order: str, value: Any, last_id: int
+) -> ColumnElement[bool]:
+    """Условие «строго после курсора» для сортировки (sort_col, id).
+
+    Сравнение кортежей (row values) и Postgres, и SQLite умеют вести
+    по составному индексу (sort_col, id), а id разрешает ничьи по sort_col.
+    """
+    if sort_col is id_col:
+        return id_col > last_id if order == "asc" else id_col < last_id
+    left, right = tuple_(sort_col, id_col), tuple_(value, last_id)
+    return left > right if order == "asc" else left < right
@@ -0,0 +1,121 @@
+"""
+Сколько работы с БД сделал запрос: число SQL-выражений и время в драйвере.
+
+Статистика запроса лежит в contextvar; её пополняют события движков
+(см. app.core.metrics.instrument_engine), так что учитываются все сессии
+запроса - и get_session, и get_read_session. Итог уходит клиенту в
+заголовке Server-Timing, а выход за бюджет пишется в лог предупреждением.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RequestStats:
+    started: float = field(default_factory=time.perf_counter)
+    statements: int = 0
+    db_seconds: float = 0.0
+    # текст выражения -> сколько раз выполнено (для поиска N+1)
+    repeats: dict[str, int] = field(default_factory=dict)
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.statements += 1
+        self.db_seconds += seconds
+        self.repeats[statement] = self.repeats.get(statement, 0) + 1
+
+    def server_timing(self) -> str:
+        """db;dur=<мс в БД>, sql;desc=<выражений>, app;dur=<мс всего>."""
+        total = (time.perf_counter() - self.started) * 1000
+        return (
+            f"db;dur={self.db_seconds * 1000:.3f}, sql;desc={self.statements}, "
+            f"app;dur={total:.3f}"
+        )
+
+
+current: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def route_template(scope: Scope) -> str:
+    """Шаблон маршрута (/questions/{question_id}) из scope после маршрутизации."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def parse_server_timing(header: str) -> dict[str, str]:
+    """Server-Timing -> {метрика: dur или desc} (для тестов и клиентов)."""
+    result = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        result[name] = params.partition("=")[2]
+    return result
+
+
+def _check_budget(scope: Scope, stats: RequestStats) -> None:
+    elapsed_ms = (time.perf_counter() - stats.started) * 1000
+    route = f'{scope["method"]} {route_template(scope)}'
+    if stats.statements > settings.request_query_budget:
+        logger.warning(
+            "%s: %s SQL-выражений (бюджет %s)",
+            route,
+            stats.statements,
+            settings.request_query_budget,
+        )
+    if elapsed_ms > settings.request_latency_budget_ms:
+        logger.warning(
+            "%s: %.1f мс, из них в БД %.1f мс (бюджет %s мс)",
+            route,
+            elapsed_ms,
+            stats.db_seconds * 1000,
+            settings.request_latency_budget_ms,
+        )
+    statement, times = max(stats.repeats.items(), key=lambda kv: kv[1], default=("", 0))
+    if times >= settings.n_plus_one_threshold:
+        logger.warning(
+            "%s: похоже на N+1 - одно выражение выполнено %s раз: %s",
+            route,
+            times,
+            " ".join(statement.split())[:200],
+        )
+
+
+class RequestStatsMiddleware:
+    """Чистый ASGI-middleware: заводит статистику запроса и пишет Server-Timing.
+
+    Заголовок ставится в момент начала ответа: у потоковых ответов (экспорт)
+    выражения, выполненные уже во время отдачи тела, в него не попадают.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and settings.server_timing:
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current.reset(token)
+            _check_budget(scope, stats)
@@ -0,0 +1,194 @@
+"""
+Подсчёт строк для X-Total-Count без COUNT(*) на каждую страницу.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import Counter
+from typing import Any, Literal
+
+from sqlalchemy import Row, event, func, insert, select, text, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, SessionTransaction
+
+from app.core.settings import settings
+from app.models import Base, Question, RowCounter
+
+logger = logging.getLogger(__name__)
+
+CountMode = Literal["exact", "counter", "cached", "approximate"]
+
+# name таблицы -> (момент протухания по monotonic, значение)
+_cached_counts: dict[str, tuple[float, int]] = {}
+
+# ключ session.info: сдвиги счётчиков, ждущие коммита
+_PENDING = "row_counter_pending"
+
+
+async def exact_count(session: AsyncSession, model: type[Base]) -> int:
+    """Честный COUNT(*) по таблице модели."""
+    return (await session.execute(select(func.count()).select_from(model))).scalar_one()
+
+
+async def adjust(session: AsyncSession, model: type[Base], delta: int) -> None:
+    """Запоминает сдвиг счётчика таблицы на delta; применит его commit().
+
+    Саму строку row_counter пишущая транзакция не трогает: строка одна на
+    таблицу, и UPDATE в ней держал бы блокировку до коммита - все записи в
+    таблицу шли бы через неё по одной. Откат сессии сдвиги забывает.
+    """
+    pending = session.info.setdefault(_PENDING, Counter())
+    pending[model] += delta
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget(session: Session, previous_transaction: SessionTransaction) -> None:
+    if not previous_transaction.nested:
+        session.info.pop(_PENDING, None)
+
+
+async def commit(session: AsyncSession) -> None:
+    """Коммитит транзакцию, затем отдельной короткой применяет сдвиги adjust().
+
+    Во второй транзакции - только UPDATE row_counter (по таблицам в одном
+    порядке); на Postgres с synchronous_commit = off, чтобы блокировка строки
+    не ждала сброса WAL. Данные к этому моменту уже записаны, поэтому ошибка
+    здесь не пробрасывается: счётчик отстанет до следующей записи в таблицу,
+    точные значения восстановит python -m app.jobs.answers_count.
+    """
+    await session.commit()
+    pending = session.info.pop(_PENDING, None)
+    if not pending:
+        return
+    try:
+        if session.get_bind().dialect.name == "postgresql":
+            await session.execute(text("SET LOCAL synchronous_commit = off"))
+        for model, delta in sorted(pending.items(), key=lambda i: i[0].__tablename__):
+            await _bump(session, model, delta)
+        await session.commit()
+    except SQLAlchemyError:
+        await session.rollback()
+        logger.exception(
+            "row_counter не обновлён: %s", {m.__tablename__: d for m, d in pending.items()}
+        )
+
+
+async def _bump(session: AsyncSession, model: type[Base], delta: int) -> None:
+    """Сдвигает счётчик таблицы на delta и поднимает её версию.
+
+    Если строки счётчика ещё нет, заводит её по COUNT(*) - он уже видит
+    закоммиченные изменения, поэтому delta отдельно не прибавляем.
+    """
+    name = model.__tablename__
+    stmt = (
+        update(RowCounter)
+        .where(RowCounter.name == name)
+        .values(value=RowCounter.value + delta, version=RowCounter.version + 1)
+    )
+    if (await session.execute(stmt)).rowcount:
+        return
+
+    try:
+        async with session.begin_nested():
+            seed = await exact_count(session, model)
+            await session.execute(insert(RowCounter).values(name=name, value=seed, version=1))
+    except IntegrityError:
+        # строку успела завести параллельная транзакция
+        await session.execute(stmt)
+
+
+async def reset(session: AsyncSession, *models: type[Base]) -> None:
+    """Выставляет счётчики таблиц в COUNT(*) и поднимает их версии.
+
+    Для ремонта: сдвиг, не применённый после коммита (сбой между двумя
+    транзакциями commit()), иначе остался бы в счётчике навсегда. Под
+    записью в таблицу может ошибиться на сдвиги, применённые во время пересчёта.
+    """
+    for model in models:
+        name = model.__tablename__
+        actual = select(func.count()).select_from(model).scalar_subquery()
+        stmt = (
+            update(RowCounter)
+            .where(RowCounter.name == name)
+            .values(value=actual, version=RowCounter.version + 1)
+        )
+        if not (await session.execute(stmt)).rowcount:
+            await _bump(session, model, 0)
+
+
+async def adjust_answers_count(session: AsyncSession, question_id: int, delta: int) -> None:
+    """Сдвигает question.answers_count на delta в текущей транзакции.
+
+    UPDATE берёт блокировку строки вопроса до конца транзакции, так что
+    параллельные ответы к одному вопросу пишутся по очереди - зато без
+    потерянных инкрементов.
+    """
+    await session.execute(
+        update(Question)
+        .where(Question.id == question_id)
+        .values(answers_count=Question.answers_count + delta)
+    )
+
+
+async def counter_rows(session: AsyncSession, *models: type[Base]) -> dict[str, Row[Any]]:
+    """Строки row_counter (name, value, version) для таблиц моделей одним запросом.
+
+    Таблиц, для которых счётчик ещё не заведён, в словаре нет.
+    """
+    res = await session.execute(
+        select(RowCounter.name, RowCounter.value, RowCounter.version).where(
+            RowCounter.name.in_([m.__tablename__ for m in models])
+        )
+    )
+    return {row.name: row for row in res}
+
+
+async def counter_value(session: AsyncSession, model: type[Base]) -> int:
+    """Значение из row_counter; если счётчик ещё не заведён - COUNT(*)."""
+    row = (await counter_rows(session, model)).get(model.__tablename__)
+    if row is None:
+        return await exact_count(session, model)
+    return row.value
+
+
+async def cached_count(session: AsyncSession, model: type[Base]) -> int:
+    """COUNT(*), который живёт в памяти процесса count_cache_ttl секунд."""
+    name = model.__tablename__
+    now = time.monotonic()
+    hit = _cached_counts.get(name)
+    if hit and hit[0] > now:
+        return hit[1]
+    value = await exact_count(session, model)
+    _cached_counts[name] = (now + settings.count_cache_ttl, value)
+    return value
+
+
+async def approximate_count(session: AsyncSession, model: type[Base]) -> int:
+    """Оценка планировщика из pg_class.reltuples.
+
+    Обновляется VACUUM/ANALYZE, поэтому может отставать. Для таблицы, которую
+    ещё не анализировали (reltuples < 0), и на других СУБД - COUNT(*).
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        res = await session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"),
+            {"name": model.__tablename__},
+        )
+        value = res.scalar_one_or_none()
+        if value is not None and value >= 0:
+            return value
+    return await exact_count(session, model)
+
+
+async def total_count(session: AsyncSession, model: type[Base], mode: CountMode) -> int:
+    """Количество строк таблицы выбранным способом."""
+    if mode == "counter":
+        return await counter_value(session, model)
+    if mode == "cached":
+        return await cached_count(session, model)
+    if mode == "approximate":
+        return await approximate_count(session, model)
+    return await exact_count(session, model)
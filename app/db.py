@@ -1,23 +1,102 @@
 from __future__ import annotations
 
+import time
 from collections.abc import AsyncGenerator
+from typing import Any
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
 
+from app.core import metrics
 from app.core.settings import settings
 
-# === Движок SQLAlchemy ===
-engine = create_async_engine(
-    settings.DATABASE_URL_ASYNC,
-    echo=False,
-    future=True,
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Пул по умолчанию для async-движков + время ожидания соединения в метриках."""
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.POOL_WAIT_SECONDS.observe(
+                time.perf_counter() - started, self.logging_name or "primary"
+            )
+
+
+def _sqlite_foreign_keys(dbapi_connection: Any, _record: Any) -> None:
+    """SQLite по умолчанию не проверяет FK - а на них держатся 404 и каскады."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def is_foreign_key_violation(exc: IntegrityError) -> bool:
+    """Нарушение внешнего ключа (Postgres SQLSTATE 23503 или SQLite)."""
+    orig = exc.orig
+    if getattr(orig, "sqlstate", None) == "23503" or getattr(orig, "pgcode", None) == "23503":
+        return True
+    return "FOREIGN KEY constraint failed" in str(orig)
+
+
+def make_engine(url: str, name: str = "primary") -> AsyncEngine:
+    """
+    Создаёт движок с параметрами пула из настроек.
+    Для SQLite (тесты) параметры QueuePool и asyncpg не передаём.
+    name - метка движка в метриках (primary/replica).
+    """
+    sa_url = make_url(url)
+    kwargs: dict[str, Any] = {
+        "echo": settings.sql_echo,
+        "future": True,
+        "pool_pre_ping": settings.sql_pool_pre_ping,
+    }
+    if sa_url.database not in (None, "", ":memory:"):
+        kwargs.update(poolclass=TimedQueuePool, pool_logging_name=name)
+    if sa_url.get_backend_name() != "sqlite":
+        kwargs.update(
+            pool_size=settings.sql_pool_size,
+            max_overflow=settings.sql_max_overflow,
+            pool_recycle=settings.sql_pool_recycle,
+            pool_timeout=settings.sql_pool_timeout,
+        )
+    if sa_url.get_driver_name() == "asyncpg":
+        # кэш самого asyncpg и кэш адаптера SQLAlchemy поверх него
+        kwargs["connect_args"] = {"statement_cache_size": settings.sql_statement_cache_size}
+        sa_url = sa_url.update_query_dict(
+            {"prepared_statement_cache_size": str(settings.sql_statement_cache_size)}
+        )
+
+    engine = create_async_engine(sa_url, **kwargs)
+    if sa_url.get_backend_name() == "sqlite":
+        event.listen(engine.sync_engine, "connect", _sqlite_foreign_keys)
+    metrics.instrument_engine(engine, name)
+    return engine
+
+
+# === Движки SQLAlchemy: primary для записи, реплика (если задана) для чтения ===
+engine = make_engine(settings.DATABASE_URL_ASYNC)
+read_engine = (
+    make_engine(settings.sql_replica_url, name="replica") if settings.sql_replica_url else engine
 )
 
-# === Фабрика асинхронных сессий ===
+# === Фабрики асинхронных сессий ===
 AsyncSessionLocal = async_sessionmaker(
     engine,
     expire_on_commit=False,
 )
+ReadSessionLocal = async_sessionmaker(
+    read_engine,
+    expire_on_commit=False,
+)
 
 
 # === Dependency для FastAPI ===
@@ -28,3 +107,28 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """
     async with AsyncSessionLocal() as session:
         yield session
+
+
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия только для чтения: реплика, если задан SQL_REPLICA_URL, иначе primary.
+    Используется в GET-роутах; запись всегда через get_session.
+    """
+    async with ReadSessionLocal() as session:
+        yield session
+
+
+def get_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    """
+    Фабрика сессий записи - для фоновых задач (очередь ответов, очистка),
+    которые lifespan запускает с учётом dependency_overrides.
+    """
+    return AsyncSessionLocal
+
+
+def get_read_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    """
+    Фабрика сессий чтения - для стриминговых ответов, которые открывают
+    короткие сессии сами, пока отдают тело клиенту.
+    """
+    return ReadSessionLocal
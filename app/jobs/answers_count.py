@@ -0,0 +1,116 @@
+"""
+Сверка question.answers_count с таблицей answers.
+
+answers_count ведут пути записи ответов; эта задача чинит расхождения
+(ручные правки в БД, заливки в обход API, первичное заполнение). Идёт по
+вопросам keyset'ом по id пачками: одна короткая транзакция на пачку,
+переписываются только строки, где число действительно не совпало.
+В конце выставляет в COUNT(*) счётчики row_counter вопросов и ответов.
+
+Исправление поднимает версию вопросов: ETag и кэш страниц списков
+обновляются сразу. Кэш объектов по id задача чистит в своём процессе,
+поэтому до работающего сервера это доходит только при общем бэкенде
+(CACHE_BACKEND=модуль:Класс); с memory GET /questions/{id} отдаёт старый
+answers_count, пока запись не истечёт (CACHE_TTL).
+
+Запуск:
+    poetry run python -m app.jobs.answers_count --batch-size 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import counting
+from app.core.cache import cache, question_key
+from app.core.logging_config import configure_logging
+from app.core.settings import settings
+from app.db import AsyncSessionLocal, engine
+from app.models import Answer, Question
+
+logger = logging.getLogger(__name__)
+
+
+async def repair_batch(session: AsyncSession, first_id: int, last_id: int) -> list[int]:
+    """Пересчитывает answers_count для вопросов с id в [first_id, last_id].
+
+    Возвращает id исправленных вопросов. Если такие есть, поднимает версию
+    вопросов - ETag списков должен смениться вместе с данными.
+    """
+    actual = select(func.count()).where(Answer.question_id == Question.id).scalar_subquery()
+    res = await session.execute(
+        update(Question)
+        .where(Question.id.between(first_id, last_id), Question.answers_count != actual)
+        .values(answers_count=actual)
+        .returning(Question.id)
+    )
+    fixed = list(res.scalars().all())
+    if fixed:
+        await counting.adjust(session, Question, 0)
+    return fixed
+
+
+async def repair(maker: async_sessionmaker[AsyncSession], batch_size: int) -> int:
+    """Проходит все вопросы пачками по batch_size, затем сверяет row_counter.
+
+    Возвращает число исправленных вопросов.
+    """
+    total = 0
+    last_id = 0
+    while True:
+        async with maker() as session:
+            ids = (
+                (
+                    await session.execute(
+                        select(Question.id)
+                        .where(Question.id > last_id)
+                        .order_by(Question.id)
+                        .limit(batch_size)
+                    )
+                )
+                .scalars()
+                .all()
+            )
+            if not ids:
+                # заодно - row_counter: сдвиг, потерянный между коммитами, сам не уйдёт
+                await counting.reset(session, Question, Answer)
+                await session.commit()
+                return total
+            fixed = await repair_batch(session, ids[0], ids[-1])
+            await counting.commit(session)
+        if fixed:
+            await cache.delete_many(map(question_key, fixed))
+            logger.info("answers_count: исправлено %s в id %s..%s", len(fixed), ids[0], ids[-1])
+        total += len(fixed)
+        last_id = ids[-1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--batch-size", type=int, default=settings.answers_count_repair_batch)
+    args = parser.parse_args()
+    configure_logging()
+
+    async def run() -> int:
+        try:
+            return await repair(AsyncSessionLocal, args.batch_size)
+        finally:
+            await engine.dispose()
+
+    fixed = asyncio.run(run())
+    logger.info("answers_count: сверка завершена, исправлено вопросов=%s", fixed)
+    if fixed and settings.cache_backend == "memory":
+        logger.warning(
+            "CACHE_BACKEND=memory: кэш по id у сервера свой, карточки исправленных вопросов "
+            "обновятся через CACHE_TTL=%s с",
+            settings.cache_ttl,
+        )
+
+
+if __name__ == "__main__":
+    main()
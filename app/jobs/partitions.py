@@ -0,0 +1,252 @@
+"""
+Обслуживание помесячных секций answers (Postgres, см. миграцию 0008).
+
+- создаёт секции answers_pYYYYMM на answers_partition_months_ahead месяцев
+  вперёд (вставка в незаведённый месяц ушла бы в answers_default). Секция
+  заводится отдельной таблицей и присоединяется ATTACH: строки её месяца,
+  уже попавшие в answers_default, переносятся в неё в той же транзакции;
+- архивирует: секции, целиком старше answers_partition_keep_months месяцев,
+  отсоединяются и переносятся в схему answers_archive_schema. Данные не
+  удаляются, но API их больше не видит: answers_count вопросов и
+  счётчик/версия ответов уменьшаются на число отсоединённых строк.
+
+DETACH ... CONCURRENTLY недоступен, пока у answers есть секция DEFAULT, поэтому
+отсоединение обычное: оно берёт ACCESS EXCLUSIVE на answers, но держит его
+миг. Чтобы не вставать в очередь за долгим запросом (и не блокировать всех
+за собой), блокировка ждётся не дольше answers_detach_lock_timeout_ms, при
+неудаче - повтор после паузы, до answers_detach_retries раз. Так же - и
+создание секций. Отсоединённая,
+но не перенесённая в архив секция (запуск прервался) дорабатывается при
+следующем запуске.
+
+answers_legacy (всё, что было до секционирования) и answers_default
+автоматически не архивируются.
+
+Запуск (например, раз в сутки из cron):
+    poetry run python -m app.jobs.partitions --ahead 3 --keep-months 12
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import re
+from collections.abc import Awaitable, Callable
+from datetime import UTC, date, datetime
+from typing import TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from app import counting
+from app.core.logging_config import configure_logging
+from app.core.settings import settings
+from app.db import engine
+from app.models import Answer, Question
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+PARTITION_NAME = re.compile(r"^answers_p(\d{4})(\d{2})$")
+# пауза перед повтором DETACH/ATTACH растёт с номером попытки: 1 с, 2 с, ...
+LOCK_RETRY_PAUSE = 1.0
+
+
+def month_shift(month: date, shift: int) -> date:
+    index = month.year * 12 + month.month - 1 + shift
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"answers_p{month:%Y%m}"
+
+
+def _ts(day: date) -> str:
+    return f"'{day} 00:00:00+00'"
+
+
+def partition_months(names: list[str]) -> list[date]:
+    """Месяцы помесячных секций по их именам (legacy и default пропускаются)."""
+    months = []
+    for name in names:
+        if m := PARTITION_NAME.match(name):
+            months.append(date(int(m[1]), int(m[2]), 1))
+    return sorted(months)
+
+
+def plan_create(existing: list[str], today: date, ahead: int) -> list[date]:
+    """Месяцы, для которых нужно создать секции: с текущего на ahead вперёд.
+
+    Месяцы раньше первой помесячной секции покрыты answers_legacy.
+    """
+    months = partition_months(existing)
+    current = today.replace(day=1)
+    first = months[0] if months else month_shift(current, 1)
+    wanted = [month_shift(current, i) for i in range(ahead + 1)]
+    return [m for m in wanted if m >= first and m not in months]
+
+
+def plan_archive(existing: list[str], today: date, keep_months: int) -> list[date]:
+    """Месяцы секций, которые целиком старше keep_months месяцев (0 - никакие)."""
+    if keep_months <= 0:
+        return []
+    cutoff = month_shift(today.replace(day=1), -keep_months)
+    return [m for m in partition_months(existing) if month_shift(m, 1) <= cutoff]
+
+
+async def partitions(conn: AsyncConnection) -> dict[str, str]:
+    """Помесячные таблицы answers_pYYYYMM текущей схемы -> состояние.
+
+    attached - секция answers; detached - уже отсоединена, но счётчики не
+    пересчитаны и в архив не перенесена.
+    """
+    res = await conn.execute(
+        text(
+            "SELECT c.relname, c.relispartition FROM pg_class c "
+            "WHERE c.relnamespace = current_schema()::regnamespace AND c.relkind = 'r' "
+            "AND c.relname ~ '^answers_p[0-9]{6}$'"
+        )
+    )
+    return {name: "attached" if is_partition else "detached" for name, is_partition in res.all()}
+
+
+async def _create(conn: AsyncConnection, month: date) -> int:
+    """Секция месяца: отдельная таблица, перенос строк из answers_default, ATTACH.
+
+    Возвращает число перенесённых строк. CREATE ... PARTITION OF при таких
+    строках падал бы каждый раз, а ATTACH к тому же берёт на answers только
+    SHARE UPDATE EXCLUSIVE (ACCESS EXCLUSIVE - на answers_default).
+    """
+    name = partition_name(month)
+    start, end = _ts(month), _ts(month_shift(month, 1))
+    bounds = f"created_at >= {start} AND created_at < {end}"
+    await conn.execute(text(f"CREATE TABLE {name} (LIKE answers INCLUDING DEFAULTS)"))
+    # CHECK по границам: ATTACH не перепроверяет строки новой таблицы
+    await conn.execute(text(f"ALTER TABLE {name} ADD CONSTRAINT {name}_bounds CHECK ({bounds})"))
+    res = await conn.execute(
+        text(
+            f"WITH moved AS (DELETE FROM answers_default WHERE {bounds} RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        )
+    )
+    await conn.execute(
+        text(f"ALTER TABLE answers ATTACH PARTITION {name} FOR VALUES FROM ({start}) TO ({end})")
+    )
+    await conn.execute(text(f"ALTER TABLE {name} DROP CONSTRAINT {name}_bounds"))
+    return res.rowcount
+
+
+async def create_ahead(db: AsyncEngine, today: date, ahead: int) -> list[str]:
+    async with db.connect() as conn:
+        states = await partitions(conn)
+    attached = [n for n, state in states.items() if state == "attached"]
+    created = []
+    for month in plan_create(attached, today, ahead):
+        name = partition_name(month)
+        moved = await _locked(db, name, lambda conn, m=month: _create(conn, m))
+        created.append(name)
+        if moved:
+            logger.warning("Секции: создана %s, из answers_default перенесено %s", name, moved)
+        else:
+            logger.info("Секции: создана %s", name)
+    return created
+
+
+async def _release_counts(session: AsyncSession, table: str) -> int:
+    """Вычитает строки отсоединённой секции из answers_count и счётчика ответов."""
+    res = await session.execute(
+        text(
+            "UPDATE question SET answers_count = greatest(question.answers_count - c.n, 0) "
+            f"FROM (SELECT question_id, count(*) AS n FROM {table} GROUP BY question_id) AS c "
+            "WHERE question.id = c.question_id RETURNING c.n"
+        )
+    )
+    total = sum(res.scalars().all())
+    await counting.adjust(session, Answer, -total)
+    await counting.adjust(session, Question, 0)
+    return total
+
+
+def _lock_not_available(exc: DBAPIError) -> bool:
+    return getattr(exc.orig, "sqlstate", None) == "55P03" or "lock timeout" in str(exc.orig)
+
+
+async def _locked(db: AsyncEngine, name: str, work: Callable[[AsyncConnection], Awaitable[T]]) -> T:
+    """Транзакция work под коротким lock_timeout с повторами, пока answers занята."""
+    retries = max(settings.answers_detach_retries, 1)
+    attempt = 1
+    while True:
+        try:
+            async with db.begin() as conn:
+                timeout = int(settings.answers_detach_lock_timeout_ms)
+                await conn.execute(text(f"SET LOCAL lock_timeout = {timeout}"))
+                return await work(conn)
+        except DBAPIError as exc:
+            if attempt >= retries or not _lock_not_available(exc):
+                raise
+            logger.warning("Секции: %s - answers занята, повтор %s/%s", name, attempt, retries)
+            await asyncio.sleep(LOCK_RETRY_PAUSE * attempt)
+            attempt += 1
+
+
+async def detach(db: AsyncEngine, name: str) -> None:
+    """DETACH PARTITION под коротким lock_timeout с повторами."""
+    await _locked(
+        db, name, lambda conn: conn.execute(text(f"ALTER TABLE answers DETACH PARTITION {name}"))
+    )
+
+
+async def archive_old(db: AsyncEngine, today: date, keep_months: int) -> list[str]:
+    schema = settings.answers_archive_schema
+    archived = []
+    async with db.connect() as conn:
+        states = await partitions(conn)
+    attached = [n for n, state in states.items() if state == "attached"]
+    # сначала - то, что не доделал прошлый запуск
+    names = sorted(n for n, state in states.items() if state == "detached")
+    names += [partition_name(m) for m in plan_archive(attached, today, keep_months)]
+    if names:
+        async with db.begin() as conn:
+            await conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema}"))
+    for name in names:
+        if states[name] == "attached":
+            await detach(db, name)
+        # пересчёт - уже без блокировки answers: секция отсоединена
+        async with AsyncSession(bind=db, expire_on_commit=False) as session:
+            await session.execute(text(f"ALTER TABLE {name} SET SCHEMA {schema}"))
+            rows = await _release_counts(session, f"{schema}.{name}")
+            await counting.commit(session)
+        archived.append(name)
+        logger.info("Секции: %s -> %s.%s, строк=%s", name, schema, name, rows)
+    return archived
+
+
+async def maintain(db: AsyncEngine, today: date, ahead: int, keep_months: int) -> None:
+    if db.dialect.name != "postgresql":
+        logger.info("Секции: %s - таблица answers не секционирована", db.dialect.name)
+        return
+    await create_ahead(db, today, ahead)
+    await archive_old(db, today, keep_months)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--ahead", type=int, default=settings.answers_partition_months_ahead)
+    parser.add_argument("--keep-months", type=int, default=settings.answers_partition_keep_months)
+    args = parser.parse_args()
+    configure_logging()
+
+    async def run() -> None:
+        try:
+            await maintain(engine, datetime.now(UTC).date(), args.ahead, args.keep_months)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Старт и остановка процесса: прогрев пула, готовность, дренаж запросов.
+
+- warm_up: при старте открывает несколько соединений пула и выполняет на
+  каждом горячие выражения - первые запросы после деплоя не платят за
+  установку соединения и подготовку выражений (кэш asyncpg живёт на
+  соединении);
+- check_ready: SELECT 1 с коротким таймаутом, результат кэшируется на
+  ready_cache_ttl секунд, чтобы частые пробы балансировщика не грузили БД;
+- in_flight: счётчик запросов в работе; при остановке ждём, пока он
+  обнулится, дописываем очередь ответов (app.write_behind), снимаем аренду
+  заданий очистки (app.purge) и только потом закрываем движки.
+
+- drain_on_sigterm: первый SIGTERM только выставляет in_flight.draining
+  (/ready отвечает 503), а обработчик uvicorn вызывается через
+  shutdown_ready_delay секунд: балансировщик успевает убрать процесс из
+  ротации, пока тот ещё принимает соединения. Без этого «draining» не
+  увидеть - uvicorn закрывает сокеты раньше, чем выполняет shutdown lifespan.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import signal
+import threading
+import time
+from types import FrameType
+
+from sqlalchemy import Executable, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app import counting, purge, write_behind
+from app.api import answers, questions
+from app.core.settings import settings
+from app.models import Answer, Question
+from app.responses import ANSWER_COLUMNS, QUESTION_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+
+def hot_statements() -> list[Executable]:
+    """Выражения самых частых маршрутов: карточки и страницы списков.
+
+    Списки строятся теми же page_statement, что и в роутах (LIMIT ... OFFSET
+    и keyset-вариант): asyncpg кэширует подготовленные выражения по тексту SQL.
+    """
+    return [
+        select(*QUESTION_COLUMNS).where(Question.id == 0),
+        questions.page_statement("id", "asc", 20),
+        questions.page_statement("id", "asc", 20, after=(0, 0)),
+        select(*ANSWER_COLUMNS).where(Answer.id == 0),
+        answers.page_statement(20, question_id=0),
+        answers.page_statement(20, after_id=0, question_id=0),
+    ]
+
+
+async def _warm_connection(engine: AsyncEngine, barrier: asyncio.Barrier) -> None:
+    try:
+        async with engine.connect() as conn:
+            async with AsyncSession(bind=conn) as session:
+                await counting.counter_rows(session, Question, Answer)
+                for stmt in hot_statements():
+                    await session.execute(stmt)
+            await conn.rollback()
+            # держим соединение, пока не откроются остальные, - иначе пул
+            # раздал бы всем задачам одно и то же
+            await barrier.wait()
+    except BaseException:
+        await barrier.abort()
+        raise
+
+
+async def warm_up(engine: AsyncEngine, connections: int) -> None:
+    """Открывает connections соединений пула и прогревает на них выражения."""
+    if connections <= 0:
+        return
+    barrier = asyncio.Barrier(connections)
+    results = await asyncio.gather(
+        *(_warm_connection(engine, barrier) for _ in range(connections)), return_exceptions=True
+    )
+    errors = [r for r in results if isinstance(r, Exception)]
+    # BrokenBarrierError - следствие чужой ошибки, наружу отдаём первопричину
+    real = [e for e in errors if not isinstance(e, asyncio.BrokenBarrierError)]
+    if errors:
+        raise (real or errors)[0]
+
+
+# (момент протухания по monotonic, готов ли, ошибка)
+_ready_cache: tuple[float, bool, str | None] | None = None
+
+
+async def _ping(session: AsyncSession) -> None:
+    await session.execute(text("SELECT 1"))
+
+
+async def check_ready(*sessions: AsyncSession) -> tuple[bool, str | None]:
+    """Доступны ли БД сессий: SELECT 1 не дольше ready_timeout, с кэшем результата."""
+    global _ready_cache
+    now = time.monotonic()
+    if _ready_cache is not None and _ready_cache[0] > now:
+        return _ready_cache[1], _ready_cache[2]
+    try:
+        # дожидаемся всех проверок: иначе сессию закроют посреди соединения
+        pings = asyncio.gather(*(_ping(s) for s in sessions), return_exceptions=True)
+        outcomes = await asyncio.wait_for(pings, timeout=settings.ready_timeout)
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                raise outcome
+        result: tuple[bool, str | None] = (True, None)
+    except TimeoutError:
+        result = (False, f"БД не ответила за {settings.ready_timeout} с")
+    except Exception as exc:  # любая ошибка БД = не готов
+        result = (False, f"{type(exc).__name__}: {exc}")
+    _ready_cache = (now + settings.ready_cache_ttl, *result)
+    return result
+
+
+def reset_ready_cache() -> None:
+    global _ready_cache
+    _ready_cache = None
+
+
+class InFlight:
+    """Запросы в работе; drain() ждёт, пока их не останется."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.draining = False
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def enter(self) -> None:
+        self.count += 1
+        self._idle.clear()
+
+    def exit(self) -> None:
+        self.count -= 1
+        if self.count == 0:
+            self._idle.set()
+
+    async def drain(self, timeout: float) -> int:
+        """Перестаёт считаться готовым и ждёт запросы; возвращает, сколько не дождались."""
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except TimeoutError:
+            pass
+        return self.count
+
+
+in_flight = InFlight()
+
+
+class InFlightMiddleware:
+    """Чистый ASGI-middleware: учитывает HTTP-запрос в in_flight, пока тот не отдан."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        in_flight.enter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            in_flight.exit()
+
+
+def drain_on_sigterm(delay: float) -> None:
+    """Откладывает обработчик SIGTERM сервера на delay секунд, выставив draining.
+
+    Ставится из lifespan, когда uvicorn уже повесил свои обработчики (и снимет
+    их сам при выходе). Повторный SIGTERM - без задержки.
+    """
+    if delay <= 0 or threading.current_thread() is not threading.main_thread():
+        return
+    server_handler = signal.getsignal(signal.SIGTERM)
+    if not callable(server_handler):
+        return
+
+    def handler(sig: int, frame: FrameType | None) -> None:
+        if in_flight.draining:
+            server_handler(sig, frame)
+            return
+        in_flight.draining = True
+        logger.info("SIGTERM: /ready -> draining, остановка через %s с", delay)
+        timer = threading.Timer(delay, server_handler, (sig, frame))
+        timer.daemon = True
+        timer.start()
+
+    signal.signal(signal.SIGTERM, handler)
+
+
+async def startup(engines: list[AsyncEngine]) -> None:
+    """Прогрев пулов; недоступная БД не мешает стартовать - это покажет /ready."""
+    connections = min(settings.warmup_connections, settings.sql_pool_size)
+    started = time.perf_counter()
+    warmed = 0
+    # ошибка одного движка (primary) не мешает прогреть остальные (реплику)
+    for engine in engines:
+        try:
+            await warm_up(engine, connections)
+            warmed += 1
+        except Exception as exc:
+            logger.warning("Прогрев пула %s не удался: %s", engine.url.render_as_string(), exc)
+    logger.info(
+        "Пул прогрет: движков %s из %s, %s соединений на движок за %.0f мс",
+        warmed,
+        len(engines),
+        connections,
+        (time.perf_counter() - started) * 1000,
+    )
+
+
+async def shutdown(engines: list[AsyncEngine]) -> None:
+    """Дожидается запросов в работе (не дольше shutdown_drain_timeout), дописывает
+    очередь ответов и закрывает движки."""
+    left = await in_flight.drain(settings.shutdown_drain_timeout)
+    if left:
+        logger.warning("Остановка: не дождались %s запросов", left)
+    await write_behind.answers.stop(settings.write_behind_flush_timeout)
+    # текущая пачка очистки откатится, задание продолжит следующий запуск
+    await purge.worker.stop()
+    for engine in engines:
+        await engine.dispose()
@@ -4,14 +4,23 @@ import logging
 from contextlib import asynccontextmanager
 
 import uvicorn
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app import db, lifecycle, purge, write_behind
 from app.api.answers import router as answers_router
+from app.api.export import router as export_router
+from app.api.purge import router as purge_router
 from app.api.questions import router as questions_router
-from app.core.logging_config import configure_logging
+from app.api.users import router as users_router
+from app.core import admission, compression, etag, metrics, request_stats
+from app.core.cache import cache
+from app.core.logging_config import RequestIdMiddleware, configure_logging
 from app.core.settings import settings
+from app.db import get_read_session, get_session
 
 # Настраиваем базовое логирование
 configure_logging()
@@ -22,9 +31,11 @@ logger = logging.getLogger("app")
 async def lifespan(app: FastAPI):
     """
     Жизненный цикл приложения:
-    - при старте - пишем, с чем запустились (ENV/хост/порт/БД);
-    - при остановке - аккуратно завершаемся.
+    - при старте - пишем, с чем запустились (ENV/хост/порт/БД), прогреваем пул и
+      запускаем запись ответов из очереди (если включена) и задания очистки;
+    - при остановке - дожидаемся запросов в работе, дописываем очередь и закрываем движки.
     """
+    engines = [db.engine] if db.read_engine is db.engine else [db.engine, db.read_engine]
     logger.info(
         "ENV=%s HOST=%s PORT=%s DB=%s",
         settings.env,
@@ -32,8 +43,17 @@ async def lifespan(app: FastAPI):
         settings.postgres_port,
         settings.postgres_db,
     )
+    await lifecycle.startup(engines)
+    lifecycle.drain_on_sigterm(settings.shutdown_ready_delay)
+    # фоновые задачи пишут в ту же БД, что и роуты (тесты и бенчмарк её подменяют)
+    maker = app.dependency_overrides.get(db.get_sessionmaker, db.get_sessionmaker)()
+    if settings.answers_write_behind:
+        write_behind.answers.start(maker)
+    if settings.purge_worker:
+        purge.worker.start(maker)
     logger.info("🚀 Приложение запущено")
     yield
+    await lifecycle.shutdown(engines)
     logger.info("👋 Приложение остановлено")
 
 
@@ -50,11 +70,40 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Total-Count",
+        "X-Next-Cursor",
+        "X-Next-Answers-Cursor",
+        "ETag",
+        "Server-Timing",
+        "X-Request-ID",
+    ],
 )
 
 
+# снаружи CORS: сжимается ответ уже со всеми заголовками
+app.add_middleware(compression.CompressionMiddleware)
+# до роутинга: лишние запросы отклоняются раньше, чем займут соединение из пула
+app.add_middleware(admission.AdmissionMiddleware, exempt=("/", "/ready", "/metrics"))
+app.add_exception_handler(PoolTimeoutError, admission.pool_timeout_handler)
+app.add_middleware(lifecycle.InFlightMiddleware)
+app.add_middleware(request_stats.RequestStatsMiddleware)
+# снаружи CORS: в метрики попадают и preflight-запросы
+app.add_middleware(metrics.MetricsMiddleware)
+# самый внешний: request_id есть у всех записей запроса, включая предупреждения о бюджете
+app.add_middleware(RequestIdMiddleware)
+
+for _event in ("hits", "misses", "evictions"):
+    metrics.CACHE_EVENTS.set_function(lambda e=_event: cache.stats()[e], _event)
+metrics.CACHE_SIZE.set_function(lambda: cache.stats()["size"])
+metrics.PAGE_CACHE_BYTES.set_function(lambda: etag.pages.stats()["bytes"])
+
+
 app.include_router(questions_router)
 app.include_router(answers_router)
+app.include_router(users_router)
+app.include_router(export_router)
+app.include_router(purge_router)
 
 
 @app.get("/", tags=["health"])
@@ -63,5 +112,34 @@ async def root():
     return JSONResponse({"status": "ok", "app": settings.app_name})
 
 
+@app.get("/ready", tags=["health"])
+async def ready(
+    session: AsyncSession = Depends(get_session),
+    read_session: AsyncSession = Depends(get_read_session),
+):
+    """Готовность к трафику: БД (и реплика) отвечают, процесс не останавливается.
+
+    В отличие от «/» ходит в БД - с коротким таймаутом и кэшем результата.
+    """
+    if lifecycle.in_flight.draining:
+        return JSONResponse({"status": "draining"}, status_code=503)
+    ok, error = await lifecycle.check_ready(session, read_session)
+    if not ok:
+        return JSONResponse({"status": "unavailable", "error": error}, status_code=503)
+    return JSONResponse({"status": "ready"})
+
+
+@app.get("/cache/stats", tags=["health"])
+async def cache_stats():
+    """Счётчики кэша объектов по id (hits/misses/evictions/size) и кэша страниц (pages)."""
+    return JSONResponse({**cache.stats(), "pages": etag.pages.stats()})
+
+
+@app.get("/metrics", tags=["health"])
+async def prometheus_metrics():
+    """Метрики процесса в текстовом формате Prometheus."""
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
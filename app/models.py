@@ -4,9 +4,20 @@ ORM-модели: Вопрос и ответ.
 
 from __future__ import annotations
 
-from datetime import datetime
-
-from sqlalchemy import DateTime, ForeignKey, Integer, String, Text, func
+import uuid
+from datetime import UTC, datetime
+
+from sqlalchemy import (
+    BigInteger,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    Uuid,
+    func,
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -16,18 +27,39 @@ class Base(DeclarativeBase):
     pass
 
 
+def utcnow() -> datetime:
+    """Текущее время в UTC с микросекундами.
+
+    Значение из приложения попадает в курсоры keyset-пагинации ровно в том
+    виде, в каком лежит в БД (CURRENT_TIMESTAMP в SQLite теряет микросекунды).
+    """
+    return datetime.now(UTC)
+
+
 class Question(Base):
     """Модель «Вопрос»: текст и время создания."""
 
     __tablename__ = "question"
+    __table_args__ = (
+        # keyset-пагинация при sort_by=created_at (ничьи добиваем по id)
+        Index("ix_question_created_at_id", "created_at", "id"),
+        # sort_by=answers_count
+        Index("ix_question_answers_count_id", "answers_count", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     text: Mapped[str] = mapped_column(Text, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
+        default=utcnow,
         server_default=func.now(),
         nullable=False,
     )
+    # денормализованное число ответов: ведут пути записи ответов,
+    # сверяет с таблицей answers задача app.jobs.answers_count
+    answers_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
 
     # Один вопрос может иметь несколько ответов.
 
@@ -40,24 +72,82 @@ class Question(Base):
 
 
 class Answer(Base):
-    """Модель «Ответ», привязанная к вопросу."""
+    """Модель «Ответ», привязанная к вопросу.
+
+    В Postgres таблица секционирована по created_at помесячно (миграция 0008,
+    PK там - (id, created_at)); в SQLite - обычная таблица.
+    """
 
     __tablename__ = "answers"
+    __table_args__ = (
+        # список ответов вопроса: фильтр по question_id + keyset по id
+        Index("ix_answers_question_id_id", "question_id", "id"),
+        # ответы пользователя: фильтр по user_id + keyset по id
+        Index("ix_answers_user_id_id", "user_id", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     question_id: Mapped[int] = mapped_column(
         Integer,
         ForeignKey("question.id", ondelete="CASCADE"),
-        index=True,
         nullable=False,
     )
-    user_id: Mapped[str] = mapped_column(String(36), index=True)
+    # нативный uuid в Postgres (16 байт), CHAR(32) в SQLite
+    user_id: Mapped[uuid.UUID] = mapped_column(Uuid)
     text: Mapped[str] = mapped_column(Text, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
+        default=utcnow,
         server_default=func.now(),
         nullable=False,
     )
 
     # каждый ответ принадлежит одному вопросу.
     question: Mapped["Question"] = relationship(back_populates="answers")
+
+
+class RowCounter(Base):
+    """Счётчик строк таблицы: поддерживается путями создания/удаления.
+
+    Нужен, чтобы X-Total-Count не требовал COUNT(*) на каждую страницу.
+    version растёт при каждом изменении таблицы - из него строятся ETag.
+    """
+
+    __tablename__ = "row_counter"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    value: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0")
+
+
+class PurgeJob(Base):
+    """Задание фоновой очистки (app.purge): что удалять и докуда дошли.
+
+    max_id - снимок max(id) при создании: строки, появившиеся позже, задание
+    не трогает. last_id двигается в той же транзакции, что и удаление пачки,
+    поэтому после перезапуска задание продолжается с того же места.
+    owner/lease_until - кто из воркеров выполняет задание и до какого момента.
+    """
+
+    __tablename__ = "purge_job"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    target: Mapped[str] = mapped_column(String(16), nullable=False)  # answers | questions
+    user_id: Mapped[uuid.UUID | None] = mapped_column(Uuid, nullable=True)
+    since: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    max_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # pending | running | done | failed
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="pending")
+    questions_deleted: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    answers_deleted: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    owner: Mapped[str | None] = mapped_column(String(32), nullable=True)
+    lease_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, server_default=func.now(), nullable=False
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=utcnow, server_default=func.now(), nullable=False
+    )
@@ -0,0 +1,367 @@
+"""
+Фоновая очистка: массовое удаление ответов (по user_id и/или времени) и
+вопросов (по времени) маленькими транзакциями.
+
+Один большой DELETE (тем более с каскадом на answers) держит блокировки
+минутами. Здесь каждая пачка - короткая транзакция: удаление до
+purge_batch_size строк, answers_count, счётчики/версии и продвижение
+задания (last_id, сколько удалено) коммитятся вместе, между пачками -
+пауза purge_pause_ms. Поэтому после перезапуска задание продолжается с
+того места, где остановилось, ничего не удаляя дважды и не пропуская.
+
+Задания лежат в таблице purge_job. Их выполняет фоновая задача каждого
+воркера (запускается в lifespan): задание берётся в аренду на
+purge_lease_seconds (owner + lease_until), аренда продлевается каждой
+пачкой. Если воркер упал, задание подхватит другой, когда аренда истечёт;
+при штатной остановке аренда снимается сразу.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from collections import Counter
+from datetime import timedelta
+from typing import Any
+
+from sqlalchemy import ColumnElement, case, delete, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import counting
+from app.core.cache import answer_key, cache, question_key
+from app.core.settings import settings
+from app.models import Answer, PurgeJob, Question, utcnow
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = ("pending", "running")
+
+
+class LeaseLost(Exception):
+    """Задание перехватил другой воркер (истекла аренда) - пачку откатываем."""
+
+
+async def create_job(session: AsyncSession, target: str, **filters: Any) -> PurgeJob:
+    """Заводит задание; строки с id больше текущего max(id) оно не тронет."""
+    model = Answer if target == "answers" else Question
+    max_id = (await session.execute(select(func.max(model.id)))).scalar_one() or 0
+    res = await session.execute(
+        insert(PurgeJob)
+        .values(
+            target=target,
+            max_id=max_id,
+            last_id=0,
+            status="pending",
+            questions_deleted=0,
+            answers_deleted=0,
+            **filters,
+        )
+        .returning(PurgeJob)
+    )
+    job = res.scalar_one()
+    await session.commit()
+    return job
+
+
+def _answer_filters(job: PurgeJob) -> list[ColumnElement[bool]]:
+    where = [Answer.id > job.last_id, Answer.id <= job.max_id]
+    if job.user_id is not None:
+        where.append(Answer.user_id == job.user_id)
+    if job.since is not None:
+        where.append(Answer.created_at >= job.since)
+    if job.until is not None:
+        where.append(Answer.created_at < job.until)
+    return where
+
+
+def _question_filters(job: PurgeJob) -> list[ColumnElement[bool]]:
+    where = [Question.id > job.last_id, Question.id <= job.max_id]
+    if job.since is not None:
+        where.append(Question.created_at >= job.since)
+    if job.until is not None:
+        where.append(Question.created_at < job.until)
+    return where
+
+
+async def _progress(session: AsyncSession, job: PurgeJob, owner: str, **values: Any) -> None:
+    """Продвигает задание и продлевает аренду в транзакции пачки."""
+    res = await session.execute(
+        update(PurgeJob)
+        .where(PurgeJob.id == job.id, PurgeJob.owner == owner)
+        .values(
+            lease_until=utcnow() + timedelta(seconds=settings.purge_lease_seconds),
+            updated_at=utcnow(),
+            **values,
+        )
+    )
+    if not res.rowcount:
+        raise LeaseLost
+
+
+async def _delete_answers(
+    session: AsyncSession, where: ColumnElement[bool], *, keep_counts: bool = False
+) -> tuple[list[int], Counter[int]]:
+    """DELETE ответов по условию, answers_count их вопросов и счётчик ответов.
+
+    keep_counts - вопросы удаляются следом, answers_count им не пересчитываем.
+    """
+    res = await session.execute(
+        delete(Answer).where(where).returning(Answer.id, Answer.question_id)
+    )
+    rows = res.all()
+    per_question = Counter(r.question_id for r in rows)
+    if per_question and not keep_counts:
+        # один UPDATE на пачку: answers_count - CASE id WHEN ... THEN n
+        await session.execute(
+            update(Question)
+            .where(Question.id.in_(per_question))
+            .values(
+                answers_count=Question.answers_count
+                - case(dict(per_question), value=Question.id, else_=0)
+            )
+        )
+    if rows:
+        await counting.adjust(session, Answer, -len(rows))
+    return [r.id for r in rows], per_question
+
+
+async def _answers_step(session: AsyncSession, job: PurgeJob, owner: str) -> bool:
+    """Одна пачка задания target=answers; False - удалять больше нечего."""
+    ids = (
+        (
+            await session.execute(
+                select(Answer.id)
+                .where(*_answer_filters(job))
+                .order_by(Answer.id)
+                .limit(settings.purge_batch_size)
+            )
+        )
+        .scalars()
+        .all()
+    )
+    if not ids:
+        return False
+    deleted, per_question = await _delete_answers(session, Answer.id.in_(ids))
+    job.last_id = ids[-1]
+    job.answers_deleted += len(deleted)
+    await _progress(session, job, owner, last_id=job.last_id, answers_deleted=job.answers_deleted)
+    await counting.commit(session)
+    await cache.delete_many([*map(answer_key, deleted), *map(question_key, per_question)])
+    return True
+
+
+async def _questions_step(
+    maker: async_sessionmaker[AsyncSession], job: PurgeJob, owner: str
+) -> bool:
+    """Пачка вопросов: сначала их ответы своими пачками, потом сами вопросы."""
+    async with maker() as session:
+        question_ids = (
+            (
+                await session.execute(
+                    select(Question.id)
+                    .where(*_question_filters(job))
+                    .order_by(Question.id)
+                    .limit(settings.purge_batch_size)
+                )
+            )
+            .scalars()
+            .all()
+        )
+    if not question_ids:
+        return False
+
+    while True:
+        async with maker() as session:
+            ids = (
+                (
+                    await session.execute(
+                        select(Answer.id)
+                        .where(Answer.question_id.in_(question_ids))
+                        .order_by(Answer.id)
+                        .limit(settings.purge_batch_size)
+                    )
+                )
+                .scalars()
+                .all()
+            )
+            if not ids:
+                break
+            deleted, _ = await _delete_answers(session, Answer.id.in_(ids), keep_counts=True)
+            job.answers_deleted += len(deleted)
+            await _progress(session, job, owner, answers_deleted=job.answers_deleted)
+            await counting.commit(session)
+        await cache.delete_many(map(answer_key, deleted))
+        await _pause()
+
+    async with maker() as session:
+        # вопросы под FOR UPDATE: новые ответы к ним ждут (ключ FK) до коммита;
+        # ответы, успевшие появиться после пачек выше, удаляем здесь же с учётом
+        # в счётчике - каскад удалил бы их мимо row_counter
+        await session.execute(
+            select(Question.id).where(Question.id.in_(question_ids)).with_for_update()
+        )
+        late, _ = await _delete_answers(
+            session, Answer.question_id.in_(question_ids), keep_counts=True
+        )
+        res = await session.execute(
+            delete(Question).where(Question.id.in_(question_ids)).returning(Question.id)
+        )
+        deleted = list(res.scalars().all())
+        if deleted:
+            await counting.adjust(session, Question, -len(deleted))
+        job.last_id = question_ids[-1]
+        job.questions_deleted += len(deleted)
+        job.answers_deleted += len(late)
+        await _progress(
+            session,
+            job,
+            owner,
+            last_id=job.last_id,
+            questions_deleted=job.questions_deleted,
+            answers_deleted=job.answers_deleted,
+        )
+        await counting.commit(session)
+    await cache.delete_many([*map(answer_key, late), *map(question_key, deleted)])
+    return True
+
+
+async def _pause() -> None:
+    if settings.purge_pause_ms > 0:
+        await asyncio.sleep(settings.purge_pause_ms / 1000)
+
+
+async def _finish(
+    maker: async_sessionmaker[AsyncSession], job_id: int, owner: str, **values: Any
+) -> None:
+    async with maker() as session:
+        await session.execute(
+            update(PurgeJob)
+            .where(PurgeJob.id == job_id, PurgeJob.owner == owner)
+            .values(updated_at=utcnow(), owner=None, lease_until=None, **values)
+        )
+        await session.commit()
+
+
+async def claim(maker: async_sessionmaker[AsyncSession], owner: str) -> PurgeJob | None:
+    """Берёт в аренду одно незавершённое задание, которое никто не выполняет."""
+    now = utcnow()
+    async with maker() as session:
+        candidate = (
+            select(PurgeJob.id)
+            .where(
+                PurgeJob.status.in_(ACTIVE),
+                or_(PurgeJob.lease_until.is_(None), PurgeJob.lease_until < now),
+            )
+            .order_by(PurgeJob.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        # повторная проверка аренды в UPDATE: из двух воркеров задание получит один
+        res = await session.execute(
+            update(PurgeJob)
+            .where(
+                PurgeJob.id == candidate,
+                or_(PurgeJob.lease_until.is_(None), PurgeJob.lease_until < now),
+            )
+            .values(
+                status="running",
+                owner=owner,
+                lease_until=now + timedelta(seconds=settings.purge_lease_seconds),
+                updated_at=now,
+            )
+            .returning(PurgeJob)
+        )
+        job = res.scalar_one_or_none()
+        await session.commit()
+        return job
+
+
+async def run_job(maker: async_sessionmaker[AsyncSession], job: PurgeJob, owner: str) -> None:
+    """Выполняет взятое задание до конца пачками с паузами."""
+    logger.info("Очистка #%s (%s): старт с id > %s", job.id, job.target, job.last_id)
+    try:
+        while True:
+            if job.target == "answers":
+                async with maker() as session:
+                    more = await _answers_step(session, job, owner)
+            else:
+                more = await _questions_step(maker, job, owner)
+            if not more:
+                break
+            await _pause()
+    except LeaseLost:
+        logger.warning("Очистка #%s: задание перехватил другой воркер", job.id)
+        return
+    except Exception as exc:
+        logger.exception("Очистка #%s: ошибка", job.id)
+        await _finish(maker, job.id, owner, status="failed", error=f"{type(exc).__name__}: {exc}")
+        return
+    await _finish(maker, job.id, owner, status="done")
+    logger.info(
+        "Очистка #%s: готово, вопросов=%s, ответов=%s",
+        job.id,
+        job.questions_deleted,
+        job.answers_deleted,
+    )
+
+
+async def run_pending(maker: async_sessionmaker[AsyncSession], owner: str | None = None) -> int:
+    """Выполняет все доступные задания по очереди; возвращает их число."""
+    owner = owner or uuid.uuid4().hex
+    done = 0
+    while (job := await claim(maker, owner)) is not None:
+        await run_job(maker, job, owner)
+        done += 1
+    return done
+
+
+class PurgeWorker:
+    """Фоновая задача воркера: ищет задания раз в purge_poll_interval или по wake()."""
+
+    def __init__(self) -> None:
+        self.owner = uuid.uuid4().hex
+        self._task: asyncio.Task[None] | None = None
+        self._wake = asyncio.Event()
+        self._maker: async_sessionmaker[AsyncSession] | None = None
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    async def _loop(self, maker: async_sessionmaker[AsyncSession]) -> None:
+        while True:
+            try:
+                await run_pending(maker, self.owner)
+            except Exception:
+                logger.exception("Очистка: не удалось взять задание")
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.purge_poll_interval)
+            except TimeoutError:
+                pass
+            self._wake.clear()
+
+    def start(self, maker: async_sessionmaker[AsyncSession]) -> None:
+        if self._task is None:
+            self._maker = maker
+            self._task = asyncio.create_task(self._loop(maker), name="purge-worker")
+
+    async def stop(self) -> None:
+        """Прерывает текущую пачку (она откатится) и снимает аренду своих заданий."""
+        if self._task is None or self._maker is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        try:
+            async with self._maker() as session:
+                await session.execute(
+                    update(PurgeJob)
+                    .where(PurgeJob.owner == self.owner, PurgeJob.status.in_(ACTIVE))
+                    .values(owner=None, lease_until=None)
+                )
+                await session.commit()
+        except Exception as exc:
+            logger.warning("Очистка: аренда не снята (%s), задание продолжится позже", exc)
+
+
+worker = PurgeWorker()
@@ -0,0 +1,66 @@
+"""
+Быстрый путь ответа для списков и карточек: dict из строки БД -> orjson.
+
+FastAPI по умолчанию валидирует возвращённое значение по response_model
+и сериализует его ещё раз через json. Данные из БД уже прошли схемы на
+входе, поэтому здесь ответ собирается один раз и сразу кодируется orjson.
+response_model у роутов остаются - только для OpenAPI.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import Row
+
+from app.models import Answer, Question
+
+# Порядок колонок = порядок полей в QuestionRead/AnswerRead,
+# чтобы байты ответа совпадали с тем, что отдавал pydantic.
+QUESTION_COLUMNS = (Question.text, Question.id, Question.created_at, Question.answers_count)
+ANSWER_COLUMNS = (Answer.user_id, Answer.text, Answer.id, Answer.question_id, Answer.created_at)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON-ответ через orjson; UTC пишется как «Z», как у pydantic."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+def row_dict(row: Row[Any]) -> dict[str, Any]:
+    """Строка select(*QUESTION_COLUMNS) / select(*ANSWER_COLUMNS) -> dict ответа."""
+    return dict(row._mapping)
+
+
+def answer_dict(obj: Answer) -> dict[str, Any]:
+    return {
+        "user_id": obj.user_id,
+        "text": obj.text,
+        "id": obj.id,
+        "question_id": obj.question_id,
+        "created_at": obj.created_at,
+    }
+
+
+def question_dict(obj: Question, with_answers: bool = False) -> dict[str, Any]:
+    data: dict[str, Any] = {
+        "text": obj.text,
+        "id": obj.id,
+        "created_at": obj.created_at,
+        "answers_count": obj.answers_count,
+    }
+    if with_answers:
+        data["answers"] = [answer_dict(a) for a in obj.answers]
+    return data
+
+
+def json_response(
+    content: Any, response: Response | None = None, status_code: int = 200
+) -> ORJSONResponse:
+    """ORJSONResponse с заголовками, которые роут успел положить в response."""
+    headers = dict(response.headers) if response is not None else None
+    return ORJSONResponse(content, status_code=status_code, headers=headers)
@@ -0,0 +1,185 @@
+"""
+Продовый запуск: несколько воркеров uvicorn, uvloop/httptools, пулы под max_connections.
+
+    poetry run python -m app.run
+
+- воркеров - settings.workers, по умолчанию по числу доступных CPU
+  (с учётом affinity и квоты cgroup в контейнере);
+- uvloop и httptools берутся, если установлены (extra «speed»), иначе -
+  asyncio и h11;
+- пул каждого воркера урезается так, чтобы воркеры * движки *
+  (pool_size + max_overflow) не превысили max_connections Postgres за
+  вычетом резерва; размеры передаются воркерам через окружение;
+- при нескольких воркерах с CACHE_BACKEND=memory TTL кэша объектов
+  урезается до cache_ttl_multi_worker (см. worker_settings);
+- остановка: по SIGTERM воркер сначала отвечает на /ready 503 «draining»
+  и ещё shutdown_ready_delay секунд принимает запросы (балансировщик
+  успевает убрать его из ротации, см. app.lifecycle), потом uvicorn
+  закрывает сокеты и ждёт открытые соединения graceful_timeout секунд,
+  lifespan дожидается запросов в работе и закрывает пулы.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import logging
+import math
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import uvicorn
+from uvicorn.config import LOGGING_CONFIG
+
+from app.core.logging_config import configure_logging
+from app.core.settings import settings
+
+logger = logging.getLogger("app.run")
+
+# если спросить у сервера не удалось
+DEFAULT_MAX_CONNECTIONS = 100
+
+
+def cpu_count() -> int:
+    """Сколько CPU реально доступно процессу: affinity и квота cgroup v2."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+@dataclass
+class PoolPlan:
+    pool_size: int
+    max_overflow: int
+
+    @property
+    def per_engine(self) -> int:
+        return self.pool_size + self.max_overflow
+
+
+def plan_pools(workers: int, engines: int, max_connections: int, reserved: int) -> PoolPlan:
+    """Размер пула одного движка одного воркера под общий лимит соединений.
+
+    Сначала урезается overflow, потом сам pool_size (но не меньше 1).
+    """
+    budget = max(1, (max_connections - reserved) // (workers * engines))
+    pool_size = min(settings.sql_pool_size, budget)
+    max_overflow = max(0, min(settings.sql_max_overflow, budget - pool_size))
+    return PoolPlan(pool_size=max(1, pool_size), max_overflow=max_overflow)
+
+
+async def _server_max_connections() -> int | None:
+    """SHOW max_connections у основной БД; None, если она недоступна."""
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    # не app.db: его движок создался бы с пулом до того, как main() его урежет
+    engine = create_async_engine(settings.DATABASE_URL_ASYNC, poolclass=NullPool)
+    try:
+        async with asyncio.timeout(settings.ready_timeout):
+            async with engine.connect() as conn:
+                value = (await conn.execute(text("SHOW max_connections"))).scalar_one()
+        return int(value)
+    except Exception as exc:
+        logger.warning("max_connections не получен у БД (%s)", exc)
+        return None
+    finally:
+        await engine.dispose()
+
+
+def max_connections() -> int:
+    if settings.db_max_connections:
+        return settings.db_max_connections
+    return asyncio.run(_server_max_connections()) or DEFAULT_MAX_CONNECTIONS
+
+
+def worker_settings(workers: int, plan: PoolPlan) -> dict[str, Any]:
+    """Настройки, которые main() подменяет воркерам: пул и TTL кэша объектов.
+
+    Кэш memory у каждого воркера свой, и удаление объекта чистит только
+    кэш обработавшего запрос воркера, поэтому при нескольких воркерах его
+    TTL урезается до cache_ttl_multi_worker.
+    """
+    values: dict[str, Any] = {
+        "sql_pool_size": plan.pool_size,
+        "sql_max_overflow": plan.max_overflow,
+    }
+    if (
+        workers > 1
+        and settings.cache_backend == "memory"
+        and settings.cache_ttl > settings.cache_ttl_multi_worker
+    ):
+        values["cache_ttl"] = settings.cache_ttl_multi_worker
+    return values
+
+
+def _implementation(preferred: str, fallback: str) -> str:
+    return preferred if importlib.util.find_spec(preferred) else fallback
+
+
+def main() -> None:
+    configure_logging()
+    workers = settings.workers or cpu_count()
+    engines = 2 if settings.sql_replica_url else 1
+    limit = max_connections()
+    plan = plan_pools(workers, engines, limit, settings.db_reserved_connections)
+    if workers * engines * plan.per_engine > limit - settings.db_reserved_connections:
+        logger.warning(
+            "Даже по 1 соединению на воркер выходит больше max_connections=%s: уменьшите WORKERS",
+            limit,
+        )
+    overrides = worker_settings(workers, plan)
+    if "cache_ttl" in overrides:
+        logger.warning(
+            "CACHE_BACKEND=memory у каждого из %s воркеров свой: CACHE_TTL урезан до %s с "
+            "(общий бэкенд - CACHE_BACKEND=модуль:Класс)",
+            workers,
+            overrides["cache_ttl"],
+        )
+    # воркеры - отдельные процессы и читают настройки из окружения;
+    # единственный воркер работает в этом же процессе - с этим же settings
+    for name, value in overrides.items():
+        os.environ[name.upper()] = str(value)
+        setattr(settings, name, value)
+
+    loop = _implementation("uvloop", "asyncio")
+    http = _implementation("httptools", "h11")
+    logger.info(
+        "Запуск: воркеров=%s loop=%s http=%s пул=%s+%s (max_connections=%s, резерв=%s)",
+        workers,
+        loop,
+        http,
+        plan.pool_size,
+        plan.max_overflow,
+        limit,
+        settings.db_reserved_connections,
+    )
+    uvicorn.run(
+        "app.main:app",
+        host=settings.app_host,
+        port=settings.app_port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        timeout_graceful_shutdown=settings.graceful_timeout,
+        timeout_keep_alive=settings.keep_alive_timeout,
+        # в режиме json логгеры uvicorn тоже идут через очередь (см. logging_config)
+        log_config=None if settings.log_format == "json" else LOGGING_CONFIG,
+        proxy_headers=True,
+        server_header=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,10 @@ Pydantic-схемы и минимальные проверки данных на
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List
+from typing import Any, List, Literal
 from uuid import UUID
 
-from pydantic import BaseModel, ConfigDict, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 
 
 class QuestionBase(BaseModel):
@@ -34,6 +34,7 @@ class QuestionRead(QuestionBase):
 
     id: int
     created_at: datetime
+    answers_count: int = 0
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -71,3 +72,71 @@ class QuestionWithAnswers(QuestionRead):
     """Вопрос вместе со списком ответов."""
 
     answers: List[AnswerRead] = Field(default_factory=list)
+
+
+class BulkItemError(BaseModel):
+    """Ошибка одного элемента bulk-запроса (index - позиция в теле)."""
+
+    index: int
+    errors: List[dict[str, Any]]
+
+
+class BulkResult(BaseModel):
+    """Итог bulk-загрузки: id созданных строк и ошибки по элементам."""
+
+    created: int
+    ids: List[int] = Field(default_factory=list)
+    errors: List[BulkItemError] = Field(default_factory=list)
+
+
+class AnswerTicket(BaseModel):
+    """Тикет ответа, принятого в очередь (режим answers_write_behind).
+
+    queued - ждёт записи, done - записан (answer_id), failed - не записан (detail).
+    """
+
+    ticket: str
+    status: Literal["queued", "done", "failed"]
+    question_id: int
+    answer_id: int | None = None
+    detail: str | None = None
+
+
+class PurgeQuestionsCreate(BaseModel):
+    """Очистка вопросов (вместе с ответами) по времени создания: [since, until)."""
+
+    since: datetime | None = None
+    until: datetime | None = None
+
+    @model_validator(mode="after")
+    def some_filter(self):
+        """Без фильтров задание удалило бы всё - не принимаем."""
+        if all(v is None for v in self.model_dump().values()):
+            raise ValueError("Нужен хотя бы один фильтр")
+        return self
+
+
+class PurgeAnswersCreate(PurgeQuestionsCreate):
+    """Очистка ответов по автору и/или времени создания."""
+
+    user_id: UUID | None = None
+
+
+class PurgeJobRead(BaseModel):
+    """Задание очистки и его прогресс."""
+
+    id: int
+    target: Literal["answers", "questions"]
+    status: Literal["pending", "running", "done", "failed"]
+    user_id: UUID | None = None
+    since: datetime | None = None
+    until: datetime | None = None
+    max_id: int
+    last_id: int
+    questions_deleted: int
+    answers_deleted: int
+    error: str | None = None
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,160 @@
+"""
+Полнотекстовый поиск по текстам вопросов и ответов.
+
+- Postgres: генерируемая колонка search_vector (tsvector) + GIN-индекс;
+- SQLite (тесты): внешняя FTS5-таблица <table>_fts, которую ведут триггеры.
+
+DDL вешается на after_create таблиц, поэтому create_all создаёт всё нужное;
+в проде то же самое делает миграция. Последовательного ILIKE нет нигде:
+на других СУБД поиск недоступен.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import (
+    DDL,
+    ColumnElement,
+    Select,
+    column,
+    event,
+    func,
+    literal_column,
+    select,
+    table,
+    tuple_,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.models import Answer, Base, Question
+from app.responses import ORJSONResponse, json_response
+
+# конфигурация текстового поиска Postgres (стемминг для русского)
+SEARCH_CONFIG = "russian"
+
+SEARCHABLE = (Question, Answer)
+
+
+class SearchUnavailable(RuntimeError):
+    """На этой СУБД нет индексного полнотекстового поиска."""
+
+
+def _register_ddl(model: type[Base]) -> None:
+    tbl = model.__table__
+    name = model.__tablename__
+    pg = [
+        f"ALTER TABLE {name} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS (to_tsvector('{SEARCH_CONFIG}', text)) STORED",
+        f"CREATE INDEX IF NOT EXISTS ix_{name}_search_vector ON {name} USING gin (search_vector)",
+    ]
+    sqlite = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {name}_fts USING fts5("
+        f"text, content='{name}', content_rowid='id', tokenize='unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_fts_ai AFTER INSERT ON {name} BEGIN "
+        f"INSERT INTO {name}_fts (rowid, text) VALUES (new.id, new.text); END",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_fts_ad AFTER DELETE ON {name} BEGIN "
+        f"INSERT INTO {name}_fts ({name}_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+        "END",
+    ]
+    for stmt in pg:
+        event.listen(tbl, "after_create", DDL(stmt).execute_if(dialect="postgresql"))
+    for stmt in sqlite:
+        event.listen(tbl, "after_create", DDL(stmt).execute_if(dialect="sqlite"))
+    event.listen(
+        tbl,
+        "before_drop",
+        DDL(f"DROP TABLE IF EXISTS {name}_fts").execute_if(dialect="sqlite"),
+    )
+
+
+for _model in SEARCHABLE:
+    _register_ddl(_model)
+
+
+def fts5_query(q: str) -> str:
+    """Пользовательский ввод -> запрос FTS5: каждое слово в кавычках, слова через AND."""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in q.split())
+
+
+def search_statement(
+    dialect: str,
+    model: type[Base],
+    columns: tuple[Any, ...],
+    q: str,
+    limit: int,
+    after: tuple[float, int] | None = None,
+    where: ColumnElement[bool] | None = None,
+) -> Select[Any]:
+    """SELECT columns + score по совпадениям q, от самых релевантных.
+
+    score - «больше = лучше» на обеих СУБД: ts_rank_cd в Postgres и -bm25
+    в SQLite. Страницы - keyset по (score, id) убыванию; ранжирующая функция
+    считается во вложенном запросе, потому что FTS5 не пускает bm25 в WHERE.
+    """
+    name = model.__tablename__
+    id_col = model.id  # type: ignore[attr-defined]
+    if dialect == "postgresql":
+        vector = literal_column(f"{name}.search_vector")
+        tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+        score: ColumnElement[Any] = func.ts_rank_cd(vector, tsquery)
+        inner = select(*columns, score.label("score")).where(vector.op("@@")(tsquery))
+    elif dialect == "sqlite":
+        fts = table(f"{name}_fts", column("rowid"))
+        fts_ref = literal_column(f"{name}_fts")
+        score = -func.bm25(fts_ref)
+        inner = (
+            select(*columns, score.label("score"))
+            .select_from(model)
+            .join(fts, fts.c.rowid == id_col)
+            .where(fts_ref.op("MATCH")(fts5_query(q)))
+        )
+    else:
+        raise SearchUnavailable(dialect)
+    if where is not None:
+        inner = inner.where(where)
+
+    sub = inner.subquery()
+    stmt = select(sub).order_by(sub.c.score.desc(), sub.c.id.desc())
+    if after is not None:
+        stmt = stmt.where(tuple_(sub.c.score, sub.c.id) < tuple_(*after))
+    return stmt.limit(limit)
+
+
+async def run(
+    session: AsyncSession,
+    response: Response,
+    model: type[Base],
+    columns: tuple[Any, ...],
+    q: str,
+    limit: int,
+    cursor: str | None,
+    where: ColumnElement[bool] | None = None,
+) -> ORJSONResponse:
+    """Общий код роутов поиска: курсор, выборка, X-Next-Cursor, тело ответа."""
+    after = None
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor, "score", "desc")
+        except InvalidCursor as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    if not q.split():
+        return json_response([], response)
+
+    dialect = session.get_bind().dialect.name
+    try:
+        stmt = search_statement(dialect, model, columns, q, limit + 1, after, where)
+    except SearchUnavailable:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Полнотекстовый поиск недоступен на этой СУБД",
+        )
+    rows = (await session.execute(stmt)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor("score", "desc", last.score, last.id)
+    content = [{k: v for k, v in row._mapping.items() if k != "score"} for row in rows]
+    return json_response(content, response)
@@ -0,0 +1,267 @@
+"""
+Приём ответов через очередь (write-behind) с групповым коммитом.
+
+При settings.answers_write_behind POST /questions/{id}/answers/ только
+валидирует тело, кладёт ответ в ограниченную очередь процесса и отвечает
+202 с тикетом - соединение из пула запросу не нужно. Фоновая задача
+(запускается в lifespan) выбирает ответы пачками: один SELECT
+существующих вопросов, один многострочный INSERT, счётчики и один коммит
+на пачку вместо коммита на каждый ответ.
+
+- полная очередь - 429, клиент повторит позже;
+- статусы тикетов - в отдельном хранилище (WRITE_BEHIND_TICKET_BACKEND), а не
+  в кэше объектов: всплеск, который заполняет очередь, не вытесняет тикеты
+  раньше TTL. По умолчанию это память процесса; при нескольких воркерах
+  статус виден только тому, кто принял ответ, - нужен общий бэкенд
+  ("модуль:Класс") или липкая маршрутизация по клиенту;
+- при остановке очередь дописывается не дольше write_behind_flush_timeout.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import counting, schemas
+from app.core import metrics
+from app.core.cache import CacheBackend, build_backend, cache, question_key
+from app.core.settings import settings
+from app.db import is_foreign_key_violation
+from app.models import Answer, Question
+
+logger = logging.getLogger(__name__)
+
+QUEUED = metrics.registry.register(
+    metrics.Counter(
+        "answers_queued_total", "Ответы, принятые в очередь или отклонённые", ("result",)
+    )
+)
+BATCH_SIZE = metrics.registry.register(
+    metrics.Histogram(
+        "answers_write_batch_size",
+        "Ответов в одной пачке записи",
+        buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000),
+    )
+)
+QUEUE_DEPTH = metrics.registry.register(
+    metrics.Gauge("answers_queue_depth", "Ответы в очереди на запись")
+)
+
+
+class QueueFull(Exception):
+    """Очередь заполнена (или закрыта при остановке) - ответ не принят."""
+
+
+def _ticket_store() -> CacheBackend:
+    # в памяти - не меньше тикетов, чем помещается в очередь
+    max_entries = max(settings.write_behind_ticket_max_entries, settings.write_behind_queue_size)
+    return build_backend(
+        settings.write_behind_ticket_backend, max_entries, settings.write_behind_ticket_ttl
+    )
+
+
+tickets: CacheBackend = _ticket_store()
+
+
+def ticket_key(ticket: str) -> str:
+    return f"answer_ticket:{ticket}"
+
+
+async def get_ticket(ticket: str) -> schemas.AnswerTicket | None:
+    data = await tickets.get(ticket_key(ticket))
+    return schemas.AnswerTicket.model_validate(data) if data is not None else None
+
+
+async def _save_tickets(items: Iterable[schemas.AnswerTicket]) -> None:
+    for item in items:
+        await tickets.set(
+            ticket_key(item.ticket), item.model_dump(), ttl=settings.write_behind_ticket_ttl
+        )
+
+
+@dataclass
+class Pending:
+    ticket: str
+    question_id: int
+    payload: schemas.AnswerCreate
+
+    def result(self, **kw: Any) -> schemas.AnswerTicket:
+        return schemas.AnswerTicket(ticket=self.ticket, question_id=self.question_id, **kw)
+
+
+class AnswerQueue:
+    """Ограниченная очередь ответов и фоновая задача, которая пишет их пачками."""
+
+    def __init__(self, maxsize: int, batch_size: int, linger: float) -> None:
+        self.queue: asyncio.Queue[Pending] = asyncio.Queue(maxsize)
+        self.batch_size = batch_size
+        self.linger = linger
+        self.closed = False
+        # выбранные из очереди, но ещё не отданные в запись (их допишет stop)
+        self._batch: list[Pending] = []
+        self._task: asyncio.Task[None] | None = None
+        self._writing: asyncio.Future[None] | None = None
+        self._maker: async_sessionmaker[AsyncSession] | None = None
+
+    async def submit(self, question_id: int, payload: schemas.AnswerCreate) -> schemas.AnswerTicket:
+        """Кладёт ответ в очередь; QueueFull, если места нет.
+
+        Тикет "queued" сохраняется до постановки в очередь: иначе писатель мог бы
+        успеть записать "done", а этот set - затереть его.
+        """
+        if self.closed or self.queue.full():
+            QUEUED.inc("rejected")
+            raise QueueFull
+        item = Pending(uuid.uuid4().hex, question_id, payload)
+        ticket = item.result(status="queued")
+        await _save_tickets([ticket])
+        # пока сохраняли тикет, очередь могли заполнить или закрыть
+        try:
+            if self.closed:
+                raise asyncio.QueueFull
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            QUEUED.inc("rejected")
+            await tickets.delete_many([ticket_key(item.ticket)])
+            raise QueueFull from None
+        QUEUED.inc("accepted")
+        return ticket
+
+    def _fill(self) -> None:
+        while len(self._batch) < self.batch_size and not self.queue.empty():
+            self._batch.append(self.queue.get_nowait())
+
+    def _take(self) -> list[Pending]:
+        self._fill()
+        batch, self._batch = self._batch, []
+        return batch
+
+    async def _run(self, maker: async_sessionmaker[AsyncSession]) -> None:
+        while True:
+            self._batch.append(await self.queue.get())
+            if self.linger and self.queue.qsize() < self.batch_size:
+                # даём пачке добраться: под нагрузкой очередь пополняется быстрее
+                await asyncio.sleep(self.linger)
+            # запись не прерываем: stop() её дождётся
+            self._writing = asyncio.ensure_future(self._write(maker, self._take()))
+            await asyncio.shield(self._writing)
+
+    async def _write(self, maker: async_sessionmaker[AsyncSession], batch: list[Pending]) -> None:
+        try:
+            await write(maker, batch)
+        finally:
+            for _ in batch:
+                self.queue.task_done()
+
+    async def flush(self, timeout: float) -> bool:
+        """Ждёт записи всего, что уже принято (приём не закрывается); False - не успели."""
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    def start(self, maker: async_sessionmaker[AsyncSession]) -> None:
+        if self._task is None:
+            self.closed = False
+            self._maker = maker
+            self._task = asyncio.create_task(self._run(maker), name="answers-write-behind")
+            QUEUE_DEPTH.set_function(self.queue.qsize)
+
+    async def stop(self, timeout: float) -> int:
+        """Перестаёт принимать ответы и дописывает очередь; возвращает, сколько не успели."""
+        self.closed = True
+        if self._task is None or self._maker is None:
+            return 0
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+        async def flush(maker: async_sessionmaker[AsyncSession]) -> None:
+            if self._writing is not None:
+                await asyncio.gather(self._writing, return_exceptions=True)
+            while self._batch or not self.queue.empty():
+                await self._write(maker, self._take())
+
+        try:
+            await asyncio.wait_for(flush(self._maker), timeout)
+        except TimeoutError:
+            pass
+        left = len(self._batch) + self.queue.qsize()
+        if left:
+            logger.error("Остановка: не записано ответов из очереди: %s", left)
+        return left
+
+
+async def _insert(session: AsyncSession, batch: list[Pending]) -> list[schemas.AnswerTicket]:
+    """Одна транзакция на пачку; ответы к несуществующим вопросам - failed."""
+    question_ids = {p.question_id for p in batch}
+    res = await session.execute(select(Question.id).where(Question.id.in_(question_ids)))
+    existing = set(res.scalars())
+    ok = [p for p in batch if p.question_id in existing]
+    results = [
+        p.result(status="failed", detail="Вопрос не найден")
+        for p in batch
+        if p.question_id not in existing
+    ]
+    if not ok:
+        return results
+
+    res = await session.execute(
+        insert(Answer).returning(Answer.id, sort_by_parameter_order=True),
+        [
+            {"question_id": p.question_id, "user_id": p.payload.user_id, "text": p.payload.text}
+            for p in ok
+        ],
+    )
+    ids = res.scalars().all()
+    per_question = Counter(p.question_id for p in ok)
+    # по возрастанию id: одинаковый порядок блокировок у параллельных пачек
+    for question_id in sorted(per_question):
+        await counting.adjust_answers_count(session, question_id, per_question[question_id])
+    await counting.adjust(session, Answer, len(ids))
+    await counting.commit(session)
+    await cache.delete_many([question_key(q) for q in per_question])
+    return results + [p.result(status="done", answer_id=i) for p, i in zip(ok, ids)]
+
+
+async def write(maker: async_sessionmaker[AsyncSession], batch: list[Pending]) -> None:
+    """Записывает пачку и обновляет тикеты; ошибки не пробрасывает."""
+    if not batch:
+        return
+    BATCH_SIZE.observe(len(batch))
+    results: list[schemas.AnswerTicket] = []
+    # второй заход - если вопрос удалили между SELECT и INSERT
+    for attempt in range(2):
+        try:
+            async with maker() as session:
+                results = await _insert(session, batch)
+            break
+        except IntegrityError as exc:
+            if attempt or not is_foreign_key_violation(exc):
+                logger.exception("Пачка ответов не записана (%s шт.)", len(batch))
+                results = [p.result(status="failed", detail="Ошибка записи") for p in batch]
+                break
+        except Exception:
+            logger.exception("Пачка ответов не записана (%s шт.)", len(batch))
+            results = [p.result(status="failed", detail="Ошибка записи") for p in batch]
+            break
+    await _save_tickets(results)
+    done = sum(r.status == "done" for r in results)
+    logger.info("Пачка ответов: записано=%s, отклонено=%s", done, len(results) - done)
+
+
+answers = AnswerQueue(
+    settings.write_behind_queue_size,
+    settings.write_behind_batch_size,
+    settings.write_behind_linger_ms / 1000,
+)
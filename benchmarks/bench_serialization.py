@@ -0,0 +1,74 @@
+"""
+Микробенчмарк сериализации страницы списка вопросов.
+
+Сравнивает прежний путь (model_validate на строку -> валидация по
+response_model -> json.dumps, как делает FastAPI + JSONResponse) с быстрым
+путём из app.responses (dict из строки -> orjson).
+
+Запуск:
+    poetry run python -m benchmarks.bench_serialization --rows 100 --repeat 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import timeit
+from datetime import UTC, datetime
+
+os.environ.setdefault("POSTGRES_USER", "bench")
+os.environ.setdefault("POSTGRES_PASSWORD", "bench")
+os.environ.setdefault("POSTGRES_DB", "bench")
+
+from pydantic import TypeAdapter  # noqa: E402
+
+from app import schemas  # noqa: E402
+from app.responses import ORJSONResponse  # noqa: E402
+
+
+def make_rows(n: int, text_len: int) -> list[dict]:
+    now = datetime.now(UTC)
+    return [
+        {"text": "т" * text_len, "id": i, "created_at": now, "answers_count": 0}
+        for i in range(1, n + 1)
+    ]
+
+
+def old_path(rows: list[dict], adapter: TypeAdapter) -> bytes:
+    items = [schemas.QuestionRead.model_validate(r) for r in rows]
+    # FastAPI: повторная валидация по response_model + dump в json-режиме
+    content = adapter.dump_python(adapter.validate_python(items), mode="json")
+    # Starlette JSONResponse.render
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def fast_path(rows: list[dict]) -> bytes:
+    return ORJSONResponse([dict(r) for r in rows]).body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--text-len", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.text_len)
+    adapter = TypeAdapter(list[schemas.QuestionRead])
+    # быстрый путь обязан отдавать ровно те же байты
+    assert old_path(rows, adapter) == fast_path(rows)
+
+    old = timeit.timeit(lambda: old_path(rows, adapter), number=args.repeat)
+    fast = timeit.timeit(lambda: fast_path(rows), number=args.repeat)
+    per = 1e6 / args.repeat
+    print(f"rows={args.rows} text_len={args.text_len} repeat={args.repeat}")
+    print(f"pydantic + json : {old * per:8.1f} µs/страница")
+    print(f"dict + orjson   : {fast * per:8.1f} µs/страница")
+    print(f"ускорение       : {old / fast:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
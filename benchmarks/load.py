@@ -0,0 +1,439 @@
+"""
+Нагрузочный прогон API: конкурентная смешанная нагрузка чтение/запись.
+
+Приложение вызывается в процессе через httpx.ASGITransport, как в тестах,
+с подменой сессий на указанную БД (SQLite-файл или локальный Postgres).
+По каждому маршруту (по шаблону пути) - число запросов, ошибки, RPS и
+p50/p95/p99. Отчёт пишется в JSON; с --baseline сравнивается с прошлым
+отчётом, и превышение порогов регрессии даёт код выхода 1.
+
+Запуск:
+    poetry run python -m benchmarks.load --questions 10000 --concurrency 32 --duration 30 \\
+        --out bench.json
+    poetry run python -m benchmarks.load --db-url postgresql+asyncpg://u:p@127.0.0.1/bench \\
+        --reuse --baseline bench.json --out bench-new.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+# маршрут считается в отчёте, только если по нему набралось столько запросов
+MIN_SAMPLES = 20
+
+
+@dataclass
+class Context:
+    """Состояние одного воркера: границы данных в БД и созданные им ответы."""
+
+    rng: random.Random
+    max_question_id: int
+    max_answer_id: int
+    users: list[Any]
+    words: tuple[str, ...]
+    created_answers: deque[int] = field(default_factory=deque)
+
+
+Request = tuple[str, str, dict[str, Any]]
+
+
+@dataclass
+class Op:
+    """Один тип запроса в смеси нагрузки."""
+
+    route: str
+    weight: float
+    write: bool
+    build: Callable[[Context], Request | None]
+    expect: tuple[int, ...] = (200,)
+    after: Callable[[Context, Any], None] | None = None
+
+
+def _qid(ctx: Context) -> int:
+    return ctx.rng.randint(1, max(ctx.max_question_id, 1))
+
+
+def _aid(ctx: Context) -> int:
+    return ctx.rng.randint(1, max(ctx.max_answer_id, 1))
+
+
+def _answer_body(ctx: Context) -> dict[str, Any]:
+    return {
+        "user_id": str(ctx.rng.choice(ctx.users)),
+        "text": "нагрузка " + ctx.rng.choice(ctx.words),
+    }
+
+
+def _remember_answer(ctx: Context, response: Any) -> None:
+    if response.status_code == 201:
+        ctx.created_answers.append(response.json()["id"])
+
+
+def _delete_created(ctx: Context) -> Request | None:
+    # удаляем только то, что создал сам прогон: исходный набор данных не редеет
+    if not ctx.created_answers:
+        return None
+    return "DELETE", f"/answers/{ctx.created_answers.popleft()}", {}
+
+
+def build_ops() -> list[Op]:
+    """Смесь запросов: веса - доли внутри группы чтения и группы записи."""
+    return [
+        Op(
+            "GET /questions/",
+            15,
+            False,
+            lambda c: ("GET", "/questions/", {"params": {"limit": 20}}),
+        ),
+        Op(
+            "GET /questions/?sort_by=answers_count",
+            5,
+            False,
+            lambda c: (
+                "GET",
+                "/questions/",
+                {"params": {"limit": 20, "sort_by": "answers_count", "order": "desc"}},
+            ),
+        ),
+        Op(
+            "GET /questions/?include=answers",
+            5,
+            False,
+            lambda c: ("GET", "/questions/", {"params": {"limit": 20, "include": "answers"}}),
+        ),
+        Op(
+            "GET /questions/{question_id}",
+            20,
+            False,
+            lambda c: ("GET", f"/questions/{_qid(c)}", {}),
+            expect=(200, 404),
+        ),
+        Op(
+            "GET /questions/{question_id}?include=answers",
+            10,
+            False,
+            lambda c: ("GET", f"/questions/{_qid(c)}", {"params": {"include": "answers"}}),
+            expect=(200, 404),
+        ),
+        Op(
+            "GET /answers/?question_id=",
+            10,
+            False,
+            lambda c: ("GET", "/answers/", {"params": {"question_id": _qid(c), "limit": 20}}),
+        ),
+        Op(
+            "GET /answers/{answer_id}",
+            15,
+            False,
+            lambda c: ("GET", f"/answers/{_aid(c)}", {}),
+            expect=(200, 404),
+        ),
+        Op(
+            "GET /users/{user_id}/answers",
+            10,
+            False,
+            lambda c: ("GET", f"/users/{c.rng.choice(c.users)}/answers", {}),
+        ),
+        Op(
+            "GET /questions/search",
+            5,
+            False,
+            lambda c: ("GET", "/questions/search", {"params": {"q": c.rng.choice(c.words)}}),
+        ),
+        Op(
+            "POST /questions/",
+            30,
+            True,
+            lambda c: (
+                "POST",
+                "/questions/",
+                {"json": {"text": "нагрузка " + c.rng.choice(c.words)}},
+            ),
+            expect=(201,),
+        ),
+        Op(
+            "POST /questions/{question_id}/answers/",
+            50,
+            True,
+            lambda c: ("POST", f"/questions/{_qid(c)}/answers/", {"json": _answer_body(c)}),
+            expect=(201, 404),
+            after=_remember_answer,
+        ),
+        Op("DELETE /answers/{answer_id}", 20, True, _delete_created, expect=(204,)),
+    ]
+
+
+class Recorder:
+    """Латентности (мс) и ошибки по маршрутам."""
+
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+
+    def add(self, route: str, ms: float, ok: bool) -> None:
+        self.latencies.setdefault(route, []).append(ms)
+        if not ok:
+            self.errors[route] = self.errors.get(route, 0) + 1
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Перцентиль методом ближайшего ранга по отсортированному списку."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(values: list[float], errors: int, elapsed: float) -> dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "errors": errors,
+        "rps": round(len(ordered) / elapsed, 1),
+        "p50_ms": round(percentile(ordered, 50), 3),
+        "p95_ms": round(percentile(ordered, 95), 3),
+        "p99_ms": round(percentile(ordered, 99), 3),
+        "max_ms": round(ordered[-1], 3) if ordered else 0.0,
+    }
+
+
+def compare(
+    current: dict[str, Any], baseline: dict[str, Any], max_p95: float, max_rps: float
+) -> list[str]:
+    """Регрессии относительно baseline: рост p95 или падение RPS сверх порогов."""
+    found = []
+    for route, now in current["routes"].items():
+        was = baseline.get("routes", {}).get(route)
+        if not was or min(now["count"], was["count"]) < MIN_SAMPLES:
+            continue
+        if was["p95_ms"] and now["p95_ms"] > was["p95_ms"] * (1 + max_p95):
+            found.append(f"{route}: p95 {was['p95_ms']} -> {now['p95_ms']} мс")
+        if was["rps"] and now["rps"] < was["rps"] * (1 - max_rps):
+            found.append(f"{route}: rps {was['rps']} -> {now['rps']}")
+    return found
+
+
+async def worker(
+    client: Any,
+    ctx: Context,
+    ops: list[Op],
+    weights: list[float],
+    deadline: float,
+    recorder: Recorder | None,
+) -> None:
+    while time.perf_counter() < deadline:
+        op = ctx.rng.choices(ops, weights)[0]
+        request = op.build(ctx)
+        if request is None:
+            continue
+        method, url, kwargs = request
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if recorder is not None:
+            recorder.add(op.route, elapsed_ms, response.status_code in op.expect)
+        if op.after is not None:
+            op.after(ctx, response)
+
+
+def _weights(ops: list[Op], write_share: float) -> list[float]:
+    """Веса так, чтобы доля записи в смеси была write_share."""
+    reads = sum(op.weight for op in ops if not op.write)
+    writes = sum(op.weight for op in ops if op.write)
+    return [
+        op.weight / writes * write_share if op.write else op.weight / reads * (1 - write_share)
+        for op in ops
+    ]
+
+
+def _git_rev() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    # app импортируется здесь: настройки (кэш и т.п.) читаются из окружения при импорте
+    from benchmarks import seed as seeding
+    from httpx import ASGITransport, AsyncClient
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    from app.db import (
+        get_read_session,
+        get_read_sessionmaker,
+        get_session,
+        get_sessionmaker,
+        make_engine,
+    )
+    from app.main import app
+
+    logging.getLogger().setLevel(logging.WARNING)
+    engine = make_engine(args.db_url)
+    maker = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def session_override():
+        async with maker() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = session_override
+    app.dependency_overrides[get_read_session] = session_override
+    app.dependency_overrides[get_read_sessionmaker] = lambda: maker
+    app.dependency_overrides[get_sessionmaker] = lambda: maker
+    try:
+        users = seeding.make_users(args.users, args.seed)
+        if args.reuse:
+            await seeding.create_schema(engine)
+            dataset = await seeding.describe(engine, users)
+        else:
+            await seeding.create_schema(engine, drop=True)
+            dataset = await seeding.seed(
+                engine, args.questions, args.answers_per_question, args.users, seed=args.seed
+            )
+
+        ops = build_ops()
+        weights = _weights(ops, args.write_share)
+        recorder = Recorder()
+        transport = ASGITransport(app=app)
+        async with app.router.lifespan_context(app):
+            async with AsyncClient(transport=transport, base_url="http://bench") as client:
+
+                async def phase(seconds: float, rec: Recorder | None) -> float:
+                    deadline = time.perf_counter() + seconds
+                    contexts = [
+                        Context(
+                            rng=random.Random(args.seed + i),
+                            max_question_id=dataset.max_question_id,
+                            max_answer_id=dataset.max_answer_id,
+                            users=dataset.users,
+                            words=tuple(seeding.WORDS),
+                        )
+                        for i in range(args.concurrency)
+                    ]
+                    started = time.perf_counter()
+                    await asyncio.gather(
+                        *(worker(client, c, ops, weights, deadline, rec) for c in contexts)
+                    )
+                    # за собой не оставляем созданные ответы - следующий прогон на --reuse
+                    for c in contexts:
+                        while (req := _delete_created(c)) is not None:
+                            await client.request(req[0], req[1])
+                    return time.perf_counter() - started
+
+                if args.warmup > 0:
+                    await phase(args.warmup, None)
+                elapsed = await phase(args.duration, recorder)
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+    all_latencies = [ms for values in recorder.latencies.values() for ms in values]
+    return {
+        "meta": {
+            "db": engine.dialect.name,
+            "questions": dataset.questions,
+            "answers": dataset.answers,
+            "users": len(dataset.users),
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "write_share": args.write_share,
+            "cache_backend": os.environ.get("CACHE_BACKEND", "memory"),
+            "page_cache": os.environ.get("PAGE_CACHE", "true"),
+            "python": platform.python_version(),
+            "git": _git_rev(),
+        },
+        "routes": {
+            route: summarize(values, recorder.errors.get(route, 0), elapsed)
+            for route, values in sorted(recorder.latencies.items())
+        },
+        "total": summarize(all_latencies, sum(recorder.errors.values()), elapsed),
+        "thresholds": {
+            "max_p95_regression": args.max_p95_regression,
+            "max_rps_regression": args.max_rps_regression,
+        },
+    }
+
+
+def print_report(report: dict[str, Any]) -> None:
+    header = f"{'маршрут':<48} {'n':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+    print(header)
+    print("-" * len(header))
+    rows = [*report["routes"].items(), ("ВСЕГО", report["total"])]
+    for route, s in rows:
+        print(
+            f"{route:<48} {s['count']:>7} {s['errors']:>5} {s['rps']:>8} "
+            f"{s['p50_ms']:>8} {s['p95_ms']:>8} {s['p99_ms']:>8}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db-url", help="по умолчанию - временный SQLite-файл")
+    parser.add_argument("--reuse", action="store_true", help="не пересоздавать и не заливать БД")
+    parser.add_argument("--questions", type=int, default=10_000)
+    parser.add_argument("--answers-per-question", type=float, default=3.0)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="секунд замера")
+    parser.add_argument("--warmup", type=float, default=3.0, help="секунд прогрева без замера")
+    parser.add_argument("--write-share", type=float, default=0.1, help="доля запросов записи")
+    parser.add_argument("--cache", choices=["memory", "none"], default="memory")
+    parser.add_argument("--no-page-cache", action="store_true")
+    parser.add_argument("--out", type=Path, default=Path("bench.json"))
+    parser.add_argument("--baseline", type=Path, help="прошлый отчёт для сравнения")
+    parser.add_argument("--max-p95-regression", type=float, default=0.2)
+    parser.add_argument("--max-rps-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.reuse and not args.db_url:
+        parser.error("--reuse требует --db-url")
+    if not args.db_url:
+        db_file = Path(tempfile.mkdtemp(prefix="bench-")) / "bench.sqlite3"
+        args.db_url = f"sqlite+aiosqlite:///{db_file}"
+    os.environ.setdefault("POSTGRES_USER", "bench")
+    os.environ.setdefault("POSTGRES_PASSWORD", "bench")
+    os.environ.setdefault("POSTGRES_DB", "bench")
+    os.environ["CACHE_BACKEND"] = args.cache
+    os.environ["PAGE_CACHE"] = "false" if args.no_page_cache else "true"
+
+    report = asyncio.run(run(args))
+    print_report(report)
+
+    regressions: list[str] = []
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare(report, baseline, args.max_p95_regression, args.max_rps_regression)
+        report["baseline"] = str(args.baseline)
+    report["regressions"] = regressions
+    args.out.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+    print(f"\nотчёт: {args.out}")
+    if regressions:
+        print("регрессии:", *regressions, sep="\n  ")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Наполнение БД для нагрузочного прогона: вопросы, ответы, счётчики.
+
+Данные детерминированы (--seed), тексты собираются из небольшого словаря,
+чтобы полнотекстовому поиску было что находить. Вставка - многострочными
+INSERT пачками, без ORM-объектов: 10M строк не должны упираться в память.
+
+Запуск отдельно от прогона (потом load --reuse):
+    poetry run python -m benchmarks.seed --db-url sqlite+aiosqlite:///bench.sqlite3 --questions 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import time
+import uuid
+from dataclasses import dataclass
+
+os.environ.setdefault("POSTGRES_USER", "bench")
+os.environ.setdefault("POSTGRES_PASSWORD", "bench")
+os.environ.setdefault("POSTGRES_DB", "bench")
+
+from sqlalchemy import delete, func, insert, select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine  # noqa: E402
+
+from app.db import make_engine  # noqa: E402
+from app.models import Answer, Base, Question, RowCounter  # noqa: E402
+
+WORDS = (
+    "зебра лошадь кот собака python база индекс запрос кэш очередь поток сервер "
+    "клиент ответ вопрос пагинация курсор счётчик транзакция блокировка реплика"
+).split()
+
+
+@dataclass
+class Dataset:
+    """Что лежит в БД: границы id и пользователи - из них генерируются запросы."""
+
+    questions: int
+    answers: int
+    max_question_id: int
+    max_answer_id: int
+    users: list[uuid.UUID]
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def make_users(count: int, seed: int) -> list[uuid.UUID]:
+    rng = random.Random(seed)
+    return [uuid.UUID(int=rng.getrandbits(128), version=4) for _ in range(count)]
+
+
+async def create_schema(engine: AsyncEngine, drop: bool = False) -> None:
+    async with engine.begin() as conn:
+        if drop:
+            await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def seed(
+    engine: AsyncEngine,
+    questions: int,
+    answers_per_question: float,
+    users: int,
+    batch: int = 10_000,
+    seed: int = 42,
+) -> Dataset:
+    """Заливает questions вопросов и в среднем answers_per_question ответов на каждый.
+
+    answers_count и row_counter заполняются сразу, как их вели бы пути записи.
+    """
+    rng = random.Random(seed)
+    user_ids = make_users(users, seed)
+    max_answers = max(0, round(answers_per_question * 2))
+    total_answers = 0
+    started = time.perf_counter()
+
+    for start in range(0, questions, batch):
+        size = min(batch, questions - start)
+        counts = [rng.randint(0, max_answers) for _ in range(size)]
+        q_rows = [{"text": _text(rng, 8), "answers_count": n} for n in counts]
+        async with engine.begin() as conn:
+            # id раздаёт БД (последовательность в Postgres не отстаёт от данных)
+            res = await conn.execute(
+                insert(Question).returning(Question.id, sort_by_parameter_order=True), q_rows
+            )
+            a_rows = [
+                {"question_id": qid, "user_id": rng.choice(user_ids), "text": _text(rng, 12)}
+                for qid, n in zip(res.scalars().all(), counts)
+                for _ in range(n)
+            ]
+            for a_start in range(0, len(a_rows), batch):
+                await conn.execute(insert(Answer), a_rows[a_start : a_start + batch])
+        total_answers += len(a_rows)
+        print(
+            f"  seed: вопросов {start + size}/{questions}, ответов {total_answers} "
+            f"({time.perf_counter() - started:.0f} c)",
+            flush=True,
+        )
+
+    async with engine.begin() as conn:
+        await sync_counters(conn)
+    return await describe(engine, user_ids)
+
+
+async def sync_counters(conn: AsyncConnection) -> None:
+    """row_counter = COUNT(*) по таблицам, версия - с единицы."""
+    for model in (Question, Answer):
+        value = await conn.scalar(select(func.count()).select_from(model))
+        await conn.execute(delete(RowCounter).where(RowCounter.name == model.__tablename__))
+        await conn.execute(
+            insert(RowCounter).values(name=model.__tablename__, value=value, version=1)
+        )
+
+
+async def describe(engine: AsyncEngine, users: list[uuid.UUID]) -> Dataset:
+    """Dataset по уже залитой БД (для --reuse)."""
+    async with engine.connect() as conn:
+        return Dataset(
+            questions=await conn.scalar(select(func.count()).select_from(Question)),
+            answers=await conn.scalar(select(func.count()).select_from(Answer)),
+            max_question_id=(await conn.scalar(select(func.max(Question.id)))) or 0,
+            max_answer_id=(await conn.scalar(select(func.max(Answer.id)))) or 0,
+            users=users,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db-url", required=True)
+    parser.add_argument("--questions", type=int, default=10_000)
+    parser.add_argument("--answers-per-question", type=float, default=3.0)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--drop", action="store_true", help="пересоздать схему")
+    args = parser.parse_args()
+
+    async def run() -> Dataset:
+        engine = make_engine(args.db_url)
+        try:
+            await create_schema(engine, drop=args.drop)
+            return await seed(
+                engine,
+                args.questions,
+                args.answers_per_question,
+                args.users,
+                batch=args.batch,
+                seed=args.seed,
+            )
+        finally:
+            await engine.dispose()
+
+    data = asyncio.run(run())
+    print(f"готово: вопросов={data.questions} ответов={data.answers}")
+
+
+if __name__ == "__main__":
+    main()
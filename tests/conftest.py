@@ -19,9 +19,19 @@ from collections.abc import AsyncGenerator
 import pytest
 import pytest_asyncio
 from httpx import ASGITransport, AsyncClient
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-
-from app.db import get_session
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.cache import cache
+from app.core.etag import pages
+from app.core.request_stats import parse_server_timing
+from app.db import (
+    get_read_session,
+    get_read_sessionmaker,
+    get_session,
+    get_sessionmaker,
+    make_engine,
+)
 from app.main import app
 from app.models import Base
 
@@ -49,7 +59,8 @@ def test_db_url(tmp_path_factory) -> str:
 
 @pytest_asyncio.fixture(scope="session")
 async def engine_test(test_db_url):
-    engine = create_async_engine(test_db_url, echo=False, future=True)
+    # тот же конструктор, что и в приложении: для SQLite включает проверку FK
+    engine = make_engine(test_db_url)
     try:
         # Создаём таблицы один раз на сессию
         async with engine.begin() as conn:
@@ -81,8 +92,9 @@ async def db_session(session_maker) -> AsyncGenerator[AsyncSession, None]:
 @pytest_asyncio.fixture(autouse=True)
 async def override_session_dependency(session_maker):
     """
-    Подмена зависим-ти get_session у приложения на тестовый Session.
+    Подмена зависим-тей get_session/get_read_session у приложения на тестовый Session.
     Делается AUTOUSE, чтобы действовало во всех тестах автоматически.
+    Чтение и запись идут в одну БД - «реплика» без отставания.
     """
 
     async def _get_session_override() -> AsyncGenerator[AsyncSession, None]:
@@ -90,10 +102,41 @@ async def override_session_dependency(session_maker):
             yield session
 
     app.dependency_overrides[get_session] = _get_session_override
+    app.dependency_overrides[get_read_session] = _get_session_override
+    app.dependency_overrides[get_read_sessionmaker] = lambda: session_maker
+    app.dependency_overrides[get_sessionmaker] = lambda: session_maker
     try:
         yield
     finally:
         app.dependency_overrides.pop(get_session, None)
+        app.dependency_overrides.pop(get_read_session, None)
+        app.dependency_overrides.pop(get_read_sessionmaker, None)
+        app.dependency_overrides.pop(get_sessionmaker, None)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Кэш по id и кэш страниц живут в процессе - у каждого теста они свои, пустые."""
+    cache.clear()
+    pages.clear()
+    yield
+    cache.clear()
+    pages.clear()
+
+
+@pytest.fixture
+def sql_statements(engine_test):
+    """Список SQL-выражений, которые ушли в БД за время теста."""
+    statements: list[str] = []
+
+    def _record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine_test.sync_engine, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine_test.sync_engine, "before_cursor_execute", _record)
 
 
 @pytest_asyncio.fixture
@@ -106,3 +149,20 @@ async def client() -> AsyncGenerator[AsyncClient, None]:
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://testserver") as c:
         yield c
+
+
+@pytest.fixture
+def assert_statements(client):
+    """Выполняет запрос и проверяет число SQL-выражений по заголовку Server-Timing.
+
+    Фиксирует «цену» маршрута в раундтрипах: лишний запрос к БД роняет тест.
+        r = await assert_statements(2, "GET", "/questions/", params={"limit": 5})
+    """
+
+    async def check(expected: int, method: str, url: str, **kwargs):
+        r = await client.request(method, url, **kwargs)
+        got = int(parse_server_timing(r.headers["Server-Timing"])["sql"])
+        assert got == expected, f"{method} {url}: {got} SQL-выражений, ожидалось {expected}"
+        return r
+
+    return check
@@ -0,0 +1,79 @@
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.core import admission
+from app.core.settings import settings
+from app.db import get_session
+from app.main import app
+
+
+@pytest.fixture
+def tight_limits(monkeypatch):
+    # по одному месту на группу, ждать 10 мс, очередь на одного
+    limits = {
+        g: admission.Limiter(g, 1, max_queue=1, max_wait=0.01) for g in ("read", "write", "export")
+    }
+    monkeypatch.setattr(admission, "limiters", limits)
+    return limits
+
+
+@pytest.mark.asyncio
+async def test_admission_sheds_over_limit_per_group(client, tight_limits):
+    await tight_limits["read"].acquire()
+    try:
+        r = await client.get("/questions/")
+        assert r.status_code == 503
+        assert r.headers["Retry-After"] == "1"
+        # запись и проверки живости - мимо занятой группы чтения
+        assert (await client.post("/questions/", json={"text": "Вопрос"})).status_code == 201
+        assert (await client.get("/")).status_code == 200
+    finally:
+        tight_limits["read"].release()
+    assert (await client.get("/questions/")).status_code == 200
+    assert tight_limits["read"].active == 0
+
+    body = (await client.get("/metrics")).text
+    assert 'admission_rejected_total{group="read",reason="timeout"} 1' in body
+    assert 'admission_queue_depth{group="read"} 0' in body
+
+
+@pytest.mark.asyncio
+async def test_export_has_its_own_group(client, tight_limits):
+    await tight_limits["export"].acquire()
+    try:
+        assert (await client.get("/export/questions")).status_code == 503
+        # долгие выгрузки не занимают места коротких чтений
+        assert (await client.get("/questions/")).status_code == 200
+    finally:
+        tight_limits["export"].release()
+    assert (await client.get("/export/questions")).status_code == 200
+
+
+def test_default_limits_follow_pool_size(monkeypatch):
+    monkeypatch.setattr(settings, "sql_pool_size", 4)
+    monkeypatch.setattr(settings, "sql_max_overflow", 3)
+    assert admission._limiter("read", None).limit == 7
+    assert admission._limiter("read", 0) is None
+    assert admission._limiter("export", 2).limit == 2
+
+
+@pytest.mark.asyncio
+async def test_limiter_queue_full_fails_fast(tight_limits):
+    limiter = admission.Limiter("read", 1, max_queue=0, max_wait=10)
+    await limiter.acquire()
+    with pytest.raises(admission.Overloaded) as exc:
+        await limiter.acquire()
+    assert exc.value.reason == "queue_full"
+    limiter.release()
+
+
+@pytest.mark.asyncio
+async def test_pool_timeout_is_503(client):
+    async def exhausted_pool():
+        raise PoolTimeoutError("QueuePool limit reached")
+        yield
+
+    app.dependency_overrides[get_session] = exhausted_pool
+    r = await client.post("/questions/", json={"text": "Вопрос"})
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
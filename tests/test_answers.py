@@ -1,4 +1,11 @@
+from datetime import UTC, datetime
+from uuid import UUID
+
 import pytest
+from sqlalchemy import select, update
+
+from app.core.cache import cache
+from app.models import Answer
 
 
 @pytest.mark.asyncio
@@ -39,3 +46,185 @@ async def test_answer_validation_text_required(client):
     payload = {"user_id": "00000000-0000-0000-0000-000000000000", "text": "   "}
     r = await client.post(f"/questions/{qid}/answers/", json=payload)
     assert r.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_list_answers_cursor_pagination(client):
+    qid = (await client.post("/questions/", json={"text": "Много ответов"})).json()["id"]
+    payload = {"user_id": "00000000-0000-0000-0000-000000000000", "text": "ответ"}
+    created = [
+        (await client.post(f"/questions/{qid}/answers/", json=payload)).json()["id"]
+        for _ in range(5)
+    ]
+
+    seen, cursor = [], None
+    while True:
+        params = {"question_id": qid, "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        r = await client.get("/answers/", params=params)
+        assert r.status_code == 200
+        seen.extend(i["id"] for i in r.json())
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == created
+
+
+@pytest.mark.asyncio
+async def test_answer_write_paths_round_trips(client, sql_statements):
+    qid = (await client.post("/questions/", json={"text": "RT ответы"})).json()["id"]
+    payload = {"user_id": "00000000-0000-0000-0000-000000000000", "text": "быстро"}
+
+    await client.post(f"/questions/{qid}/answers/", json=payload)  # заводим счётчик
+
+    # INSERT ... RETURNING + UPDATE question.answers_count + UPDATE row_counter
+    sql_statements.clear()
+    r = await client.post(f"/questions/{qid}/answers/", json=payload)
+    assert r.status_code == 201
+    assert len(sql_statements) == 3
+    assert sql_statements[0].startswith("INSERT") and "RETURNING" in sql_statements[0]
+
+    # DELETE ... RETURNING + UPDATE question.answers_count + UPDATE row_counter
+    sql_statements.clear()
+    assert (await client.delete(f"/answers/{r.json()['id']}")).status_code == 204
+    assert len(sql_statements) == 3
+
+
+@pytest.mark.asyncio
+async def test_create_answer_missing_question_via_fk(client, sql_statements):
+    payload = {"user_id": "00000000-0000-0000-0000-000000000000", "text": "в пустоту"}
+    sql_statements.clear()
+    r = await client.post("/questions/999999/answers/", json=payload)
+    assert r.status_code == 404
+    assert len(sql_statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_delete_question_cascades_answers(client):
+    qid = (await client.post("/questions/", json={"text": "каскад"})).json()["id"]
+    payload = {"user_id": "00000000-0000-0000-0000-000000000000", "text": "уйдёт с вопросом"}
+    aid = (await client.post(f"/questions/{qid}/answers/", json=payload)).json()["id"]
+
+    assert (await client.delete(f"/questions/{qid}")).status_code == 204
+    assert (await client.get(f"/answers/{aid}")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_user_answers_keyset(client, db_session):
+    user = "00000000-0000-0000-0000-0000000000aa"
+    other = "00000000-0000-0000-0000-0000000000bb"
+    qid = (await client.post("/questions/", json={"text": "Чьи ответы"})).json()["id"]
+    mine = []
+    for i in range(5):
+        r = await client.post(f"/questions/{qid}/answers/", json={"user_id": user, "text": f"{i}"})
+        mine.append(r.json()["id"])
+        await client.post(f"/questions/{qid}/answers/", json={"user_id": other, "text": "чужой"})
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        r = await client.get(f"/users/{user}/answers", params=params)
+        assert r.status_code == 200
+        assert {i["user_id"] for i in r.json()} == {user}
+        seen.extend(i["id"] for i in r.json())
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == mine
+
+    # колонка типа Uuid: из БД приходит UUID, а не строка
+    stored = await db_session.scalar(select(Answer.user_id).where(Answer.id == mine[0]))
+    assert stored == UUID(user)
+
+    r = await client.get(f"/users/{user}/answers", params={"limit": 1, "cursor": "мусор"})
+    assert r.status_code == 400
+    assert (await client.get("/users/not-a-uuid/answers")).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_write_behind_tickets_and_group_commit(client, session_maker, monkeypatch):
+    from app import write_behind
+    from app.core.settings import settings
+
+    queue = write_behind.AnswerQueue(maxsize=3, batch_size=10, linger=0)
+    monkeypatch.setattr(write_behind, "answers", queue)
+    monkeypatch.setattr(settings, "answers_write_behind", True)
+    qid = (await client.post("/questions/", json={"text": "Вирусный вопрос"})).json()["id"]
+    payload = {"user_id": "00000000-0000-0000-0000-000000000001", "text": "Ответ"}
+
+    # воркер не запущен: очередь копится, 4-й ответ не влезает
+    tickets = []
+    for target in (qid, qid, 10**9):
+        r = await client.post(f"/questions/{target}/answers/", json=payload)
+        assert r.status_code == 202
+        assert r.headers["Location"] == f"/answers/tickets/{r.json()['ticket']}"
+        tickets.append(r.json()["ticket"])
+    r = await client.post(f"/questions/{qid}/answers/", json=payload)
+    assert r.status_code == 429
+    assert r.headers["Retry-After"] == "1"
+    # тикеты не в кэше объектов: его сброс/вытеснение их не теряет
+    cache.clear()
+    assert write_behind.tickets is not cache
+    assert (await client.get(f"/answers/tickets/{tickets[0]}")).json()["status"] == "queued"
+
+    # воркер пишет накопленное одной пачкой
+    queue.start(session_maker)
+    assert await queue.flush(timeout=5)
+    done = [(await client.get(f"/answers/tickets/{t}")).json() for t in tickets]
+    assert [d["status"] for d in done] == ["done", "done", "failed"]
+    assert done[2]["detail"] == "Вопрос не найден"
+    r = await client.get(f"/answers/{done[0]['answer_id']}")
+    assert r.json()["question_id"] == qid
+    assert (await client.get(f"/questions/{qid}")).json()["answers_count"] == 2
+    assert (await client.get("/answers/tickets/нет-такого")).status_code == 404
+
+    # остановка дописывает остаток и закрывает приём
+    last = (await client.post(f"/questions/{qid}/answers/", json=payload)).json()["ticket"]
+    assert await queue.stop(timeout=5) == 0
+    assert (await client.get(f"/answers/tickets/{last}")).json()["status"] == "done"
+    assert (await client.get(f"/questions/{qid}")).json()["answers_count"] == 3
+    r = await client.post(f"/questions/{qid}/answers/", json=payload)
+    assert r.status_code == 429
+
+
+@pytest.mark.asyncio
+async def test_write_behind_ticket_saved_before_enqueue(monkeypatch):
+    from app import schemas, write_behind
+
+    queue = write_behind.AnswerQueue(maxsize=1, batch_size=10, linger=0)
+    payload = schemas.AnswerCreate(user_id="00000000-0000-0000-0000-000000000001", text="a")
+    saved = []
+    put = queue.queue.put_nowait
+
+    def put_nowait(item):
+        # писатель может взять элемент сразу: "queued" к этому моменту уже сохранён
+        saved.append(write_behind.ticket_key(item.ticket) in write_behind.tickets._data)
+        put(item)
+
+    monkeypatch.setattr(queue.queue, "put_nowait", put_nowait)
+    ticket = await queue.submit(1, payload)
+    assert saved == [True]
+    assert (await write_behind.get_ticket(ticket.ticket)).status == "queued"
+    with pytest.raises(write_behind.QueueFull):
+        await queue.submit(1, payload)
+
+
+@pytest.mark.asyncio
+async def test_list_answers_time_window(client, db_session):
+    qid = (await client.post("/questions/", json={"text": "Вопрос по времени"})).json()["id"]
+    payload = {"user_id": "00000000-0000-0000-0000-000000000002", "text": "Ответ"}
+    old = (await client.post(f"/questions/{qid}/answers/", json=payload)).json()
+    await db_session.execute(
+        update(Answer)
+        .where(Answer.id == old["id"])
+        .values(created_at=datetime(2020, 1, 15, tzinfo=UTC))
+    )
+    await db_session.commit()
+    new = (await client.post(f"/questions/{qid}/answers/", json=payload)).json()
+
+    params = {"question_id": qid}
+    r = await client.get("/answers/", params={**params, "since": "2021-01-01T00:00:00Z"})
+    assert [a["id"] for a in r.json()] == [new["id"]]
+    r = await client.get("/answers/", params={**params, "until": "2021-01-01T00:00:00Z"})
+    assert [a["id"] for a in r.json()] == [old["id"]]
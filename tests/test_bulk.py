@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from app.core.settings import settings
+
+USER = "00000000-0000-0000-0000-000000000000"
+
+
+@pytest.mark.asyncio
+async def test_bulk_questions_json_array_reports_item_errors(client, monkeypatch):
+    monkeypatch.setattr(settings, "bulk_batch_size", 2)
+    body = [{"text": "B0"}, {"text": "   "}, {"text": "B2"}, {"nope": 1}, {"text": "B4"}]
+
+    r = await client.post("/questions/bulk", json=body)
+    assert r.status_code == 200
+    data = r.json()
+    assert data["created"] == 3
+    assert [e["index"] for e in data["errors"]] == [1, 3]
+
+    texts = [(await client.get(f"/questions/{i}")).json()["text"] for i in data["ids"]]
+    assert texts == ["B0", "B2", "B4"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_questions_rejects_non_array(client):
+    r = await client.post("/questions/bulk", json={"text": "не массив"})
+    assert r.status_code == 400
+    headers = {"Content-Type": "application/json"}
+    for body in (b'[{"text": ', b'[{"text": "\xff\xfe"}]'):  # битый JSON и не UTF-8
+        r = await client.post("/questions/bulk", content=body, headers=headers)
+        assert r.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_bulk_answers_ndjson_stream(client, monkeypatch):
+    monkeypatch.setattr(settings, "bulk_batch_size", 2)
+    qid = (await client.post("/questions/", json={"text": "Для bulk"})).json()["id"]
+
+    lines = [json.dumps({"user_id": USER, "text": f"A{i}"}) for i in range(4)]
+    lines.insert(2, "{битый json")
+
+    async def body():
+        # отдаём поток кусками, которые режут строки посередине
+        raw = ("\n".join(lines) + "\n").encode()
+        for i in range(0, len(raw), 7):
+            yield raw[i : i + 7]
+
+    r = await client.post(
+        f"/questions/{qid}/answers/bulk",
+        content=body(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert r.status_code == 200
+    data = r.json()
+    assert data["created"] == 4
+    assert [e["index"] for e in data["errors"]] == [2]
+
+    listed = (await client.get("/answers/", params={"question_id": qid})).json()
+    assert [a["text"] for a in listed] == ["A0", "A1", "A2", "A3"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_answers_unknown_question(client):
+    r = await client.post("/questions/999999/answers/bulk", json=[])
+    assert r.status_code == 404
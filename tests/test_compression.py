@@ -0,0 +1,93 @@
+import gzip
+
+import pytest
+
+from app.core import compression
+from app.core.settings import settings
+
+LONG = "Длинный текст вопроса, который хорошо сжимается. " * 20
+
+
+async def _seed(client, n: int = 5) -> None:
+    """Вопросы с длинным текстом; ответ - чтобы завести счётчик ответов (ETag списков)."""
+    for i in range(n):
+        r = await client.post("/questions/", json={"text": f"{i} {LONG}"})
+        assert r.status_code == 201
+    answer = {"user_id": "00000000-0000-0000-0000-000000000001", "text": "Ответ"}
+    await client.post(f"/questions/{r.json()['id']}/answers/", json=answer)
+
+
+def test_negotiate_q_values_and_server_preference(monkeypatch):
+    monkeypatch.setattr(settings, "compression_encodings", "br,zstd,gzip")
+    best = compression.available()[0]
+    assert compression.negotiate("gzip, br, zstd") == best
+    assert compression.negotiate("gzip;q=0.5, identity") == "gzip"
+    assert compression.negotiate("gzip;q=0") is None
+    assert compression.negotiate("*;q=0.1, gzip;q=0") == (best if best != "gzip" else None)
+    assert compression.negotiate("deflate") is None
+    assert compression.negotiate(None) is None
+
+
+@pytest.mark.asyncio
+async def test_large_list_gzipped_small_body_not(client, monkeypatch):
+    monkeypatch.setattr(settings, "page_cache", False)
+    await _seed(client)
+    r = await client.get("/questions/?limit=100", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in r.headers["vary"]
+    assert int(r.headers["content-length"]) < len(r.content) / 3
+    assert len(r.json()) >= 5
+    # ETag и X-Total-Count роута сохраняются
+    assert "etag" in r.headers and "x-total-count" in r.headers
+
+    r = await client.get("/questions/?limit=100", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in r.headers
+    assert "Accept-Encoding" in r.headers["vary"]
+
+    r = await client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers
+
+
+@pytest.mark.asyncio
+async def test_cached_page_is_compressed_once(client, monkeypatch):
+    await _seed(client)
+    calls = []
+    codec = compression.CODECS["gzip"]
+
+    def counting(body: bytes) -> bytes:
+        calls.append(len(body))
+        return codec.compress(body)
+
+    monkeypatch.setitem(
+        compression.CODECS, "gzip", compression.Codec("gzip", counting, codec.stream)
+    )
+    hits = compression.RESPONSES.values.get(("gzip", "cache"), 0)
+    url, headers = "/questions/?limit=99", {"Accept-Encoding": "gzip"}
+    first = await client.get(url, headers=headers)
+    second = await client.get(url, headers=headers)
+    assert first.headers["content-encoding"] == second.headers["content-encoding"] == "gzip"
+    assert first.json() == second.json()
+    assert len(calls) == 1
+    assert compression.RESPONSES.values[("gzip", "cache")] == hits + 1
+
+    # клиент без сжатия получает исходные байты из той же записи
+    plain = await client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.json() == first.json()
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_streaming_export_compressed_in_chunks(client):
+    await _seed(client, 3)
+    sent = compression.SENT_BYTES.values.get(("gzip",), 0)
+    async with client.stream("GET", "/export/questions", headers={"Accept-Encoding": "gzip"}) as r:
+        raw = b"".join([chunk async for chunk in r.aiter_raw()])
+    assert r.headers["content-encoding"] == "gzip"
+    assert "content-length" not in r.headers
+    lines = gzip.decompress(raw).decode().splitlines()
+    assert LONG.strip() in lines[-1]
+    assert compression.SENT_BYTES.values[("gzip",)] == sent + len(raw)
+
+    body = (await client.get("/metrics")).text
+    assert 'http_compression_responses_total{encoding="gzip",source="stream"}' in body
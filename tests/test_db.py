@@ -0,0 +1,89 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.settings import settings
+from app.db import get_read_session, get_session, make_engine
+from app.main import app
+from app.models import Base, Question
+from app.run import PoolPlan, cpu_count, plan_pools, worker_settings
+
+
+def test_make_engine_uses_pool_settings(monkeypatch):
+    monkeypatch.setattr(settings, "sql_pool_size", 7)
+    monkeypatch.setattr(settings, "sql_max_overflow", 3)
+    monkeypatch.setattr(settings, "sql_pool_timeout", 1.5)
+    monkeypatch.setattr(settings, "sql_statement_cache_size", 0)
+
+    # соединение при создании движка не открывается, сервер не нужен
+    engine = make_engine("postgresql+asyncpg://u:p@127.0.0.1:5432/db")
+    pool = engine.sync_engine.pool
+    assert pool.size() == 7
+    assert pool._max_overflow == 3
+    assert pool._timeout == 1.5
+    assert engine.url.query["prepared_statement_cache_size"] == "0"
+
+
+def test_plan_pools_fits_max_connections(monkeypatch):
+    monkeypatch.setattr(settings, "sql_pool_size", 5)
+    monkeypatch.setattr(settings, "sql_max_overflow", 10)
+
+    # запас есть - настройки не трогаем
+    assert plan_pools(2, 1, 100, 10).per_engine == 15
+    # 8 воркеров * 2 движка на 90 соединений: по 5 на движок, overflow срезан
+    plan = plan_pools(8, 2, 100, 10)
+    assert (plan.pool_size, plan.max_overflow) == (5, 0)
+    assert 8 * 2 * plan.per_engine <= 90
+    # 64 воркера: меньше 1 не бывает
+    assert plan_pools(64, 1, 50, 10).per_engine == 1
+    assert cpu_count() >= 1
+
+
+def test_worker_settings_cap_memory_cache_ttl(monkeypatch):
+    monkeypatch.setattr(settings, "cache_backend", "memory")
+    monkeypatch.setattr(settings, "cache_ttl", 300.0)
+    plan = PoolPlan(pool_size=3, max_overflow=2)
+    assert worker_settings(1, plan) == {"sql_pool_size": 3, "sql_max_overflow": 2}
+    assert worker_settings(4, plan)["cache_ttl"] == settings.cache_ttl_multi_worker
+    # у общего бэкенда кэш один на всех - TTL не трогаем
+    monkeypatch.setattr(settings, "cache_backend", "tests.shared:Cache")
+    assert "cache_ttl" not in worker_settings(4, plan)
+
+
+@pytest.mark.asyncio
+async def test_get_routes_read_from_replica(tmp_path):
+    # primary и «реплика» - два разных файла SQLite
+    primary = make_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.sqlite3'}")
+    replica = make_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.sqlite3'}")
+    for eng in (primary, replica):
+        async with eng.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    def _override(maker):
+        async def _dep():
+            async with maker() as session:
+                yield session
+
+        return _dep
+
+    primary_maker = async_sessionmaker(primary, expire_on_commit=False)
+    replica_maker = async_sessionmaker(replica, expire_on_commit=False)
+    app.dependency_overrides[get_session] = _override(primary_maker)
+    app.dependency_overrides[get_read_session] = _override(replica_maker)
+
+    try:
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://testserver") as c:
+            qid = (await c.post("/questions/", json={"text": "в primary"})).json()["id"]
+            # запись ушла в primary, а чтение смотрит в реплику, где строки ещё нет
+            assert (await c.get(f"/questions/{qid}")).status_code == 404
+
+            async with replica_maker() as s:
+                s.add(Question(id=qid, text="доехало до реплики"))
+                await s.commit()
+            r = await c.get(f"/questions/{qid}")
+            assert r.status_code == 200
+            assert r.json()["text"] == "доехало до реплики"
+    finally:
+        await primary.dispose()
+        await replica.dispose()
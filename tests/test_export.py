@@ -0,0 +1,54 @@
+import csv
+import io
+import json
+
+import pytest
+
+from app import schemas
+from app.core.settings import settings
+
+USER = "00000000-0000-0000-0000-000000000000"
+
+
+async def _question_with_answers(client, text, n_answers):
+    qid = (await client.post("/questions/", json={"text": text})).json()["id"]
+    for i in range(n_answers):
+        await client.post(
+            f"/questions/{qid}/answers/", json={"user_id": USER, "text": f"{text}-{i}"}
+        )
+    return qid
+
+
+@pytest.mark.asyncio
+async def test_export_ndjson_streams_questions_with_answers(client, monkeypatch):
+    # маленькие пачки, чтобы выгрузка прошла через несколько транзакций,
+    # а ответы одного вопроса - через несколько чтений
+    monkeypatch.setattr(settings, "export_chunk_size", 2)
+    monkeypatch.setattr(settings, "export_yield_per", 1)
+    monkeypatch.setattr(settings, "export_answers_batch", 2)
+    ids = [await _question_with_answers(client, f"E{i}", n) for i, n in enumerate((0, 1, 5))]
+
+    r = await client.get("/export/questions")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    records = {rec["id"]: rec for rec in lines}
+    for line in r.text.splitlines():
+        assert schemas.QuestionWithAnswers.model_validate_json(line).model_dump_json() == line
+
+    assert [len(records[qid]["answers"]) for qid in ids] == [0, 1, 5]
+    assert [a["text"] for a in records[ids[2]]["answers"]] == [f"E2-{i}" for i in range(5)]
+    exported = [rec["id"] for rec in lines]
+    assert exported == sorted(set(exported))
+
+
+@pytest.mark.asyncio
+async def test_export_csv_and_since_filter(client):
+    qid = await _question_with_answers(client, "CSV", 2)
+    created_at = (await client.get(f"/questions/{qid}")).json()["created_at"]
+
+    r = await client.get("/export/questions", params={"format": "csv", "since": created_at})
+    assert r.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert {row["question_id"] for row in rows} == {str(qid)}
+    assert [row["answer_text"] for row in rows] == ["CSV-0", "CSV-1"]
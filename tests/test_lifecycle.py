@@ -0,0 +1,122 @@
+import asyncio
+import signal
+import time
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import lifecycle
+from app.db import get_session, make_engine
+from app.main import app
+
+
+@pytest.fixture(autouse=True)
+def fresh_ready_cache():
+    lifecycle.reset_ready_cache()
+    yield
+    lifecycle.reset_ready_cache()
+
+
+@pytest.mark.asyncio
+async def test_ready_checks_db_and_caches_result(client, tmp_path):
+    r = await client.get("/ready")
+    assert r.status_code == 200
+    assert r.json() == {"status": "ready"}
+
+    broken = make_engine(f"sqlite+aiosqlite:///{tmp_path}/нет/такой/папки.db")
+    maker = async_sessionmaker(broken)
+
+    async def broken_session():
+        async with maker() as session:
+            yield session
+
+    previous = app.dependency_overrides[get_session]
+    app.dependency_overrides[get_session] = broken_session
+    try:
+        # пока кэш свежий - БД не трогаем
+        assert (await client.get("/ready")).status_code == 200
+        lifecycle.reset_ready_cache()
+        r = await client.get("/ready")
+        assert r.status_code == 503
+        assert r.json()["status"] == "unavailable"
+    finally:
+        app.dependency_overrides[get_session] = previous
+        await broken.dispose()
+
+
+@pytest.mark.asyncio
+async def test_warm_up_opens_distinct_connections(test_db_url):
+    engine = make_engine(test_db_url)
+    try:
+        await lifecycle.warm_up(engine, 3)
+        assert engine.sync_engine.pool.checkedin() == 3
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_hot_statements_match_list_routes(client, engine_test, sql_statements):
+    for _ in range(2):
+        qid = (await client.post("/questions/", json={"text": "прогрев"})).json()["id"]
+    payload = {"user_id": "00000000-0000-0000-0000-000000000003", "text": "Ответ"}
+    for _ in range(2):
+        await client.post(f"/questions/{qid}/answers/", json=payload)
+    sql_statements.clear()
+    for url, params in (("/questions/", {}), ("/answers/", {"question_id": qid})):
+        first = await client.get(url, params={**params, "limit": 1})
+        cursor = first.headers["X-Next-Cursor"]
+        await client.get(url, params={**params, "limit": 1, "cursor": cursor})
+
+    dialect = engine_test.sync_engine.dialect
+    hot = {str(stmt.compile(dialect=dialect)) for stmt in lifecycle.hot_statements()}
+    pages = [s for s in sql_statements if "ORDER BY" in s and "LIMIT" in s]
+    assert len(pages) == 4
+    assert set(pages) <= hot
+
+
+@pytest.mark.asyncio
+async def test_startup_warms_remaining_engines_after_error(test_db_url, tmp_path, monkeypatch):
+    monkeypatch.setattr(lifecycle.settings, "warmup_connections", 2)
+    broken = make_engine(f"sqlite+aiosqlite:///{tmp_path}/нет/такой/папки.db")
+    good = make_engine(test_db_url)
+    try:
+        await lifecycle.startup([broken, good])
+        assert good.sync_engine.pool.checkedin() == 2
+    finally:
+        await broken.dispose()
+        await good.dispose()
+
+
+@pytest.mark.asyncio
+async def test_drain_waits_for_in_flight_requests():
+    tracker = lifecycle.InFlight()
+    tracker.enter()
+
+    async def finish_later():
+        await asyncio.sleep(0.05)
+        tracker.exit()
+
+    asyncio.create_task(finish_later())
+    assert await tracker.drain(timeout=1.0) == 0
+    assert tracker.draining
+
+    tracker.enter()
+    assert await tracker.drain(timeout=0.01) == 1
+
+
+def test_sigterm_marks_draining_before_server_handler(monkeypatch):
+    calls = []
+    previous = signal.signal(signal.SIGTERM, lambda sig, frame: calls.append(sig))
+    monkeypatch.setattr(lifecycle.in_flight, "draining", False)
+    try:
+        lifecycle.drain_on_sigterm(0.05)
+        handler = signal.getsignal(signal.SIGTERM)
+        handler(signal.SIGTERM, None)
+        assert lifecycle.in_flight.draining and calls == []
+        time.sleep(0.2)
+        assert calls == [signal.SIGTERM]
+        # повторный сигнал - сразу
+        handler(signal.SIGTERM, None)
+        assert calls == [signal.SIGTERM, signal.SIGTERM]
+    finally:
+        signal.signal(signal.SIGTERM, previous)
@@ -0,0 +1,76 @@
+import json
+import logging
+import queue
+
+import pytest
+
+from app.core import logging_config
+from app.core.logging_config import (
+    ContextFilter,
+    DroppingQueueHandler,
+    JsonFormatter,
+    SamplingFilter,
+)
+
+
+def _record(level: int, msg: str, *args) -> logging.LogRecord:
+    return logging.LogRecord("app.test", level, __file__, 1, msg, args, None)
+
+
+def test_queue_handler_drops_when_full_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+    for i in range(5):
+        handler.handle(_record(logging.INFO, "запись %s", i))
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+    # аргументы подставлены до постановки в очередь
+    assert handler.queue.get_nowait().msg == "запись 0"
+
+
+def test_sampling_keeps_warnings():
+    sampler = SamplingFilter(rate=0.0)
+    assert not sampler.filter(_record(logging.INFO, "шум"))
+    assert sampler.filter(_record(logging.WARNING, "важно"))
+
+
+def test_json_line_has_request_and_trace_ids():
+    token = logging_config.request_id.set("req-1")
+    try:
+        record = _record(logging.INFO, "вопрос id=%s", 7)
+        ContextFilter().filter(record)
+    finally:
+        logging_config.request_id.reset(token)
+    data = json.loads(JsonFormatter().format(record))
+    assert data["msg"] == "вопрос id=7"
+    assert data["request_id"] == "req-1"
+    assert data["trace_id"] is None
+    assert data["level"] == "INFO"
+
+
+@pytest.mark.asyncio
+async def test_request_id_header_and_context(client):
+    seen = []
+
+    class Capture(logging.Handler):
+        def emit(self, record):
+            seen.append((logging_config.request_id.get(), logging_config.trace_id.get()))
+
+    capture = Capture()
+    logger = logging.getLogger("app.api.questions")
+    logger.addHandler(capture)
+    try:
+        r = await client.post(
+            "/questions/",
+            json={"text": "с трассой"},
+            headers={
+                "X-Request-ID": "abc",
+                "traceparent": "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01",
+            },
+        )
+    finally:
+        logger.removeHandler(capture)
+    assert r.headers["X-Request-ID"] == "abc"
+    assert seen == [("abc", "4bf92f3577b34da6a3ce929d0e0e4736")]
+
+    r = await client.get("/")
+    assert len(r.headers["X-Request-ID"]) == 32
@@ -0,0 +1,49 @@
+import pytest
+
+from app.core import metrics
+
+
+@pytest.mark.asyncio
+async def test_metrics_route_templates_sql_and_pool(client, engine_test):
+    metrics.registry.reset()
+    qid = (await client.post("/questions/", json={"text": "для метрик"})).json()["id"]
+    await client.get(f"/questions/{qid}")
+    await client.get("/questions/999999999")
+
+    r = await client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = r.text
+
+    # метка - шаблон маршрута, а не сырой путь
+    assert (
+        'http_requests_total{method="GET",route="/questions/{question_id}",status="200"} 1' in body
+    )
+    assert (
+        'http_requests_total{method="GET",route="/questions/{question_id}",status="404"} 1' in body
+    )
+    assert f"/questions/{qid}" not in body
+    assert 'http_request_duration_seconds_count{method="POST",route="/questions/"} 1' in body
+    assert (
+        'http_request_duration_seconds_bucket{method="POST",route="/questions/",le="+Inf"} 1'
+        in body
+    )
+
+    # SQL через события движка, пул - по текущему состоянию
+    assert 'db_statement_duration_seconds_count{engine="primary",operation="INSERT"}' in body
+    assert 'db_pool_checked_out{engine="primary"}' in body
+    assert 'db_pool_wait_seconds_count{engine="primary"}' in body
+    assert "cache_events_total" in body
+
+
+def test_histogram_buckets_are_cumulative():
+    h = metrics.Histogram("t_seconds", "t", ("x",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        h.observe(value, "a")
+    assert h.samples() == [
+        't_seconds_bucket{x="a",le="0.1"} 1',
+        't_seconds_bucket{x="a",le="1.0"} 3',
+        't_seconds_bucket{x="a",le="+Inf"} 4',
+        't_seconds_sum{x="a"} 6.05',
+        't_seconds_count{x="a"} 4',
+    ]
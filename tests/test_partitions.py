@@ -0,0 +1,132 @@
+import os
+import uuid
+from datetime import date
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.settings import settings
+from app.jobs.partitions import maintain, partitions, plan_archive, plan_create
+from app.models import Base, Question, RowCounter
+
+EXISTING = ["answers_legacy", "answers_default", "answers_p202611", "answers_p202612"]
+
+
+def test_plan_create_keeps_months_ahead():
+    # текущий месяц покрыт answers_legacy, дальше - помесячные секции
+    assert plan_create(EXISTING, date(2026, 10, 18), 3) == [date(2027, 1, 1)]
+    assert plan_create(EXISTING, date(2027, 1, 5), 2) == [
+        date(2027, 1, 1),
+        date(2027, 2, 1),
+        date(2027, 3, 1),
+    ]
+    # без помесячных секций - начиная со следующего месяца
+    assert plan_create(["answers_legacy"], date(2026, 12, 31), 1) == [date(2027, 1, 1)]
+
+
+def test_plan_archive_detaches_only_whole_old_months():
+    assert plan_archive(EXISTING, date(2027, 2, 1), 0) == []
+    # хранить 2 месяца: граница - 2026-12-01, ноябрь целиком старше
+    assert plan_archive(EXISTING, date(2027, 2, 10), 2) == [date(2026, 11, 1)]
+    assert plan_archive(EXISTING, date(2027, 3, 1), 2) == [date(2026, 11, 1), date(2026, 12, 1)]
+
+
+@pytest.mark.asyncio
+async def test_maintain_is_noop_without_partitioning(engine_test):
+    await maintain(engine_test, date(2026, 10, 18), 3, 1)
+
+
+@pytest_asyncio.fixture
+async def pg_engine(monkeypatch):
+    """Отдельная схема в Postgres из TEST_POSTGRES_URL; без переменной - тест пропускается."""
+    url = os.environ.get("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL не задан")
+    schema = f"partitions_{uuid.uuid4().hex[:8]}"
+    admin = create_async_engine(url)
+    async with admin.begin() as conn:
+        await conn.execute(text(f"CREATE SCHEMA {schema}"))
+    monkeypatch.setattr(settings, "answers_archive_schema", f"{schema}_archive")
+    monkeypatch.setattr(settings, "answers_detach_lock_timeout_ms", 500)
+    db = create_async_engine(url, connect_args={"server_settings": {"search_path": schema}})
+    try:
+        yield db
+    finally:
+        await db.dispose()
+        async with admin.begin() as conn:
+            for name in (schema, f"{schema}_archive"):
+                await conn.execute(text(f"DROP SCHEMA IF EXISTS {name} CASCADE"))
+        await admin.dispose()
+
+
+@pytest.mark.asyncio
+async def test_maintain_creates_ahead_and_archives_with_default_partition(pg_engine):
+    # answers как после миграции 0008: секционирована, есть секция DEFAULT
+    async with pg_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=[Question.__table__])
+        await conn.run_sync(Base.metadata.create_all, tables=[RowCounter.__table__])
+        await conn.execute(
+            text(
+                "CREATE TABLE answers (id serial, question_id integer NOT NULL "
+                "REFERENCES question (id) ON DELETE CASCADE, user_id uuid, text text NOT NULL, "
+                "created_at timestamptz NOT NULL DEFAULT now(), PRIMARY KEY (id, created_at)) "
+                "PARTITION BY RANGE (created_at)"
+            )
+        )
+        for month, end in (("2026-08-01", "2026-09-01"), ("2026-09-01", "2026-10-01")):
+            await conn.execute(
+                text(
+                    f"CREATE TABLE answers_p{month[:4]}{month[5:7]} PARTITION OF answers "
+                    f"FOR VALUES FROM ('{month} 00:00:00+00') TO ('{end} 00:00:00+00')"
+                )
+            )
+        await conn.execute(text("CREATE TABLE answers_default PARTITION OF answers DEFAULT"))
+        qid = (
+            await conn.execute(
+                text("INSERT INTO question (text, answers_count) VALUES ('q', 5) RETURNING id")
+            )
+        ).scalar_one()
+        await conn.execute(
+            text(
+                "INSERT INTO answers (question_id, text, created_at) VALUES "
+                "(:q, 'old', '2026-08-10+00'), (:q, 'old', '2026-08-20+00'), "
+                "(:q, 'new', '2026-09-15+00'), "
+                # месяцы без секций: строки уже лежат в answers_default
+                "(:q, 'late', '2026-10-05+00'), (:q, 'late', '2026-11-05+00')"
+            ),
+            {"q": qid},
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO row_counter (name, value, version) "
+                "VALUES ('answers', 5, 1), ('question', 1, 1)"
+            )
+        )
+
+    await maintain(pg_engine, date(2026, 10, 18), ahead=1, keep_months=1)
+
+    async with pg_engine.connect() as conn:
+        states = await partitions(conn)
+        assert states == {
+            "answers_p202609": "attached",
+            "answers_p202610": "attached",
+            "answers_p202611": "attached",
+        }
+        archived = await conn.execute(
+            text(f"SELECT count(*) FROM {settings.answers_archive_schema}.answers_p202608")
+        )
+        assert archived.scalar_one() == 2
+        assert (await conn.execute(text("SELECT count(*) FROM answers"))).scalar_one() == 3
+        # строки из answers_default переехали в созданные секции
+        assert (await conn.execute(text("SELECT count(*) FROM answers_default"))).scalar_one() == 0
+        moved = await conn.execute(text("SELECT count(*) FROM answers_p202611"))
+        assert moved.scalar_one() == 1
+        count = await conn.execute(text("SELECT answers_count FROM question"))
+        assert count.scalar_one() == 3
+        counter = await conn.execute(text("SELECT value FROM row_counter WHERE name = 'answers'"))
+        assert counter.scalar_one() == 3
+
+    # повторный запуск ничего не трогает
+    await maintain(pg_engine, date(2026, 10, 18), ahead=1, keep_months=1)
@@ -0,0 +1,126 @@
+import uuid
+
+import pytest
+from sqlalchemy import func, insert, select, update
+
+from app import counting, purge
+from app.core.settings import settings
+from app.models import Answer, PurgeJob, Question
+
+SPAMMER = "00000000-0000-0000-0000-00000000dead"
+OTHER = "00000000-0000-0000-0000-00000000beef"
+
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    monkeypatch.setattr(settings, "purge_batch_size", 2)
+    monkeypatch.setattr(settings, "purge_pause_ms", 0)
+
+
+@pytest.mark.asyncio
+async def test_purge_answers_by_user_in_batches(client, session_maker, db_session):
+    qids = [
+        (await client.post("/questions/", json={"text": f"Q{i}"})).json()["id"] for i in range(2)
+    ]
+    for qid in qids:
+        for user in (SPAMMER, SPAMMER, SPAMMER, OTHER):
+            await client.post(f"/questions/{qid}/answers/", json={"user_id": user, "text": "x"})
+
+    r = await client.post("/purge/answers", json={"user_id": SPAMMER})
+    assert r.status_code == 202
+    job = r.json()
+    assert job["status"] == "pending"
+    assert await purge.run_pending(session_maker) == 1
+
+    job = (await client.get(f"/purge/{job['id']}")).json()
+    assert job["status"] == "done"
+    assert job["answers_deleted"] == 6
+    assert job["last_id"] <= job["max_id"]
+    left = (
+        await db_session.execute(select(Answer.user_id).where(Answer.question_id.in_(qids)))
+    ).scalars()
+    assert {str(u) for u in left} == {OTHER}
+    for qid in qids:
+        assert (await client.get(f"/questions/{qid}")).json()["answers_count"] == 1
+
+    assert (await client.get("/purge/100500")).status_code == 404
+    assert (await client.post("/purge/answers", json={})).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_purge_questions_resumes_after_restart(client, session_maker, db_session):
+    other = (await client.post("/questions/", json={"text": "Старый"})).json()["id"]
+    qids = [
+        (await client.post("/questions/", json={"text": f"Спам {i}"})).json()["id"]
+        for i in range(5)
+    ]
+    for qid in qids:
+        await client.post(f"/questions/{qid}/answers/", json={"user_id": OTHER, "text": "x"})
+    created = (
+        await db_session.execute(select(Question.created_at).where(Question.id == qids[0]))
+    ).scalar_one()
+
+    job = (await client.post("/purge/questions", json={"since": created.isoformat()})).json()
+    # «упавший» воркер взял задание и успел одну пачку
+    owner = uuid.uuid4().hex
+    claimed = await purge.claim(session_maker, owner)
+    assert await purge._questions_step(session_maker, claimed, owner)
+    # аренда истекла - задание подхватывает другой воркер и продолжает с last_id
+    async with session_maker() as session:
+        await session.execute(update(PurgeJob).values(lease_until=None))
+        await session.commit()
+    assert await purge.run_pending(session_maker) == 1
+
+    job = (await client.get(f"/purge/{job['id']}")).json()
+    assert job["status"] == "done"
+    assert (job["questions_deleted"], job["answers_deleted"]) == (5, 5)
+    db_session.expire_all()
+    remaining = (
+        await db_session.execute(select(func.count()).where(Question.id.in_(qids)))
+    ).scalar_one()
+    assert remaining == 0
+    # созданный раньше since вопрос не тронут
+    assert (await client.get(f"/questions/{other}")).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_purge_questions_counts_answers_added_during_the_job(
+    client, session_maker, db_session, monkeypatch
+):
+    qids = [
+        (await client.post("/questions/", json={"text": f"Поздний {i}"})).json()["id"]
+        for i in range(2)
+    ]
+    await client.post(f"/questions/{qids[0]}/answers/", json={"user_id": OTHER, "text": "x"})
+    delete_answers = purge._delete_answers
+
+    async def with_late_answer(session, where, **kwargs):
+        # ответ пришёл (как через API - со счётчиком) после пачек ответов,
+        # но до удаления вопросов
+        if "question_id" in str(where):
+            await session.execute(
+                insert(Answer).values(question_id=qids[1], user_id=uuid.UUID(OTHER), text="y")
+            )
+            await counting.adjust(session, Answer, 1)
+        return await delete_answers(session, where, **kwargs)
+
+    monkeypatch.setattr(purge, "_delete_answers", with_late_answer)
+    before = (
+        await counting.counter_value(db_session, Answer),
+        await counting.exact_count(db_session, Answer),
+    )
+    job_id = (await purge.create_job(db_session, "questions")).id
+    await db_session.execute(
+        update(PurgeJob).where(PurgeJob.id == job_id).values(last_id=qids[0] - 1)
+    )
+    await db_session.commit()
+    assert await purge.run_pending(session_maker) == 1
+
+    db_session.expire_all()
+    job = await db_session.get(PurgeJob, job_id)
+    assert (job.questions_deleted, job.answers_deleted) == (2, 2)
+    after = (
+        await counting.counter_value(db_session, Answer),
+        await counting.exact_count(db_session, Answer),
+    )
+    assert before[0] - after[0] == before[1] - after[1] == 1
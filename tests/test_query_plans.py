@@ -0,0 +1,196 @@
+"""
+Регрессия планов: выражения маршрутов списков и карточек не должны
+превращаться в полный проход по таблице.
+
+Выражения снимаются с реальных запросов к приложению (с параметрами) и
+прогоняются через EXPLAIN QUERY PLAN на засеянной и проанализированной
+базе. Проход по таблице (SCAN без индекса) допустим только как чтение
+страницы в порядке первичного ключа: ORDER BY <таблица>.id ... LIMIT.
+"""
+
+import re
+import uuid
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.cache import cache
+from app.core.settings import settings
+from app.db import (
+    get_read_session,
+    get_read_sessionmaker,
+    get_session,
+    get_sessionmaker,
+    make_engine,
+)
+from app.main import app
+from app.models import Answer, Base, Question
+
+USER = uuid.UUID("00000000-0000-0000-0000-0000000000aa")
+
+SCAN = re.compile(r"^SCAN (\S+)( USING .*)?$")
+# служебные таблицы на несколько строк: их планировщик честно читает целиком
+SMALL_TABLES = {"row_counter"}
+TABLES = set(Base.metadata.tables)
+
+
+def page_by_pk(statement: str, table: str) -> bool:
+    """Страница в порядке PK: ORDER BY <table>.id ... LIMIT, фильтр - только keyset по id."""
+    statement = " ".join(statement.split())
+    if f"ORDER BY {table}.id" not in statement or "LIMIT" not in statement:
+        return False
+    where = statement.partition(" WHERE ")[2].partition(" ORDER BY ")[0]
+    return set(re.findall(rf"\b{table}\.(\w+)", where)) <= {"id"}
+
+
+def full_scans(statement: str, plan: list[str]) -> list[str]:
+    """Шаги плана, которые читают таблицу целиком (проход по подзапросу - не таблица)."""
+    bad = []
+    table_scans = []
+    for step in plan:
+        m = SCAN.match(step)
+        if m is None or m[1] not in TABLES:
+            continue
+        table_scans.append(step)
+        if m[2] is None:
+            if m[1] not in SMALL_TABLES and not page_by_pk(statement, m[1]):
+                bad.append(step)
+        elif "LIMIT" not in statement:
+            # полный проход по индексу без LIMIT - та же сплошная выборка
+            bad.append(step)
+    if "USE TEMP B-TREE FOR ORDER BY" in plan and table_scans:
+        bad.append("сортировка всей таблицы")
+    return bad
+
+
+@pytest_asyncio.fixture
+async def plan_engine(tmp_path):
+    """Своя БД для теста планов: засеянные строки и ANALYZE не достаются другим тестам."""
+    engine = make_engine(f"sqlite+aiosqlite:///{tmp_path / 'plans.sqlite3'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    maker = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def session_override():
+        async with maker() as session:
+            yield session
+
+    deps = (get_session, get_read_session, get_read_sessionmaker, get_sessionmaker)
+    saved = {dep: app.dependency_overrides.get(dep) for dep in deps}
+    app.dependency_overrides.update(
+        {
+            get_session: session_override,
+            get_read_session: session_override,
+            get_read_sessionmaker: lambda: maker,
+            get_sessionmaker: lambda: maker,
+        }
+    )
+    try:
+        yield engine
+    finally:
+        for dep, override in saved.items():
+            if override is None:
+                app.dependency_overrides.pop(dep, None)
+            else:
+                app.dependency_overrides[dep] = override
+        await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def seeded(client, plan_engine):
+    """Несколько тысяч строк и ANALYZE - чтобы планировщик выбирал как на проде.
+
+    Строки заливаются до первой записи через API: она заводит счётчики по
+    COUNT(*), и они сразу согласованы с данными.
+    """
+    async with AsyncSession(plan_engine) as session:
+        res = await session.execute(
+            insert(Question).returning(Question.id, sort_by_parameter_order=True),
+            [{"text": f"Вопрос {i}", "answers_count": 8} for i in range(300)],
+        )
+        question_ids = res.scalars().all()
+        await session.execute(
+            insert(Answer),
+            [
+                {"question_id": qid, "user_id": USER if i == 0 else uuid.uuid4(), "text": "Ответ"}
+                for qid in question_ids
+                for i in range(8)
+            ],
+        )
+        await session.commit()
+    qid = (await client.post("/questions/", json={"text": "Первый"})).json()["id"]
+    await client.post(f"/questions/{qid}/answers/", json={"user_id": str(USER), "text": "Ответ"})
+    async with plan_engine.begin() as conn:
+        await conn.execute(text("ANALYZE"))
+    return question_ids
+
+
+@pytest.mark.asyncio
+async def test_list_and_detail_routes_use_indexes(client, plan_engine, seeded, monkeypatch):
+    # все выражения должны дойти до БД, а не отдаться из кэша
+    monkeypatch.setattr(settings, "page_cache", False)
+    qid = seeded[len(seeded) // 2]
+    answer_id = (await client.get("/answers/", params={"question_id": qid})).json()[0]["id"]
+    cache.clear()
+    urls = [
+        "/questions/",
+        "/questions/?sort_by=created_at",
+        "/questions/?sort_by=answers_count&order=desc",
+        "/questions/?include=answers",
+        f"/questions/{qid}",
+        f"/questions/{qid}?include=answers",
+        f"/answers/?question_id={qid}",
+        f"/answers/{answer_id}",
+        f"/users/{USER}/answers",
+    ]
+    captured: list[tuple[str, str, object]] = []
+    current = ""
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        captured.append((current, statement, parameters))
+
+    event.listen(plan_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        for url in urls:
+            current = url
+            r = await client.get(url)
+            assert r.status_code == 200, url
+            # вторая страница - keyset по курсору
+            if cursor := r.headers.get("X-Next-Cursor"):
+                current = f"{url} (cursor)"
+                sep = "&" if "?" in url else "?"
+                assert (await client.get(f"{url}{sep}cursor={cursor}")).status_code == 200
+    finally:
+        event.remove(plan_engine.sync_engine, "before_cursor_execute", record)
+
+    failures = []
+    async with plan_engine.connect() as conn:
+        for url, statement, parameters in captured:
+            res = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            plan = [row[-1] for row in res]
+            if bad := full_scans(statement, plan):
+                failures.append(f"{url}: {' '.join(statement.split())[:120]} -> {bad}")
+    assert {url for url, *_ in captured} >= set(urls)
+    assert not failures, "\n".join(failures)
+
+
+def test_full_scans_detects_unindexed_filter():
+    plan = ["SCAN answers"]
+    assert full_scans("SELECT * FROM answers WHERE answers.text = ?", plan) == ["SCAN answers"]
+    assert full_scans("SELECT * FROM answers ORDER BY answers.id ASC LIMIT ?", plan) == []
+    keyset = "SELECT * FROM answers WHERE answers.id > ? ORDER BY answers.id ASC LIMIT ?"
+    assert full_scans(keyset, plan) == []
+    # фильтр по question_id без индекса: обход по PK может пройти всю таблицу
+    filtered = "SELECT * FROM answers WHERE answers.question_id = ? ORDER BY answers.id LIMIT ?"
+    assert full_scans(filtered, plan) == ["SCAN answers"]
+    # SQLAlchemy переносит WHERE/ORDER BY на новую строку
+    assert full_scans(filtered.replace(" WHERE", "\nWHERE"), plan) == ["SCAN answers"]
+    sorted_plan = ["SCAN answers", "USE TEMP B-TREE FOR ORDER BY"]
+    assert full_scans("SELECT * FROM answers ORDER BY answers.text LIMIT ?", sorted_plan)
+    index_scan = ["SCAN answers USING INDEX ix_answers_question_id_id"]
+    assert full_scans("SELECT * FROM answers ORDER BY answers.question_id", index_scan)
+    # проход по результату подзапроса (окно по индексу) - не чтение таблицы
+    ranked = ["SEARCH answers USING COVERING INDEX ix (question_id=?)", "SCAN anon_1"]
+    assert full_scans("SELECT * FROM (SELECT ... FROM answers) AS anon_1", ranked) == []
@@ -1,4 +1,15 @@
+from datetime import UTC, datetime
+
 import pytest
+from sqlalchemy import insert, update
+
+from app import counting
+from app.core.cache import MemoryCache, cache
+from app.core.etag import pages
+from app.core.pagination import encode_cursor
+from app.core.settings import settings
+from app.jobs import answers_count
+from app.models import Question, RowCounter
 
 
 @pytest.mark.asyncio
@@ -53,3 +64,343 @@ async def test_get_question_and_delete(client):
     # проверяем 404
     r_404 = await client.get(f"/questions/{qid}")
     assert r_404.status_code == 404
+
+
+async def _walk_pages(client, url, params):
+    """Проходит список целиком по X-Next-Cursor и возвращает все элементы."""
+    items, cursor = [], None
+    while True:
+        page_params = dict(params, **({"cursor": cursor} if cursor else {}))
+        r = await client.get(url, params=page_params)
+        assert r.status_code == 200
+        items.extend(r.json())
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            return items
+
+
+@pytest.mark.asyncio
+async def test_list_questions_cursor_handles_created_at_ties(client, db_session):
+    # несколько вопросов с одинаковым created_at - ничьи решает id
+    same_time = datetime(2020, 1, 1, tzinfo=UTC)
+    db_session.add_all([Question(text=f"tie{i}", created_at=same_time) for i in range(5)])
+    await db_session.commit()
+
+    for order in ("asc", "desc"):
+        params = {"limit": 2, "sort_by": "created_at", "order": order}
+        walked = await _walk_pages(client, "/questions/", params)
+        ids = [i["id"] for i in walked]
+        assert len(ids) == len(set(ids))
+
+        full = (await client.get("/questions/", params={"limit": 10_000, "order": order})).json()
+        expected = sorted(full, key=lambda x: (x["created_at"], x["id"]), reverse=order == "desc")
+        assert ids == [i["id"] for i in expected]
+
+
+@pytest.mark.asyncio
+async def test_list_questions_cursor_from_other_sort_rejected(client):
+    for i in range(3):
+        await client.post("/questions/", json={"text": f"C{i}"})
+    r = await client.get("/questions/", params={"limit": 1, "sort_by": "id"})
+    cursor = r.headers["X-Next-Cursor"]
+
+    r_bad = await client.get("/questions/", params={"cursor": cursor, "sort_by": "created_at"})
+    assert r_bad.status_code == 400
+    r_garbage = await client.get("/questions/", params={"cursor": "not-a-cursor"})
+    assert r_garbage.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_list_limit_zero_and_forged_cursor_values(client):
+    for i in range(2):
+        await client.post("/questions/", json={"text": f"Z{i}"})
+    for url in ("/questions/", "/answers/"):
+        r = await client.get(url, params={"limit": 0})
+        assert r.status_code == 200 and r.json() == []
+        assert "X-Next-Cursor" not in r.headers
+        assert (await client.get(url, params={"limit": -1})).status_code == 422
+
+    # подделанный курсор: значение не того типа или вне int4 - 400, а не ошибка БД
+    forged = [
+        ("answers_count", "desc", "x", 1),
+        ("answers_count", "desc", True, 1),
+        ("answers_count", "desc", 1, 2**40),
+        ("id", "asc", [1], 1),
+    ]
+    for sort_by, order, value, last_id in forged:
+        cursor = encode_cursor(sort_by, order, value, last_id)
+        params = {"cursor": cursor, "sort_by": sort_by, "order": order}
+        assert (await client.get("/questions/", params=params)).status_code == 400, cursor
+
+
+@pytest.mark.asyncio
+async def test_list_questions_total_count_modes(client, monkeypatch):
+    # режимы переключаем на лету - готовые страницы из кэша тут помешают
+    monkeypatch.setattr(settings, "page_cache", False)
+
+    async def total() -> int:
+        r = await client.get("/questions/", params={"limit": 1})
+        return int(r.headers["X-Total-Count"])
+
+    # counter: строку row_counter ведут create/delete
+    before = await total()
+    ids = [
+        (await client.post("/questions/", json={"text": f"T{i}"})).json()["id"] for i in range(2)
+    ]
+    await client.delete(f"/questions/{ids[0]}")
+    assert await total() == before + 1
+
+    # approximate на SQLite откатывается на тот же COUNT(*), что и exact
+    monkeypatch.setattr(settings, "questions_count_mode", "exact")
+    exact = await total()
+    monkeypatch.setattr(settings, "questions_count_mode", "approximate")
+    assert await total() == exact
+
+    # cached: в пределах TTL новые строки не видны
+    monkeypatch.setattr(settings, "questions_count_mode", "cached")
+    monkeypatch.setattr(counting, "_cached_counts", {})
+    cached = await total()
+    await client.post("/questions/", json={"text": "после кэша"})
+    assert await total() == cached
+
+    # with_total=false - заголовка нет
+    r = await client.get("/questions/", params={"limit": 1, "with_total": False})
+    assert "X-Total-Count" not in r.headers
+
+
+@pytest.mark.asyncio
+async def test_question_include_answers_capped_and_paged(client):
+    qid = (await client.post("/questions/", json={"text": "С ответами"})).json()["id"]
+    user = "00000000-0000-0000-0000-000000000000"
+    answer_ids = [
+        (
+            await client.post(f"/questions/{qid}/answers/", json={"user_id": user, "text": f"a{i}"})
+        ).json()["id"]
+        for i in range(5)
+    ]
+
+    plain = (await client.get(f"/questions/{qid}")).json()
+    assert "answers" not in plain
+
+    seen, cursor = [], None
+    while True:
+        params = {"include": "answers", "answers_limit": 2}
+        if cursor:
+            params["answers_cursor"] = cursor
+        r = await client.get(f"/questions/{qid}", params=params)
+        assert r.status_code == 200
+        page = r.json()["answers"]
+        assert len(page) <= 2
+        seen.extend(a["id"] for a in page)
+        cursor = r.headers.get("X-Next-Answers-Cursor")
+        if not cursor:
+            break
+    assert seen == answer_ids
+
+
+@pytest.mark.asyncio
+async def test_list_questions_include_answers_single_extra_query(client, sql_statements):
+    user = "00000000-0000-0000-0000-000000000000"
+    for i in range(3):
+        qid = (await client.post("/questions/", json={"text": f"L{i}"})).json()["id"]
+        for j in range(3):
+            await client.post(f"/questions/{qid}/answers/", json={"user_id": user, "text": f"{j}"})
+
+    sql_statements.clear()
+    r = await client.get(
+        "/questions/",
+        params={"include": "answers", "answers_limit": 2, "limit": 3, "order": "desc"},
+    )
+
+    assert r.status_code == 200
+    items = r.json()
+    assert [len(i["answers"]) for i in items] == [2, 2, 2]
+    # счётчик X-Total-Count + страница вопросов + один запрос за ответами всей страницы
+    assert len(sql_statements) == 3
+
+
+@pytest.mark.asyncio
+async def test_question_write_paths_round_trips(client, sql_statements):
+    await client.post("/questions/", json={"text": "заводим счётчик"})
+
+    # INSERT ... RETURNING + UPDATE row_counter
+    sql_statements.clear()
+    qid = (await client.post("/questions/", json={"text": "RT"})).json()["id"]
+    assert len(sql_statements) == 2
+    assert sql_statements[0].startswith("INSERT") and "RETURNING" in sql_statements[0]
+
+    # SELECT ... FOR UPDATE + DELETE answers ... RETURNING id (для кэша)
+    # + DELETE question + UPDATE row_counter
+    sql_statements.clear()
+    assert (await client.delete(f"/questions/{qid}")).status_code == 204
+    assert len(sql_statements) == 4
+    assert sql_statements[0].startswith("SELECT")
+    assert sql_statements[1].startswith("DELETE") and "RETURNING" in sql_statements[1]
+
+    # повторное удаление - 404 после одного SELECT
+    sql_statements.clear()
+    assert (await client.delete(f"/questions/{qid}")).status_code == 404
+    assert len(sql_statements) == 1
+
+
+@pytest.mark.asyncio
+async def test_get_question_cached_and_invalidated(client, sql_statements):
+    qid = (await client.post("/questions/", json={"text": "в кэш"})).json()["id"]
+    user = "00000000-0000-0000-0000-000000000000"
+    aid = (
+        await client.post(f"/questions/{qid}/answers/", json={"user_id": user, "text": "x"})
+    ).json()["id"]
+
+    first = await client.get(f"/questions/{qid}")
+    await client.get(f"/answers/{aid}")
+    sql_statements.clear()
+    second = await client.get(f"/questions/{qid}")
+    await client.get(f"/answers/{aid}")
+    assert second.content == first.content
+    assert sql_statements == []
+    assert cache.stats()["hits"] >= 2
+
+    # удаление вопроса чистит и его, и каскадно удалённые ответы
+    await client.delete(f"/questions/{qid}")
+    assert (await client.get(f"/questions/{qid}")).status_code == 404
+    assert (await client.get(f"/answers/{aid}")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_lru_and_ttl():
+    lru = MemoryCache(max_entries=2, ttl=60)
+    await lru.set("a", 1)
+    await lru.set("b", 2)
+    await lru.get("a")  # «a» теперь свежее «b»
+    await lru.set("c", 3)
+    assert await lru.get("b") is None
+    assert await lru.get("a") == 1
+    assert lru.stats()["evictions"] == 1
+
+    await lru.set("short", 1, ttl=0)
+    assert await lru.get("short") is None
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_byte_budget():
+    sized = MemoryCache(max_entries=100, ttl=60, max_bytes=10, weigh=len)
+    await sized.set("a", b"1234")
+    await sized.set("b", b"5678")
+    await sized.set("a", b"12")  # замена не считается дважды
+    assert sized.stats()["bytes"] == 6
+    await sized.set("c", b"abcdef")  # 12 > 10: вытесняется самая старая «b»
+    assert await sized.get("b") is None
+    assert sized.stats()["bytes"] == 8
+    await sized.set("huge", b"x" * 11)  # больше бюджета - не кладём
+    assert await sized.get("huge") is None
+    await sized.delete_many(["a", "c"])
+    assert sized.stats()["bytes"] == 0
+
+
+@pytest.mark.asyncio
+async def test_list_questions_etag_304_without_queries(client, sql_statements):
+    await client.post("/questions/", json={"text": "для ETag"})
+    r = await client.get("/questions/", params={"limit": 5})
+    etag = r.headers["ETag"]
+    assert etag.startswith('W/"')
+
+    # совпавший If-None-Match: 304, из БД читаем только версию
+    sql_statements.clear()
+    r304 = await client.get("/questions/", params={"limit": 5}, headers={"If-None-Match": etag})
+    assert r304.status_code == 304
+    assert r304.headers["ETag"] == etag
+    assert len(sql_statements) == 1
+
+    # без If-None-Match страница отдаётся из кэша страниц - те же байты
+    sql_statements.clear()
+    cached = await client.get("/questions/", params={"limit": 5})
+    assert cached.content == r.content
+    assert cached.headers["X-Total-Count"] == r.headers["X-Total-Count"]
+    assert len(sql_statements) == 1
+    # страницы - в своём кэше, не в кэше объектов
+    assert cache.stats()["size"] == 0
+    assert pages.stats()["bytes"] >= len(r.content)
+
+    # изменение коллекции меняет версию - старый ETag больше не подходит
+    await client.post("/questions/", json={"text": "новая версия"})
+    r_new = await client.get("/questions/", params={"limit": 5}, headers={"If-None-Match": etag})
+    assert r_new.status_code == 200
+    assert r_new.headers["ETag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_answers_count_maintained_and_sortable(client):
+    user = "00000000-0000-0000-0000-000000000000"
+    qids = [
+        (await client.post("/questions/", json={"text": f"ac{i}"})).json()["id"] for i in range(3)
+    ]
+    for qid, n in zip(qids, (2, 0, 3)):
+        for _ in range(n):
+            await client.post(f"/questions/{qid}/answers/", json={"user_id": user, "text": "a"})
+    await client.post(
+        f"/questions/{qids[1]}/answers/bulk", json=[{"user_id": user, "text": "b"}] * 4
+    )
+    # удаление ответа и чтение через кэш по id видят новое значение
+    assert (await client.get(f"/questions/{qids[0]}")).json()["answers_count"] == 2
+    answer_id = (await client.get("/answers/", params={"question_id": qids[0]})).json()[0]["id"]
+    await client.delete(f"/answers/{answer_id}")
+    assert (await client.get(f"/questions/{qids[0]}")).json()["answers_count"] == 1
+
+    walked = await _walk_pages(
+        client, "/questions/", {"limit": 2, "sort_by": "answers_count", "order": "desc"}
+    )
+    counts = {i["id"]: i["answers_count"] for i in walked}
+    assert [counts[q] for q in qids] == [1, 4, 3]
+    keys = [(i["answers_count"], i["id"]) for i in walked]
+    assert keys == sorted(keys, reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_answers_count_repair_job(client, db_session, session_maker):
+    qid = (await client.post("/questions/", json={"text": "сломанный счётчик"})).json()["id"]
+    user = "00000000-0000-0000-0000-000000000000"
+    for _ in range(2):
+        await client.post(f"/questions/{qid}/answers/", json={"user_id": user, "text": "a"})
+    await db_session.execute(update(Question).where(Question.id == qid).values(answers_count=42))
+    await db_session.commit()
+    etag = (await client.get("/questions/")).headers["ETag"]
+
+    assert await answers_count.repair(session_maker, batch_size=3) == 1
+    assert (await client.get(f"/questions/{qid}")).json()["answers_count"] == 2
+    # версия вопросов поднята: списки (ETag, кэш страниц) не отдают старое
+    r = await client.get("/questions/", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["ETag"] != etag
+    # повторный прогон ничего не трогает
+    assert await answers_count.repair(session_maker, batch_size=3) == 0
+
+
+@pytest.mark.asyncio
+async def test_counter_bumped_after_commit_and_forgotten_on_rollback(
+    client, db_session, session_maker
+):
+    await client.post("/questions/", json={"text": "заводим счётчик"})
+    before = (await counting.counter_rows(db_session, Question))["question"].value
+    await db_session.commit()
+
+    async with session_maker() as session:
+        await session.execute(insert(Question).values(text="откатится"))
+        await counting.adjust(session, Question, +1)
+        await session.rollback()
+        await session.execute(insert(Question).values(text="останется"))
+        await counting.adjust(session, Question, +1)
+        # пишущая транзакция строку row_counter не трогает
+        async with session_maker() as other:
+            assert (await counting.counter_rows(other, Question))["question"].value == before
+        await counting.commit(session)
+    assert (await counting.counter_rows(db_session, Question))["question"].value == before + 1
+    await db_session.commit()
+
+    # сдвиг, потерянный между коммитами, чинит задача сверки
+    await db_session.execute(
+        update(RowCounter).where(RowCounter.name == "question").values(value=1000)
+    )
+    await db_session.commit()
+    await answers_count.repair(session_maker, batch_size=10)
+    assert (await client.get("/questions/")).headers["X-Total-Count"] == str(
+        await counting.exact_count(db_session, Question)
+    )
@@ -0,0 +1,57 @@
+import logging
+
+import pytest
+
+from app.core.request_stats import parse_server_timing
+from app.core.settings import settings
+
+USER = "00000000-0000-0000-0000-000000000000"
+
+
+@pytest.mark.asyncio
+async def test_round_trip_budget_create_answer(client, assert_statements):
+    qid = (await client.post("/questions/", json={"text": "бюджет"})).json()["id"]
+    payload = {"user_id": USER, "text": "a"}
+    await client.post(f"/questions/{qid}/answers/", json=payload)  # заводим счётчик
+
+    # INSERT ... RETURNING + answers_count вопроса + row_counter
+    r = await assert_statements(3, "POST", f"/questions/{qid}/answers/", json=payload)
+    assert r.status_code == 201
+    # несуществующий вопрос - только INSERT, упавший на FK
+    await assert_statements(1, "POST", "/questions/999999999/answers/", json=payload)
+
+
+@pytest.mark.asyncio
+async def test_round_trip_budget_list_questions(client, assert_statements):
+    for _ in range(2):  # второй раз - счётчик уже заведён
+        await client.post("/questions/", json={"text": "для списка"})
+    params = {"limit": 5}
+    # row_counter (версии + total) + выборка страницы
+    r = await assert_statements(2, "GET", "/questions/", params=params)
+    # та же страница при той же версии - из кэша страниц
+    await assert_statements(1, "GET", "/questions/", params=params)
+    await assert_statements(1, "GET", "/questions/", headers={"If-None-Match": r.headers["ETag"]})
+    # вложенные ответы - один дополнительный запрос на всю страницу
+    await assert_statements(3, "GET", "/questions/", params={**params, "include": "answers"})
+
+
+@pytest.mark.asyncio
+async def test_server_timing_and_budget_warning(client, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "request_query_budget", 1)
+    monkeypatch.setattr(settings, "n_plus_one_threshold", 2)
+    qid = (await client.post("/questions/", json={"text": "N+1"})).json()["id"]
+    for _ in range(2):
+        await client.post(f"/questions/{qid}/answers/", json={"user_id": USER, "text": "a"})
+
+    with caplog.at_level(logging.WARNING, logger="app.core.request_stats"):
+        r = await client.get("/answers/", params={"question_id": qid})
+    timing = parse_server_timing(r.headers["Server-Timing"])
+    assert int(timing["sql"]) == 2
+    assert float(timing["db"]) <= float(timing["app"])
+    assert "GET /answers/: 2 SQL-выражений (бюджет 1)" in caplog.text
+
+    # повтор одного и того же выражения в запросе
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger="app.core.request_stats"):
+        await client.post("/questions/bulk", json=[{"text": "a"}], params={})
+    assert "N+1" not in caplog.text
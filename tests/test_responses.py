@@ -0,0 +1,24 @@
+from datetime import UTC, datetime
+from uuid import UUID
+
+from pydantic import TypeAdapter
+
+from app import schemas
+from app.responses import ORJSONResponse
+
+
+def test_orjson_bytes_match_pydantic_serialization():
+    # aware-datetime (как из asyncpg) и UUID должны кодироваться как у pydantic
+    created = datetime(2026, 1, 2, 3, 4, 5, 678, tzinfo=UTC)
+    rows = [
+        {
+            "user_id": UUID("00000000-0000-0000-0000-000000000001"),
+            "text": "ответ",
+            "id": 1,
+            "question_id": 2,
+            "created_at": created,
+        }
+    ]
+    adapter = TypeAdapter(list[schemas.AnswerRead])
+    expected = adapter.dump_json(adapter.validate_python(rows))
+    assert ORJSONResponse(rows).body == expected
@@ -0,0 +1,61 @@
+import pytest
+
+USER = "00000000-0000-0000-0000-000000000000"
+
+
+@pytest.mark.asyncio
+async def test_search_questions_ranked_and_paged(client):
+    texts = ["зебра", "зебра зебра зебра", "лошадь и зебра", "просто лошадь"]
+    ids = [(await client.post("/questions/", json={"text": t})).json()["id"] for t in texts]
+
+    found, cursor = [], None
+    while True:
+        params = {"q": "зебра", "limit": 1}
+        if cursor:
+            params["cursor"] = cursor
+        r = await client.get("/questions/search", params=params)
+        assert r.status_code == 200
+        found.extend(r.json())
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert {i["id"] for i in found} == set(ids[:3])
+    # больше вхождений - выше в выдаче
+    assert found[0]["id"] == ids[1]
+    assert set(found[0]) == {"text", "id", "created_at", "answers_count"}
+
+
+@pytest.mark.asyncio
+async def test_search_questions_forgets_deleted(client):
+    qid = (await client.post("/questions/", json={"text": "уникальныйтермин"})).json()["id"]
+    r = await client.get("/questions/search", params={"q": "уникальныйтермин"})
+    assert [i["id"] for i in r.json()] == [qid]
+
+    await client.delete(f"/questions/{qid}")
+    r = await client.get("/questions/search", params={"q": "уникальныйтермин"})
+    assert r.json() == []
+
+
+@pytest.mark.asyncio
+async def test_search_answers_filtered_by_question(client):
+    q1 = (await client.post("/questions/", json={"text": "Q1"})).json()["id"]
+    q2 = (await client.post("/questions/", json={"text": "Q2"})).json()["id"]
+    a1 = (
+        await client.post(f"/questions/{q1}/answers/", json={"user_id": USER, "text": "жираф"})
+    ).json()["id"]
+    await client.post(f"/questions/{q2}/answers/", json={"user_id": USER, "text": "жираф"})
+
+    r = await client.get("/answers/search", params={"q": "жираф"})
+    assert len(r.json()) == 2
+    r = await client.get("/answers/search", params={"q": "жираф", "question_id": q1})
+    assert [a["id"] for a in r.json()] == [a1]
+
+
+@pytest.mark.asyncio
+async def test_search_requires_query(client):
+    assert (await client.get("/questions/search")).status_code == 422
+    assert (await client.get("/questions/search", params={"q": ""})).status_code == 422
+    # спецсимволы FTS5 - просто текст, а не синтаксис запроса
+    r = await client.get("/questions/search", params={"q": 'NEAR("a" OR *'})
+    assert r.status_code == 200